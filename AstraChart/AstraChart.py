@@ -1,21 +1,232 @@
+"""
+AstraChart 聊天记录库连接管理
+
+  - 每个线程一个连接（Flask 线程化服务器、AstraLoop、ASGI 的线程池各自使用自己的连接），
+    不再在线程之间共享同一个 sqlite3.Connection；线程结束时其连接随之关闭，
+    连接数不超过存活的线程数（Flask 每个请求一个线程也不会累积）
+  - WAL 模式：读写互不阻塞；synchronous=NORMAL 下每次提交无需整库 fsync
+  - 写事务以 BEGIN IMMEDIATE 开始，一开始就拿到写锁，锁被占用时按 busy_timeout 等待，
+    避免读事务升级为写事务时的 SQLITE_BUSY
+  - cache_size / mmap_size 可通过 AstraChart.sqlite 配置
+  - 接口写入走 writer（AstraChartWriter）组提交，多条记录共用一次事务与 fsync
+  - 启动时只校验 / 迁移表结构（PRAGMA user_version 记录版本），不读取数据；
+    历史记录按 ID 键集分页读取，或由 iter_history 分块流式读取，任何时候都不会整表载入内存
+  - search（AstraChartSearch）：聊天记录与 memory 的 FTS5 全文检索，索引由触发器增量维护
+"""
 import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Iterator, Optional, TypedDict
 
 from AstraConfig import AstraConfig
+from .AstraChartSearch import AstraChartSearch, BACKFILL_MIGRATION, SEARCH_MIGRATION
+from .AstraChartWriter import AstraChartWriter
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS ASTRA_CHAT(
+    ID INTEGER PRIMARY KEY AUTOINCREMENT ,
+    role TEXT NOT NULL ,
+    content TEXT NOT NULL ,
+    timestamp TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+)
+"""
+_COLUMNS = {"ID", "role", "content", "timestamp"}
+# (版本号, 升级到该版本执行的语句)；只追加，不修改已发布的条目
+_MIGRATIONS: list[tuple[int, list[str]]] = [
+    (1, [
+        # ID 即 rowid，按 ID 分页无需额外索引；按时间筛选时走 (timestamp, ID)
+        "CREATE INDEX IF NOT EXISTS IDX_ASTRA_CHAT_TIMESTAMP ON ASTRA_CHAT(timestamp, ID)",
+    ]),
+    (2, SEARCH_MIGRATION),
+    (3, [
+        # 记录所属的会话（可为空），供检索按 device / conversation_id 限定范围；旧记录保持为空，不属于任何会话
+        "ALTER TABLE ASTRA_CHAT ADD COLUMN device TEXT",
+        "ALTER TABLE ASTRA_CHAT ADD COLUMN conversation_id INTEGER",
+        "CREATE INDEX IF NOT EXISTS IDX_ASTRA_CHAT_CONVERSATION ON ASTRA_CHAT(device, conversation_id, ID)",
+    ]),
+    (4, BACKFILL_MIGRATION),
+]
+_INSERT_CHAT = """
+INSERT INTO ASTRA_CHAT (role, content, device, conversation_id)
+VALUES (?, ?, ?, ?)
+"""
+_SELECT_BEFORE = """
+SELECT ID, role, content, timestamp FROM ASTRA_CHAT
+WHERE ID < ? AND timestamp >= ?
+ORDER BY ID DESC LIMIT ?
+"""
+_SELECT_AFTER = """
+SELECT ID, role, content, timestamp FROM ASTRA_CHAT
+WHERE ID > ? AND timestamp >= ?
+ORDER BY ID LIMIT ?
+"""
+
+
+class _ThreadConnection:
+    """线程本地连接的持有者：随线程的 threading.local 一起释放，触发 weakref.finalize 关闭连接"""
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _release_connection(connections: list, lock: threading.Lock, conn: sqlite3.Connection) -> None:
+    with lock:
+        if conn in connections:
+            connections.remove(conn)
+    conn.close()
+
+
+class AstraChatRow(TypedDict):
+    id: int
+    role: str
+    content: str
+    timestamp: str
 
 
 class AstraChart:
-    def __init__(self):
-        self.conn =None
-        self.init_database(AstraConfig.get("AstraChart").get("db_path"))
-    def init_database(self,db_path:str):
-        self.conn = sqlite3.connect(db_path)
-        cursor = self.conn.cursor()
-        cursor.execute("""
-        SELECT * FROM ASTRA_CHAT
-        """)
-        result = cursor.fetchall()
-        cursor.close()
-        return result
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        :param db_path: SQLite 数据库路径，默认读取 AstraChart.db_path
+        """
+        options = AstraConfig.get("AstraChart.sqlite", {})
+        self.db_path = db_path or AstraConfig.get("AstraChart").get("db_path")
+        self.busy_timeout: float = options.get("busy_timeout", 5.0)
+        self.synchronous: str = options.get("synchronous", "NORMAL")
+        self.cache_size: int = options.get("cache_size", -16000)
+        self.mmap_size: int = options.get("mmap_size", 268435456)
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.init_database(self.db_path)
+        writer = AstraConfig.get("AstraChart.writer", {})
+        self.writer = AstraChartWriter(
+            self,
+            batch_size=writer.get("batch_size", 256),
+            max_delay=writer.get("max_delay_ms", 2) / 1000,
+            synchronous=writer.get("synchronous", "FULL"),
+            timeout=writer.get("timeout", 30),
+        )
+        search = AstraConfig.get("AstraChart.search", {})
+        self.search = AstraChartSearch(
+            self,
+            rank_window=search.get("rank_window", 2000),
+            like_window=search.get("like_window", 20000),
+        )
+
+    def init_database(self, db_path: str) -> int:
+        """校验并迁移表结构（不读取任何聊天记录），返回当前 schema 版本"""
+        conn = self.connection()
+        # 切换到 WAL 需要独占访问，只在启动时执行一次；之后的连接会沿用数据库文件中记录的模式
+        conn.execute("PRAGMA journal_mode=WAL")
+        with self.transaction() as conn:
+            conn.execute(_CREATE_TABLE)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ASTRA_CHAT)")}
+            missing = _COLUMNS - columns
+            if missing:
+                raise RuntimeError(f"{db_path} 中 ASTRA_CHAT 表结构不兼容，缺少列: {sorted(missing)}")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, statements in _MIGRATIONS:
+                if target <= version:
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version={target}")
+                version = target
+        return version
+
+    def connection(self) -> sqlite3.Connection:
+        """当前线程的连接（首次使用时创建）"""
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.busy_timeout,
+                isolation_level=None,  # 手动管理事务
+                check_same_thread=False,  # close() 会在其他线程统一关闭
+            )
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            conn.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            holder = self._local.holder = _ThreadConnection(conn)
+            with self._connections_lock:
+                self._connections.append(conn)
+            # 线程结束时 threading.local 释放 holder，随之关闭该线程的连接并移出列表
+            weakref.finalize(holder, _release_connection, self._connections, self._connections_lock, conn)
+        return holder.conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务：正常退出时提交，异常时回滚并继续抛出"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add_chat_message(self, role: str, content: str,
+                         device: Optional[str] = None, conversation_id: Optional[int] = None) -> int:
+        """
+        写入一条聊天记录，返回记录 ID
+        :param device: 所属设备，与 conversation_id 一起决定检索时的会话范围
+        :param conversation_id: 所属会话
+        """
+        with self.transaction() as conn:
+            return conn.execute(_INSERT_CHAT, (role, content, device, conversation_id)).lastrowid
+
+    def history(self,
+                limit: int = 50,
+                before_id: Optional[int] = None,
+                after_id: Optional[int] = None,
+                since: str = "") -> list[AstraChatRow]:
+        """
+        键集分页读取聊天记录
+        :param limit: 本页最多返回的条数
+        :param before_id: 向前翻页，返回 ID 小于该值的最近 limit 条（按 ID 倒序）；都不传时返回最新一页
+        :param after_id: 向后翻页，返回 ID 大于该值的 limit 条（按 ID 正序），优先于 before_id
+        :param since: 只返回该时间（'YYYY-MM-DD HH:MM:SS'）及之后的记录
+        :return: 下一页以本页最后一条的 id 作为 before_id / after_id
+        """
+        if after_id is not None:
+            rows = self.connection().execute(_SELECT_AFTER, (after_id, since, limit))
+        else:
+            # rowid 最大为 2^63 - 1
+            rows = self.connection().execute(_SELECT_BEFORE, (before_id if before_id is not None else 2 ** 63 - 1,
+                                                              since, limit))
+        return [{"id": row[0], "role": row[1], "content": row[2], "timestamp": row[3]} for row in rows]
+
+    def iter_history(self, chunk_size: int = 500, after_id: int = 0, since: str = "") -> Iterator[AstraChatRow]:
+        """
+        按 ID 正序流式读取全部聊天记录，每次只查询 chunk_size 条
+        每块是一次独立的查询，不会长时间持有读事务
+        """
+        while True:
+            rows = self.history(limit=chunk_size, after_id=after_id, since=since)
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after_id = rows[-1]["id"]
+
+    def stats(self) -> dict:
+        with self._connections_lock:
+            connections = len(self._connections)
+        return {"connections": connections, "writer": self.writer.stats(), "search": self.search.stats()}
+
+    def close(self) -> None:
+        """写完 writer 与检索索引队列中的记录，再关闭所有线程的连接（可重复调用）"""
+        self.writer.close()
+        self.search.close()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
 
 if __name__ == '__main__':
     astra_chart = AstraChart()
@@ -0,0 +1,357 @@
+"""
+聊天记录与 memory 的全文检索（SQLite FTS5，trigram 分词，中英文均可按子串检索）
+
+  - ASTRA_CHAT_FTS：ASTRA_CHAT 的外部内容索引，由触发器随插入 / 删除 / 更新增量维护
+  - ASTRA_MEMORY_SEARCH：memory 消息的检索副本（无论 memory 使用哪种后端），
+    同样由触发器维护其外部内容索引 ASTRA_MEMORY_SEARCH_FTS；
+    memory 写入后由后台线程攒批写入，不占用请求路径
+  - 范围：传入 device / conversation_id 时两个来源都只检索该会话的记录（写入时未指定会话的聊天记录不会命中），
+    会话范围过滤在排序窗口之内进行，不会被其他会话的命中挤出窗口
+  - 查询：每个检索词至少 3 个字符时走 MATCH，对最近 rank_window 条命中按 bm25 排序（更早的命中不参与排序）；
+    有更短的检索词时 trigram 索引无法使用（MATCH 与 LIKE 都不会命中），
+    退化为对原表的 LIKE 子串扫描，只扫描（范围内）最近的 like_window 条记录，按时间倒序，只适合作为短词的兜底
+  - 回填：索引建立之前就已存在的 memory 由 backfill_memory 一次性写入（第 4 版 schema 登记为待回填）
+"""
+import json
+import queue
+import threading
+from typing import TYPE_CHECKING, Iterable, List, Optional, TypedDict
+
+from openai.types.responses import EasyInputMessageParam
+
+from AstraNex.AstraLogger import AstraLogger
+
+if TYPE_CHECKING:
+    from .AstraChart import AstraChart
+
+# AstraChart 的第 2 版 schema：建立索引并对已有的聊天记录做一次性 rebuild，之后全部增量维护
+SEARCH_MIGRATION = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ASTRA_CHAT_FTS USING fts5(
+        role UNINDEXED, content, content='ASTRA_CHAT', content_rowid='ID', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ASTRA_CHAT_FTS_INSERT AFTER INSERT ON ASTRA_CHAT BEGIN
+        INSERT INTO ASTRA_CHAT_FTS(rowid, role, content) VALUES (new.ID, new.role, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ASTRA_CHAT_FTS_DELETE AFTER DELETE ON ASTRA_CHAT BEGIN
+        INSERT INTO ASTRA_CHAT_FTS(ASTRA_CHAT_FTS, rowid, role, content) VALUES ('delete', old.ID, old.role, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ASTRA_CHAT_FTS_UPDATE AFTER UPDATE ON ASTRA_CHAT BEGIN
+        INSERT INTO ASTRA_CHAT_FTS(ASTRA_CHAT_FTS, rowid, role, content) VALUES ('delete', old.ID, old.role, old.content);
+        INSERT INTO ASTRA_CHAT_FTS(rowid, role, content) VALUES (new.ID, new.role, new.content);
+    END
+    """,
+    "INSERT INTO ASTRA_CHAT_FTS(ASTRA_CHAT_FTS) VALUES ('rebuild')",
+    """
+    CREATE TABLE IF NOT EXISTS ASTRA_MEMORY_SEARCH(
+        ID INTEGER PRIMARY KEY AUTOINCREMENT ,
+        device TEXT NOT NULL ,
+        conversation_id INTEGER NOT NULL ,
+        role TEXT NOT NULL ,
+        content TEXT NOT NULL ,
+        timestamp TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS IDX_ASTRA_MEMORY_SEARCH_CONVERSATION ON ASTRA_MEMORY_SEARCH(device, conversation_id)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ASTRA_MEMORY_SEARCH_FTS USING fts5(
+        content, content='ASTRA_MEMORY_SEARCH', content_rowid='ID', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ASTRA_MEMORY_SEARCH_FTS_INSERT AFTER INSERT ON ASTRA_MEMORY_SEARCH BEGIN
+        INSERT INTO ASTRA_MEMORY_SEARCH_FTS(rowid, content) VALUES (new.ID, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ASTRA_MEMORY_SEARCH_FTS_DELETE AFTER DELETE ON ASTRA_MEMORY_SEARCH BEGIN
+        INSERT INTO ASTRA_MEMORY_SEARCH_FTS(ASTRA_MEMORY_SEARCH_FTS, rowid, content) VALUES ('delete', old.ID, old.content);
+    END
+    """,
+]
+
+# AstraChart 的第 4 版 schema：登记一次性的 memory 回填（在 AstraMemory 启用检索时执行）
+BACKFILL_MIGRATION = [
+    """
+    CREATE TABLE IF NOT EXISTS ASTRA_SEARCH_STATE(
+        name TEXT PRIMARY KEY ,
+        value TEXT NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO ASTRA_SEARCH_STATE (name, value) VALUES ('memory_backfill', 'pending')",
+]
+_SELECT_BACKFILL = """
+SELECT value FROM ASTRA_SEARCH_STATE WHERE name = 'memory_backfill'
+"""
+_BACKFILL_DONE = """
+UPDATE ASTRA_SEARCH_STATE SET value = 'done' WHERE name = 'memory_backfill'
+"""
+
+_INSERT_MEMORY = """
+INSERT INTO ASTRA_MEMORY_SEARCH (device, conversation_id, role, content)
+VALUES (?, ?, ?, ?)
+"""
+_DELETE_MEMORY = """
+DELETE FROM ASTRA_MEMORY_SEARCH WHERE device = ? AND conversation_id = ?
+"""
+# 先按 rowid 倒序取最近的 rank_window 条命中（FTS5 按 rowid 顺序遍历，无需为全部命中打分），
+# 只对这些候选计算 bm25 / snippet 并排序；常见词命中上百万条时查询耗时仍然有上限
+_MATCH_CHAT = """
+SELECT ID, device, conversation_id, role, content, timestamp, snippet, score FROM (
+    SELECT c.ID, c.device, c.conversation_id, c.role, c.content, c.timestamp,
+           snippet(ASTRA_CHAT_FTS, 1, '[', ']', '…', 16) AS snippet,
+           bm25(ASTRA_CHAT_FTS) AS score
+    FROM ASTRA_CHAT_FTS JOIN ASTRA_CHAT c ON c.ID = ASTRA_CHAT_FTS.rowid
+    WHERE ASTRA_CHAT_FTS MATCH ? {filters}
+    ORDER BY ASTRA_CHAT_FTS.rowid DESC LIMIT ?
+) ORDER BY score LIMIT ?
+"""
+_MATCH_MEMORY = """
+SELECT ID, device, conversation_id, role, content, timestamp, snippet, score FROM (
+    SELECT m.ID, m.device, m.conversation_id, m.role, m.content, m.timestamp,
+           snippet(ASTRA_MEMORY_SEARCH_FTS, 0, '[', ']', '…', 16) AS snippet,
+           bm25(ASTRA_MEMORY_SEARCH_FTS) AS score
+    FROM ASTRA_MEMORY_SEARCH_FTS JOIN ASTRA_MEMORY_SEARCH m ON m.ID = ASTRA_MEMORY_SEARCH_FTS.rowid
+    WHERE ASTRA_MEMORY_SEARCH_FTS MATCH ? {filters}
+    ORDER BY ASTRA_MEMORY_SEARCH_FTS.rowid DESC LIMIT ?
+) ORDER BY score LIMIT ?
+"""
+# LIKE 兜底无法使用索引：先取（范围内）最近的 like_window 条记录，再在其中做子串过滤，扫描量有上限
+_LIKE_CHAT = """
+SELECT ID, device, conversation_id, role, content, timestamp, NULL, 0.0 FROM (
+    SELECT c.ID, c.device, c.conversation_id, c.role, c.content, c.timestamp
+    FROM ASTRA_CHAT c WHERE TRUE {filters}
+    ORDER BY c.ID DESC LIMIT ?
+) c WHERE {likes}
+ORDER BY ID DESC LIMIT ?
+"""
+_LIKE_MEMORY = """
+SELECT ID, device, conversation_id, role, content, timestamp, NULL, 0.0 FROM (
+    SELECT m.ID, m.device, m.conversation_id, m.role, m.content, m.timestamp
+    FROM ASTRA_MEMORY_SEARCH m WHERE TRUE {filters}
+    ORDER BY m.ID DESC LIMIT ?
+) m WHERE {likes}
+ORDER BY ID DESC LIMIT ?
+"""
+
+
+class AstraSearchHit(TypedDict, total=False):
+    source: str             # chat / memory
+    id: int
+    role: str
+    content: str
+    timestamp: str
+    snippet: Optional[str]  # 命中片段，命中词以 [] 标出（LIKE 检索时为 None）
+    score: float            # bm25，越小越相关
+    device: Optional[str]   # 所属会话；写入时未指定会话的聊天记录为 None
+    conversation_id: Optional[int]
+
+
+class AstraChartSearch:
+    _default: Optional["AstraChartSearch"] = None
+
+    def __init__(self, chart: "AstraChart", rank_window: int = 2000, like_window: int = 20000):
+        """
+        Args:
+            chart: 提供数据库连接的 AstraChart（索引表由其 schema 迁移创建）
+            rank_window: 参与相关度排序的最近命中条数上限
+            like_window: 短词 LIKE 兜底最多扫描的最近记录条数
+        """
+        self.chart = chart
+        self.rank_window = rank_window
+        self.like_window = like_window
+        self._queue: "queue.Queue[Optional[tuple[str, int, str, list]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._indexed = 0
+        self._failed = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="AstraChartSearch", daemon=True)
+        self._worker.start()
+        AstraChartSearch._default = self
+
+    @classmethod
+    def default(cls) -> "AstraChartSearch":
+        """进程内最近创建的检索实例（供 MCP 工具等无法直接拿到 AstraChart 的调用方使用）"""
+        if cls._default is None:
+            raise RuntimeError("AstraChartSearch 尚未初始化，需先创建 AstraChart")
+        return cls._default
+
+    # ==================================================================================
+    # memory 索引（AstraMemory 写入后调用，只入队）
+    # ==================================================================================
+
+    def index_memory(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        """把追加到会话的消息加入索引"""
+        self._enqueue("append", conversation_id, device, messages)
+
+    def replace_memory(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        """会话被整体替换时，重建该会话的索引"""
+        self._enqueue("replace", conversation_id, device, messages)
+
+    def backfill_memory(self, conversations: Iterable[tuple[int, str, List[EasyInputMessageParam]]]) -> int:
+        """
+        把索引建立之前已有的 memory 一次性写入索引，完成后记录状态，之后的调用直接返回
+        需在 index_memory 开始接收新消息之前调用；按会话先删后插，中途失败时下次调用整体重做
+
+        Args:
+            conversations: (conversation_id, device, messages) 序列，已回填过时不会被消费
+
+        Returns:
+            本次回填的消息条数
+        """
+        row = self.chart.connection().execute(_SELECT_BACKFILL).fetchone()
+        if row is None or row[0] == "done":
+            return 0
+        total = 0
+        for conversation_id, device, messages in conversations:
+            rows = _memory_rows(conversation_id, device, messages)
+            with self.chart.transaction() as conn:
+                conn.execute(_DELETE_MEMORY, (device, conversation_id))
+                conn.executemany(_INSERT_MEMORY, rows)
+            total += len(rows)
+        with self.chart.transaction() as conn:
+            conn.execute(_BACKFILL_DONE)
+        with self._lock:
+            self._indexed += total
+        AstraLogger.info(f"[AstraChartSearch] 已回填 {total} 条 memory 消息到检索索引")
+        return total
+
+    def _enqueue(self, op: str, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        rows = _memory_rows(conversation_id, device, messages)
+        with self._lock:
+            if self._closed:
+                return
+            self._queue.put((op, conversation_id, device, rows))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # 把已经排队的任务合并进同一个事务
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write(batch)
+                    return
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: list) -> None:
+        try:
+            with self.chart.transaction() as conn:
+                for op, conversation_id, device, rows in batch:
+                    if op == "replace":
+                        conn.execute(_DELETE_MEMORY, (device, conversation_id))
+                    conn.executemany(_INSERT_MEMORY, rows)
+        except Exception as e:
+            with self._lock:
+                self._failed += len(batch)
+            AstraLogger.error(f"[AstraChartSearch] memory 索引写入失败: {e!r}")
+            return
+        with self._lock:
+            self._indexed += sum(len(rows) for _, _, _, rows in batch)
+
+    # ==================================================================================
+    # 检索
+    # ==================================================================================
+
+    def search(self,
+               query: str,
+               limit: int = 20,
+               source: str = "all",
+               device: Optional[str] = None,
+               conversation_id: Optional[int] = None) -> list[AstraSearchHit]:
+        """
+        全文检索聊天记录与 memory
+
+        Args:
+            query: 检索词，空白分隔的多个词须同时命中
+            limit: 每个来源最多返回的条数
+            source: all / chat / memory
+            device: 只检索该设备的记录（chat 与 memory）
+            conversation_id: 只检索该会话的记录（chat 与 memory）
+
+        Returns:
+            命中记录；两个来源各自按相关度（或时间）排序，chat 在前
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        hits: list[AstraSearchHit] = []
+        for name, match, like, alias in (("chat", _MATCH_CHAT, _LIKE_CHAT, "c"),
+                                         ("memory", _MATCH_MEMORY, _LIKE_MEMORY, "m")):
+            if source in ("all", name):
+                hits.extend(self._search(name, match, like, alias, terms, limit, device, conversation_id))
+        return hits
+
+    def _search(self, name: str, match: str, like: str, alias: str, terms: list[str], limit: int,
+                device: Optional[str], conversation_id: Optional[int]) -> list[AstraSearchHit]:
+        filters, params = "", []
+        if device is not None:
+            filters += f" AND {alias}.device = ?"
+            params.append(device)
+        if conversation_id is not None:
+            filters += f" AND {alias}.conversation_id = ?"
+            params.append(conversation_id)
+        if _can_match(terms):
+            rows = self.chart.connection().execute(match.format(filters=filters),
+                                                   (_match_expression(terms), *params, self.rank_window, limit))
+        else:
+            likes = " AND ".join([f"{alias}.content LIKE ?"] * len(terms))
+            rows = self.chart.connection().execute(like.format(likes=likes, filters=filters),
+                                                   (*params, self.like_window, *_like_patterns(terms), limit))
+        return [{"source": name, "id": r[0], "device": r[1], "conversation_id": r[2], "role": r[3],
+                 "content": r[4], "timestamp": r[5], "snippet": r[6], "score": r[7]} for r in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"indexed": self._indexed, "failed": self._failed, "pending": self._queue.qsize()}
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """写完已排队的 memory 索引后停止后台线程（可重复调用）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join(timeout)
+        if AstraChartSearch._default is self:
+            AstraChartSearch._default = None
+
+
+def _can_match(terms: list[str]) -> bool:
+    """trigram 分词下，短于 3 个字符的词无法用 MATCH 检索"""
+    return all(len(term) >= 3 for term in terms)
+
+
+def _match_expression(terms: list[str]) -> str:
+    """每个词作为短语（转义双引号），多个短语隐式 AND，避免用户输入被解析为 FTS5 查询语法"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _like_patterns(terms: list[str]) -> list[str]:
+    return [f"%{term}%" for term in terms]
+
+
+def _memory_rows(conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> list[tuple]:
+    return [(device, conversation_id, m.get("role", ""), _message_text(m.get("content", ""))) for m in messages]
+
+
+def _message_text(content) -> str:
+    """content 可能是字符串或多段内容列表，只取其中的文本部分建立索引"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return json.dumps(content, ensure_ascii=False)
@@ -0,0 +1,203 @@
+"""
+ASTRA_CHAT 组提交（group commit）写入器
+
+请求线程只把聊天记录放入队列并等待确认；后台写线程把队列中的记录攒成一批，
+以一个事务 executemany 写入，一次提交（一次 fsync）确认整批记录：
+  - 批次上限 batch_size 条，或第一条记录入队后最多等待 max_delay 秒
+  - 写线程的连接默认 synchronous=FULL，提交返回即已落盘，确认是持久的
+  - 整批失败时逐条重试，单条坏数据只让它自己的调用方收到异常
+  - 调用方最多等待 timeout 秒；写线程退出（关闭或异常）时，尚未写入的记录全部以 RuntimeError 失败
+"""
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+from AstraNex.AstraLogger import AstraLogger
+
+if TYPE_CHECKING:
+    from .AstraChart import AstraChart
+
+_INSERT_CHAT = """
+INSERT INTO ASTRA_CHAT (role, content, device, conversation_id)
+VALUES (?, ?, ?, ?)
+"""
+_LAST_ID = """
+SELECT seq FROM sqlite_sequence WHERE name = 'ASTRA_CHAT'
+"""
+
+# (role, content, device, conversation_id, future)
+_Pending = tuple[str, str, Optional[str], Optional[int], "concurrent.futures.Future[int]"]
+
+
+class AstraChartWriter:
+    def __init__(self,
+                 chart: "AstraChart",
+                 batch_size: int = 256,
+                 max_delay: float = 0.002,
+                 synchronous: str = "FULL",
+                 timeout: float = 30.0):
+        """
+        Args:
+            chart: 提供数据库连接的 AstraChart
+            batch_size: 单个事务最多写入的记录数
+            max_delay: 批次中第一条记录最多等待的时间（秒）
+            synchronous: 写线程连接的 synchronous 级别，FULL 时每次提交都会 fsync
+            timeout: add / add_async 等待提交确认的默认超时（秒）
+        """
+        self.chart = chart
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.synchronous = synchronous
+        self.timeout = timeout
+
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._rows = 0
+        self._batches = 0
+        self._max_batch = 0
+        self._failed = 0
+        self._worker = threading.Thread(target=self._run, name="AstraChartWriter", daemon=True)
+        self._worker.start()
+
+    def submit(self, role: str, content: str,
+               device: Optional[str] = None, conversation_id: Optional[int] = None) -> "concurrent.futures.Future[int]":
+        """把一条聊天记录入队，返回在提交后完成的 Future（结果为记录 ID）；device / conversation_id 为所属会话"""
+        future: "concurrent.futures.Future[int]" = concurrent.futures.Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("AstraChartWriter 已关闭")
+            self._queue.put((role, content, device, conversation_id, future))
+        return future
+
+    def add(self, role: str, content: str, device: Optional[str] = None, conversation_id: Optional[int] = None,
+            timeout: Optional[float] = None) -> int:
+        """
+        写入一条聊天记录并阻塞到其所在批次提交，返回记录 ID
+        超过 timeout（默认 self.timeout）秒未确认时抛出 TimeoutError，记录仍可能在之后写入
+        """
+        future = self.submit(role, content, device, conversation_id)
+        return future.result(self.timeout if timeout is None else timeout)
+
+    async def add_async(self, role: str, content: str, device: Optional[str] = None,
+                        conversation_id: Optional[int] = None, timeout: Optional[float] = None) -> int:
+        """add 的协程版本，等待期间不阻塞事件循环"""
+        future = asyncio.wrap_future(self.submit(role, content, device, conversation_id))
+        # shield：超时只放弃等待，不取消已入队的写入
+        return await asyncio.wait_for(asyncio.shield(future), self.timeout if timeout is None else timeout)
+
+    # ==================================================================================
+    # 后台写线程
+    # ==================================================================================
+
+    def _run(self) -> None:
+        batch: list[_Pending] = []
+        try:
+            self.chart.connection().execute(f"PRAGMA synchronous={self.synchronous}")
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    return
+                batch = [first]
+                stop = self._collect(batch)
+                self._flush(batch)
+                if stop:
+                    return
+        except Exception as e:
+            AstraLogger.error(f"[AstraChartWriter] 写线程异常退出: {e!r}")
+        finally:
+            self._fail_pending(batch)
+
+    def _fail_pending(self, batch: list[_Pending]) -> None:
+        """写线程退出后拒绝新的写入，并让所有尚未完成的调用方立即收到异常而不是等到超时"""
+        with self._lock:
+            self._closed = True
+        pending = [item[-1] for item in batch]
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                pending.append(item[-1])
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("AstraChartWriter 写线程已退出，记录未写入"))
+
+    def _collect(self, batch: list[_Pending]) -> bool:
+        """
+        收集一批记录，返回是否收到了关闭信号
+        上一批提交期间到达的记录已在队列中，直接取走；只有队列中确有其他记录（存在并发写入）时
+        才再等待最多 max_delay 攒批，单个客户端顺序写入时不增加延迟
+        """
+        deadline = time.monotonic() + self.max_delay
+        wait = False
+        while len(batch) < self.batch_size:
+            try:
+                if wait:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                if wait or len(batch) == 1 or self.max_delay <= 0:
+                    return False
+                wait = True
+                continue
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    def _flush(self, batch: list[_Pending]) -> None:
+        try:
+            with self.chart.transaction() as conn:
+                conn.executemany(_INSERT_CHAT, [item[:-1] for item in batch])
+                # 持有写锁期间 AUTOINCREMENT 连续分配，本批 ID 为 [last - n + 1, last]
+                last_id = conn.execute(_LAST_ID).fetchone()[0]
+        except Exception as e:
+            AstraLogger.warning(f"[AstraChartWriter] 批量写入 {len(batch)} 条失败，逐条重试: {e!r}")
+            self._flush_each(batch)
+            return
+        for offset, item in enumerate(batch):
+            item[-1].set_result(last_id - len(batch) + 1 + offset)
+        with self._lock:
+            self._rows += len(batch)
+            self._batches += 1
+            self._max_batch = max(self._max_batch, len(batch))
+
+    def _flush_each(self, batch: list[_Pending]) -> None:
+        for role, content, device, conversation_id, future in batch:
+            try:
+                row_id = self.chart.add_chat_message(role, content, device, conversation_id)
+            except Exception as e:
+                future.set_exception(e)
+                with self._lock:
+                    self._failed += 1
+                continue
+            future.set_result(row_id)
+            with self._lock:
+                self._rows += 1
+                self._batches += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rows": self._rows,
+                "batches": self._batches,
+                "max_batch": self._max_batch,
+                "avg_batch": self._rows / self._batches if self._batches else 0.0,
+                "failed": self._failed,
+                "pending": self._queue.qsize(),
+            }
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """写完队列中已有的记录后停止写线程（可重复调用）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join(timeout)
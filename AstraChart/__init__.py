@@ -1,4 +1,6 @@
-from .AstraChart import AstraChart
+from .AstraChart import AstraChart, AstraChatRow
+from .AstraChartSearch import AstraChartSearch, AstraSearchHit
+from .AstraChartWriter import AstraChartWriter
 
 
-__all__=['AstraChart']
\ No newline at end of file
+__all__=['AstraChart', 'AstraChatRow', 'AstraChartSearch', 'AstraSearchHit', 'AstraChartWriter']
\ No newline at end of file
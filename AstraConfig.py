@@ -1,26 +1,118 @@
 # config.py - AstraConfig "星册" 全局配置系统
 # 一册藏宙，万律归序
 
+import copy
+import ctypes
+import ctypes.util
+import hashlib
 import json
+import os
+import select
+import struct
+import sys
 import time
 import threading
-from typing import Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional
 from pathlib import Path
 
+_MISSING = object()
+
+
+class _Inotify:
+    """
+    Linux inotify 的最小 ctypes 封装 —— 监听配置文件所在目录
+    （编辑器常以 "写临时文件 + rename" 的方式保存，只监听文件本身会丢事件）
+    """
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+    def __init__(self, directory: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch 失败: {directory}")
+        self._wake_r, self._wake_w = os.pipe()
+        self._closed = False
+        self._close_lock = threading.Lock()  # wake / close 可能来自不同线程
+
+    @classmethod
+    def create(cls, path: Path) -> Optional["_Inotify"]:
+        """非 Linux 或 inotify 不可用时返回 None（调用方回退到轮询）"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return cls(path.parent)
+        except (OSError, AttributeError) as e:
+            print(f"[AstraConfig] inotify 不可用，回退为轮询: {e}")
+            return None
+
+    def wait(self, timeout: Optional[float]) -> Optional[set]:
+        """
+        阻塞等待目录事件
+        :return: 发生变更的文件名集合；超时返回空集合；被 wake() 唤醒返回 None
+        """
+        readable, _, _ = select.select([self.fd, self._wake_r], [], [], timeout)
+        if self._wake_r in readable:
+            return None
+        names = set()
+        if self.fd not in readable:
+            return names
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + self._EVENT.size <= len(data):
+            _, _, _, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            names.add(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def wake(self) -> None:
+        with self._close_lock:
+            if not self._closed:
+                os.write(self._wake_w, b"x")
+
+    def close(self) -> None:
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            for fd in (self.fd, self._wake_r, self._wake_w):
+                os.close(fd)
+
+
 class AstraConfig:
     """
     AstraConfig "星册" —— 全局配置管理类
     特性：
       - 单例模式，全局共享
       - 支持 JSON / YAML 配置文件
-      - 热加载（文件变更自动重载）
+      - 热加载（Linux 下 inotify 事件驱动 + 去抖，其他平台回退为轮询；内容哈希不变则不重载）
       - 线程安全
       - 支持点式嵌套访问：config.get("database.host")
-      - 支持配置变更监听
+      - 支持配置变更监听：按前缀订阅（watch），每次发布只做一次结构化 diff，回调在后台线程执行
+      - 不可变快照：读取方拿到的是只读视图，重载时整体原子替换
+      - 无锁读取：点式路径预编译为扁平索引，get 只是一次 dict 查找（写时复制发布）
     """
     _instance = None
     _lock = threading.RLock()
     _watchers = []  # 监听器列表：func(old, new)
+    _subscriptions = []  # 前缀订阅列表：(prefix, func(changes))
+    _paths: dict = {}  # 实例 __init__ 完成前的空索引，保证无锁 get 不会读到未初始化的实例
 
     def __new__(cls):
         if cls._instance is None:
@@ -36,11 +128,27 @@ class AstraConfig:
             if hasattr(self, 'initialized'):
                 return
             self._config: dict = {}
+            self._snapshot: Mapping[str, Any] = MappingProxyType({})
+            self._paths: dict[str, Any] = {}  # "a.b.c" -> 冻结后的值，随版本整体替换
+            self._version: int = 0
             self.config_path: Optional[Path] = None
             self._last_modified: float = 0
+            self._content_hash: Optional[str] = None
             self._polling_interval: float = 2.0
+            self._debounce_interval: float = 0.05  # 合并连续写入的静默窗口（秒）
             self._running: bool = False
             self._thread: Optional[threading.Thread] = None
+            # 单线程执行器：回调不阻塞读取方与监听线程，且同一订阅者按版本顺序收到变更
+            self._notify_executor: Optional[ThreadPoolExecutor] = None
+            self._stop_event: Optional[threading.Event] = None
+            self._inotify: Optional[_Inotify] = None
+            self._reload_stats: dict = {
+                "backend": None,          # "inotify" / "polling"
+                "reloads": 0,             # 实际发布的新配置次数
+                "skipped": 0,             # 文件事件触发但内容哈希未变的次数
+                "last_latency_ms": None,  # 文件写入(mtime) -> 新配置发布 的耗时
+                "max_latency_ms": None,
+            }
             self.initialized = True
 
     # ==================================================================================
@@ -61,13 +169,41 @@ class AstraConfig:
     def get(cls, key: str, default: Any = None) -> Any:
         """
         获取配置项（类方法）
+        dict / list 类型的值返回深拷贝，可自由修改或 json.dumps；只读视图请用 snapshot()
         :param key: 点式路径，如 "core.model"
         :param default: 默认值
         :return: 配置值
         """
-        instance = cls()
+        instance = cls._instance or cls()  # 热路径：已初始化时跳过 __new__/__init__
         return instance._get(key, default)
 
+    @classmethod
+    def ensure_loaded(cls, config_path: str, format_type: Optional[str] = None) -> None:
+        """
+        仅在尚未加载任何配置文件时加载（类方法）
+        已加载后直接返回，不产生任何文件 I/O，之后的变更由热加载线程负责
+        """
+        instance = cls()
+        if instance.config_path is None:
+            with cls._lock:
+                if instance.config_path is None:
+                    instance._load(config_path, format_type)
+
+    @classmethod
+    def snapshot(cls) -> Mapping[str, Any]:
+        """
+        获取当前配置的不可变快照（只读视图，无锁、无 I/O）
+        快照在加载 / 重载 / set 时整体替换，已拿到的快照不会被修改
+        """
+        return cls()._snapshot
+
+    @classmethod
+    def version(cls) -> int:
+        """
+        当前配置版本号，每次发布新配置（加载 / 重载 / set）递增
+        """
+        return cls()._version
+
     @classmethod
     def set(cls, key: str, value: Any) -> None:
         """
@@ -84,6 +220,15 @@ class AstraConfig:
         instance = cls()
         instance._reload()
 
+    @classmethod
+    def reload_stats(cls) -> dict:
+        """
+        热加载统计：监听方式、重载 / 跳过次数、重载延迟（毫秒）
+        """
+        instance = cls()
+        with instance._lock:
+            return dict(instance._reload_stats)
+
     @classmethod
     def to_dict(cls) -> dict:
         """
@@ -101,6 +246,25 @@ class AstraConfig:
         instance = cls()
         instance._add_watcher(callback)
 
+    @classmethod
+    def watch(cls, prefix: str, callback: Callable[[dict], None]) -> None:
+        """
+        按点式前缀订阅配置变更，如 AstraConfig.watch("AstraCore.api", cb)
+        仅当前缀下的配置项发生变化时回调，回调在后台线程执行
+        :param prefix: 点式前缀，"" 表示订阅全部
+        :param callback: 回调函数，参数为 {点式路径: (旧值, 新值)}，新增 / 删除的一侧为 None
+        """
+        instance = cls()
+        instance._watch(prefix, callback)
+
+    @classmethod
+    def unwatch(cls, prefix: str, callback: Callable[[dict], None]) -> None:
+        """
+        取消前缀订阅
+        """
+        instance = cls()
+        instance._unwatch(prefix, callback)
+
     # ==================================================================================
     # 实例方法实现（内部逻辑）
     # ==================================================================================
@@ -111,61 +275,184 @@ class AstraConfig:
             raise FileNotFoundError(f"配置文件未找到: {path}")
 
         fmt = format_type or self._detect_format(path)
-        config_data = self._read_config(path, fmt)
+        raw = path.read_bytes()
+        config_data = self._read_config(path, fmt, raw)
 
         with self._lock:
+            if self.config_path is not None and self.config_path != path:
+                self.stop_watcher()  # 切换了配置文件，旧目录的监听作废
             self.config_path = path
-            self._config = config_data
+            self._publish(config_data)
+            self._content_hash = hashlib.sha256(raw).hexdigest()
             self._last_modified = path.stat().st_mtime
             self._start_watcher()
 
     def _get(self, key: str, default: Any = None) -> Any:
-        with self._lock:
-            keys = key.split('.')
-            value = self._config
-            for k in keys:
-                if isinstance(value, dict) and k in value:
-                    value = value[k]
-                else:
-                    return default
-            return value
+        # 无锁：_paths 发布后不再修改，读到的要么是旧版本要么是新版本
+        value = self._paths.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        if isinstance(value, (MappingProxyType, tuple)):
+            return self._thaw(value)  # 非叶子值返回可修改的副本，调用方的修改不影响已发布的版本
+        return value
 
     def _set(self, key: str, value: Any) -> None:
         with self._lock:
+            old_paths = self._paths
             keys = key.split('.')
-            target = self._config
+            new_config = copy.deepcopy(self._config)  # 写时复制，不修改已发布的版本
+            target = new_config
             for k in keys[:-1]:
                 if k not in target or not isinstance(target[k], dict):
                     target[k] = {}
                 target = target[k]
             target[keys[-1]] = value
+            self._publish(new_config)
+            self._dispatch(self._diff(old_paths, self._paths))
 
-    def _reload(self) -> None:
+    def _reload(self, force: bool = True) -> bool:
+        """
+        重新读取配置文件
+        :param force: False 时若文件内容哈希未变则跳过解析与通知
+        :return: 是否发布了新配置
+        """
         if not self.config_path or not self.config_path.exists():
             raise RuntimeError("配置文件路径无效，无法重载")
 
-        fmt = self._detect_format(self.config_path)
-        new_config = self._read_config(self.config_path, fmt)
+        path = self.config_path
+        mtime = path.stat().st_mtime
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if not force and digest == self._content_hash:
+            with self._lock:
+                self._last_modified = mtime
+                self._reload_stats["skipped"] += 1
+            return False
+
+        fmt = self._detect_format(path)
+        new_config = self._read_config(path, fmt, raw)
 
         with self._lock:
-            old_config = dict(self._config)  # 浅拷贝用于通知
-            self._config = new_config
-            self._last_modified = self.config_path.stat().st_mtime
-            self._trigger_watchers(old_config, new_config)
+            old_config = self._config  # 已发布的版本不会再被修改，可直接用于通知
+            old_paths = self._paths
+            self._publish(new_config)
+            self._content_hash = digest
+            self._last_modified = mtime
+            self._record_reload(mtime)
+            # 锁内只做入队（保证版本顺序），回调本身在后台线程执行
+            self._dispatch(self._diff(old_paths, self._paths), (old_config, new_config))
+        return True
+
+    def _record_reload(self, mtime: float) -> None:
+        """记录一次重载的延迟（需持有锁）"""
+        stats = self._reload_stats
+        latency = max(0.0, (time.time() - mtime) * 1000)
+        stats["reloads"] += 1
+        stats["last_latency_ms"] = round(latency, 3)
+        stats["max_latency_ms"] = round(max(latency, stats["max_latency_ms"] or 0.0), 3)
 
     def _to_dict(self) -> dict:
-        with self._lock:
-            import copy
-            return copy.deepcopy(self._config)
+        return copy.deepcopy(self._config)
 
     def _add_watcher(self, callback: Callable[[dict, dict], None]) -> None:
         with self._lock:
             if callback not in self._watchers:
                 self._watchers.append(callback)
 
-    def _read_config(self, path: Path, fmt: str) -> dict:
+    def _watch(self, prefix: str, callback: Callable[[dict], None]) -> None:
+        with self._lock:
+            if (prefix, callback) not in self._subscriptions:
+                self._subscriptions.append((prefix, callback))
+
+    def _unwatch(self, prefix: str, callback: Callable[[dict], None]) -> None:
+        with self._lock:
+            if (prefix, callback) in self._subscriptions:
+                self._subscriptions.remove((prefix, callback))
+
+    @staticmethod
+    def _diff(old_paths: dict, new_paths: dict) -> dict:
+        """
+        基于两个版本的路径索引计算结构化 diff，只报告叶子节点（以及类型发生变化的节点）
+        :return: {点式路径: (旧值, 新值)}
+        """
+        changes = {}
+        for key in old_paths.keys() | new_paths.keys():
+            old = old_paths.get(key, _MISSING)
+            new = new_paths.get(key, _MISSING)
+            if isinstance(old, Mapping) and isinstance(new, Mapping):
+                continue  # 中间节点的变化体现在其叶子上
+            if old is _MISSING or new is _MISSING or old != new:
+                changes[key] = (None if old is _MISSING else AstraConfig._thaw(old),
+                                None if new is _MISSING else AstraConfig._thaw(new))
+        return changes
+
+    def _dispatch(self, changes: dict, legacy: Optional[tuple] = None) -> None:
+        """
+        将变更分发给受影响的订阅者（需持有锁，只负责提交到后台执行器）
+        :param legacy: (old_config, new_config)，提供时同时通知 add_watcher 注册的监听器
+        """
+        if not changes:
+            return
+        if self._notify_executor is None:
+            self._notify_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="AstraConfig-notify")
+        for prefix, callback in self._subscriptions:
+            if not prefix:
+                matched = changes
+            else:
+                scope = prefix + "."
+                matched = {k: v for k, v in changes.items() if k == prefix or k.startswith(scope)}
+            if matched:
+                self._notify_executor.submit(self._run_callback, callback, matched)
+        if legacy is not None and self._watchers:
+            self._notify_executor.submit(self._trigger_watchers, *legacy)
+
+    @staticmethod
+    def _run_callback(callback: Callable[[dict], None], changes: dict) -> None:
         try:
-            content = path.read_text(encoding='utf-8')
+            callback(changes)
+        except Exception as e:
+            print(f"[AstraConfig] 订阅回调执行失败: {e}")
+
+    def _publish(self, config: dict) -> None:
+        """发布新配置：冻结为只读快照并预编译路径索引后一次性替换引用（需持有锁）"""
+        snapshot = self._freeze(config)
+        paths: dict[str, Any] = {}
+        self._compile_paths(snapshot, "", paths)
+        self._config = config
+        self._snapshot = snapshot
+        self._paths = paths
+        self._version += 1
+
+    @classmethod
+    def _compile_paths(cls, node: Mapping[str, Any], prefix: str, out: dict) -> None:
+        """将嵌套快照展开为 点式路径 -> 值 的扁平索引（中间节点同样可查）"""
+        for k, v in node.items():
+            path = f"{prefix}{k}"
+            out[path] = v
+            if isinstance(v, Mapping):
+                cls._compile_paths(v, f"{path}.", out)
+
+    @classmethod
+    def _freeze(cls, value: Any) -> Any:
+        """递归冻结：dict -> MappingProxyType，list -> tuple"""
+        if isinstance(value, dict):
+            return MappingProxyType({k: cls._freeze(v) for k, v in value.items()})
+        if isinstance(value, list):
+            return tuple(cls._freeze(v) for v in value)
+        return value
+
+    @classmethod
+    def _thaw(cls, value: Any) -> Any:
+        """_freeze 的逆操作：MappingProxyType -> dict，tuple -> list（深拷贝）"""
+        if isinstance(value, MappingProxyType):
+            return {k: cls._thaw(v) for k, v in value.items()}
+        if isinstance(value, tuple):
+            return [cls._thaw(v) for v in value]
+        return value
+
+    def _read_config(self, path: Path, fmt: str, raw: Optional[bytes] = None) -> dict:
+        try:
+            content = (path.read_bytes() if raw is None else raw).decode('utf-8')
             if fmt == "json":
                 return json.loads(content)
             elif fmt == "yaml":
@@ -186,30 +473,65 @@ class AstraConfig:
         return "json"
 
     def _start_watcher(self) -> None:
-        """启动热加载监控线程"""
+        """启动热加载监控线程：优先 inotify，不可用时回退为轮询"""
         if self._running or self.config_path is None:
             return
 
         self._running = True
-        self._thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self._stop_event = threading.Event()
+        self._inotify = _Inotify.create(self.config_path)
+        if self._inotify is not None:
+            self._reload_stats["backend"] = "inotify"
+            target, args = self._watch_loop_inotify, (self._inotify, self._stop_event)
+        else:
+            self._reload_stats["backend"] = "polling"
+            target, args = self._watch_loop, (self._stop_event,)
+        self._thread = threading.Thread(target=target, args=args, name="AstraConfig-watch", daemon=True)
         self._thread.start()
 
-    def _watch_loop(self) -> None:
+    def _watch_loop(self, stop_event: threading.Event) -> None:
         """轮询检测文件修改"""
-        while self._running:
-            time.sleep(self._polling_interval)
+        while not stop_event.wait(self._polling_interval):
             if not self.config_path or not self.config_path.exists():
                 continue
             try:
                 mtime = self.config_path.stat().st_mtime
                 if mtime > self._last_modified:
-                    self._reload()  # 会加锁
+                    self._reload(force=False)  # 会加锁
             except Exception as e:
                 print(f"[AstraConfig] 热加载检测异常: {e}")
 
+    def _watch_loop_inotify(self, inotify: _Inotify, stop_event: threading.Event) -> None:
+        """inotify 事件驱动：空闲时阻塞在 select 上，不占用 CPU"""
+        try:
+            while not stop_event.is_set():
+                names = inotify.wait(None)
+                if names is None:
+                    return
+                if self.config_path is None or self.config_path.name not in names:
+                    continue
+                # 去抖：等到配置文件静默 _debounce_interval 秒，把一次保存产生的多次写入合并为一次重载
+                # 只有配置文件本身的事件才延长窗口，同目录其他文件的持续写入不会无限推迟重载
+                name = self.config_path.name
+                deadline = time.monotonic() + self._debounce_interval
+                while (remaining := deadline - time.monotonic()) > 0:
+                    names = inotify.wait(remaining)
+                    if names is None:
+                        return
+                    if name in names:
+                        deadline = time.monotonic() + self._debounce_interval
+                if not self.config_path.exists():
+                    continue
+                try:
+                    self._reload(force=False)  # 会加锁
+                except Exception as e:
+                    print(f"[AstraConfig] 热加载检测异常: {e}")
+        finally:
+            inotify.close()
+
     def _trigger_watchers(self, old: dict, new: dict) -> None:
         """触发所有监听器"""
-        for watcher in self._watchers:
+        for watcher in list(self._watchers):
             try:
                 watcher(old, new)
             except Exception as e:
@@ -218,6 +540,11 @@ class AstraConfig:
     def stop_watcher(self):
         """停止热加载线程（可选）"""
         self._running = False
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self._inotify is not None:
+            self._inotify.wake()
+            self._inotify = None
 
 
 # ==================================================================================
@@ -226,7 +553,13 @@ class AstraConfig:
 
 # 使用方式：from config import load, get, reload
 load = AstraConfig.load
+ensure_loaded = AstraConfig.ensure_loaded
+snapshot = AstraConfig.snapshot
+version = AstraConfig.version
 get = AstraConfig.get
 reload = AstraConfig.reload
+reload_stats = AstraConfig.reload_stats
 to_dict = AstraConfig.to_dict
-add_watcher = AstraConfig.add_watcher
\ No newline at end of file
+add_watcher = AstraConfig.add_watcher
+watch = AstraConfig.watch
+unwatch = AstraConfig.unwatch
\ No newline at end of file
@@ -1,24 +1,118 @@
-from openai import AsyncOpenAI
+import asyncio
+import time
+from typing import Any
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from AstraConfig import AstraConfig
 from AstraNex import AstraLogger
-from agents import Agent, Runner, OpenAIChatCompletionsModel, TResponseInputItem
+from AstraNex.AstraLoop import AstraLoop
+from agents import Agent, Runner, OpenAIChatCompletionsModel, RunResultStreaming, TResponseInputItem
 from agents.mcp import MCPServerSse
 
-from config_accessor import OPENAI_API_KEY, OPENAI_API_BASE, OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_PROMPT
+from config_accessor import OPENAI_API_KEY, OPENAI_API_BASE, OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_PROMPT, \
+    MEMORY_SUMMARY_PROMPT
 
 
 class AstraCore:
+    """
+    星核：模型调用
+    AsyncOpenAI 客户端及其 httpx 连接池绑定在 AstraLoop 上，所有模型请求都在该循环中执行，
+    keep-alive 连接（HTTP/2 时为多路复用连接）得以跨请求复用，握手不再出现在请求路径上。
+    """
+
     def __init__(self):
         self.client = None
+        self.http_client: httpx.AsyncClient | None = None
+        self._closed = False
+        self._conn_stats = {
+            "requests": 0,
+            "connections": 0,
+            "tls_handshakes": 0,
+            "handshake_ms": 0.0,
+        }
+        self._handshake_started: dict[int, float] = {}
         self.init_openai()
 
     def init_openai(self):
         AstraLogger.info("正在配置  |星核|  AstraCore")
+        config = AstraConfig.get("AstraCore.http", {})
+        http2 = config.get("http2", True)
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                AstraLogger.warning("未安装 h2，AstraCore 使用 HTTP/1.1 keep-alive 连接")
+                http2 = False
+        self.http_client = DefaultAsyncHttpxClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.get("max_connections", 20),
+                max_keepalive_connections=config.get("max_keepalive_connections", 10),
+                keepalive_expiry=config.get("keepalive_expiry", 60.0),
+            ),
+            timeout=httpx.Timeout(config.get("timeout", 60.0), connect=config.get("connect_timeout", 10.0)),
+            event_hooks={"request": [self._attach_trace]},
+        )
         self.client = AsyncOpenAI(
                 base_url=OPENAI_API_BASE.value,
                 api_key=OPENAI_API_KEY.value,
+                http_client=self.http_client,
         )
+
+    # ==================================================================================
+    # 连接复用统计（httpcore trace 事件）
+    # ==================================================================================
+
+    async def _attach_trace(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = self._trace
+        self._conn_stats["requests"] += 1
+
+    async def _trace(self, event_name: str, info: dict[str, Any]) -> None:
+        """httpcore 在发起请求的任务中依次回调 *.started / *.complete，以当前任务区分并发的握手"""
+        if event_name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+            self._handshake_started[id(asyncio.current_task())] = time.perf_counter()
+        elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            started = self._handshake_started.pop(id(asyncio.current_task()), None)
+            if started is not None:
+                self._conn_stats["handshake_ms"] += (time.perf_counter() - started) * 1000
+            self._conn_stats["connections" if event_name == "connection.connect_tcp.complete" else "tls_handshakes"] += 1
+        elif event_name in ("connection.connect_tcp.failed", "connection.start_tls.failed"):
+            self._handshake_started.pop(id(asyncio.current_task()), None)
+
+    def connection_stats(self) -> dict:
+        """模型请求的连接复用统计：reuse_rate 为未新建连接的请求占比"""
+        stats = dict(self._conn_stats)
+        requests = stats["requests"]
+        stats["reuse_rate"] = 1 - stats["connections"] / requests if requests else 0.0
+        stats["handshake_ms"] = round(stats["handshake_ms"], 2)
+        return stats
+
+    async def warmup(self) -> None:
+        """预先建立到模型服务的连接，首个请求不再承担 TCP/TLS 握手"""
+        try:
+            await self.http_client.get(f"{str(OPENAI_API_BASE.value).rstrip('/')}/models",
+                                       headers={"Authorization": f"Bearer {OPENAI_API_KEY.value}"})
+        except httpx.HTTPError as e:
+            AstraLogger.warning(f"AstraCore 预热连接失败: {e!r}")
+
+    async def aclose(self) -> None:
+        """关闭连接池（需在 AstraLoop 上调用）"""
+        if self._closed:
+            return
+        self._closed = True
+        await self.client.close()
+        AstraLogger.info(f"AstraCore 连接统计: {self.connection_stats()}")
+
+    def close(self) -> None:
+        """同步关闭连接池（在 AstraLoop 上执行，可重复调用）"""
+        AstraLoop.run_sync(self.aclose())
+
     async def _run_chat_openai_async(self, message: list):
-        """星核初燃，异步回响"""
+        """星核初燃，异步回响（从其他事件循环调用时转交到 AstraLoop 执行）"""
+        return await AstraLoop.run(self._chat(message))
+
+    async def _chat(self, message: list):
         try:
             response = await self.client.chat.completions.create(
                 model=OPENAI_MODEL.value,
@@ -32,9 +126,19 @@ class AstraCore:
             # 捕获异常并返回错误信息
             raise Exception(f"Error occurred: {str(e)}")
 
-    async def run_agent(self,mcp_server_list: list[MCPServerSse],message: str | list[TResponseInputItem]):
+    async def summarize(self, messages: list, previous_summary: str = "") -> str:
+        """星核凝练，旧忆成章：把较早的对话连同已有摘要压缩为新摘要"""
+        transcript = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in messages)
+        if previous_summary:
+            transcript = f"已有摘要：\n{previous_summary}\n\n新增对话：\n{transcript}"
+        response = await self._run_chat_openai_async([
+            {"role": "system", "content": MEMORY_SUMMARY_PROMPT.value},
+            {"role": "user", "content": transcript},
+        ])
+        return response.choices[0].message.content
 
-        agent = Agent(
+    def _build_agent(self, mcp_server_list: list[MCPServerSse]) -> Agent:
+        return Agent(
             name="Assistant",
             instructions=OPENAI_PROMPT.value,
             mcp_servers=mcp_server_list,
@@ -44,10 +148,22 @@ class AstraCore:
             ),
         )
 
+    async def run_agent(self,mcp_server_list: list[MCPServerSse],message: str | list[TResponseInputItem]):
+
+        agent = self._build_agent(mcp_server_list)
+
         AstraLogger.info(f"Running: {message}")
         result = await Runner.run(starting_agent=agent, input=message)
         return result
 
+    def run_agent_streamed(self, mcp_server_list: list[MCPServerSse],
+                           message: str | list[TResponseInputItem]) -> RunResultStreaming:
+        """星核流转，逐字回响：以流式方式运行 agent（需在事件循环中调用，通过 stream_events() 读取事件）"""
+        agent = self._build_agent(mcp_server_list)
+
+        AstraLogger.info(f"Running (streamed): {message}")
+        return Runner.run_streamed(starting_agent=agent, input=message)
+
 # async def main():
 #     AstraConfig.load(r"../config/config.json")
 #     a = AstraCore()
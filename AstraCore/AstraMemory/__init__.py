@@ -1,7 +1,26 @@
-from .memory import AstraMemoryJson
+from .memory import AstraMemory
+from .memory_base import AstraMemoryBackend
+from .memory_cache import AstraMemoryCache
+from .memory_context import AstraMemoryContext
+from .memory_json import AstraMemoryJsonFile
+from .memory_log import AstraMemoryLog
+from .memory_sqlite import AstraMemorySqlite
+from .memory_summary import AstraMemorySummarizer
+from .memory_type import AstraMemoryJson
+from .memory_vector import AstraMemoryRecall, Embedder, HashingEmbedder
 
 
 __all__ = [
-
-
+    "AstraMemory",
+    "AstraMemoryBackend",
+    "AstraMemoryCache",
+    "AstraMemoryContext",
+    "AstraMemoryJsonFile",
+    "AstraMemoryLog",
+    "AstraMemorySqlite",
+    "AstraMemorySummarizer",
+    "AstraMemoryJson",
+    "AstraMemoryRecall",
+    "Embedder",
+    "HashingEmbedder",
 ]
\ No newline at end of file
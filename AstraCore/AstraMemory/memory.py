@@ -1,18 +1,242 @@
 """
 Astra Echo的多种memory配置方案
 
-
+  - json: 单 JSON 文件（旧方案，每轮整体读写）
+  - log : 追加写日志 + 偏移索引（默认）
+  - sqlite: 与 AstraChart 共用数据库，按 (device, id, seq) 索引
+
+后端由配置 AstraMemory.backend 选择，也可直接传入 AstraMemoryBackend 实例；
+AstraMemory.cache.enabled 为 true 时在后端外层包一层活跃会话缓存（AstraMemoryCache）。
+build_context 负责把会话按 token 预算裁剪后交给 AstraCore（AstraMemoryContext）；
+启用 AstraMemory.summary 后，长会话以 "滚动摘要 + 最近消息" 的形式组装（AstraMemorySummarizer）。
+启用 AstraMemory.search 后，写入的消息同时交给全文检索索引（通常是 AstraChart.search）。
+启用 AstraMemory.recall 后，上下文只带最近 recent 条消息，更早的消息按与本轮输入的
+向量相似度召回 top_k 条（AstraMemoryRecall）。
 """
+from typing import Iterable, Iterator, List, Mapping, Optional, Protocol
+
+from openai.types.responses import EasyInputMessageParam
+
+from AstraConfig import AstraConfig
+from config_accessor import MEMORY_CONTEXT_TOKENS, MEMORY_CONTEXT_MESSAGES
+from AstraNex.AstraLogger import AstraLogger
 from utils import JsonLoader, JsonWriter
+from .memory_base import AstraMemoryBackend
+from .memory_cache import AstraMemoryCache
+from .memory_context import AstraMemoryContext, estimate_tokens
+from .memory_json import AstraMemoryJsonFile
+from .memory_log import AstraMemoryLog
+from .memory_sqlite import AstraMemorySqlite
+from .memory_summary import AstraMemorySummarizer, SummaryClient
 from .memory_type import AstraMemoryJson
+# memory_vector 导入时不依赖 NumPy，NumPy 只在 enable_recall 实际创建召回存储时加载
+from .memory_vector import AstraMemoryRecall, HashingEmbedder, message_text
+
 
+class SearchIndex(Protocol):
+    def index_memory(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        ...
 
+    def replace_memory(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        ...
 
+    def backfill_memory(self, conversations: Iterable[tuple[int, str, List[EasyInputMessageParam]]]) -> int:
+        ...
 
 
 class AstraMemory:
-    def __init__(self):
-        pass
+    def __init__(self, backend: Optional[AstraMemoryBackend] = None):
+        self.backend: AstraMemoryBackend = backend or self.create_backend(AstraConfig.get("AstraMemory", {}))
+        self.context = AstraMemoryContext()
+        self.summarizer: Optional[AstraMemorySummarizer] = None
+        self.search_index: Optional[SearchIndex] = None
+        self.recall: Optional[AstraMemoryRecall] = None
+        self.recall_options: Mapping = {}
+
+    @classmethod
+    def create_backend(cls, options: Mapping) -> AstraMemoryBackend:
+        """按配置创建存储后端（按需包一层缓存）"""
+        backend = cls._create_store(options)
+        cache = options.get("cache", {})
+        if not cache.get("enabled", False):
+            return backend
+        return AstraMemoryCache(
+            backend,
+            max_bytes=cache.get("max_bytes", 64 * 1024 * 1024),
+            max_entries=cache.get("max_entries", 1024),
+            ttl=cache.get("ttl", 1800.0),
+            flush_interval=cache.get("flush_interval", 1.0),
+        )
+
+    @staticmethod
+    def _create_store(options: Mapping) -> AstraMemoryBackend:
+        kind = options.get("backend", "log")
+        json_path = options.get("json_path", "memory_test/agent_memory.json")
+        if kind == "json":
+            return AstraMemoryJsonFile(json_path)
+        if kind == "log":
+            return AstraMemoryLog(
+                options.get("log_path", "memory_test/agent_memory.log"),
+                fsync_interval=options.get("fsync_interval", 0.2),
+                fsync_batch=options.get("fsync_batch", 64),
+                legacy_json_path=json_path,
+            )
+        if kind == "sqlite":
+            return AstraMemorySqlite(options.get("db_path") or AstraConfig.get("AstraChart.db_path"))
+        raise ValueError(f"不支持的 memory 后端: {kind}")
+
+    def enable_summary(self, client: SummaryClient) -> None:
+        """按配置 AstraMemory.summary 启用滚动摘要，client 通常是 AstraCore"""
+        options = AstraConfig.get("AstraMemory.summary", {})
+        if not options.get("enabled", False):
+            return
+        self.summarizer = AstraMemorySummarizer(
+            self.backend,
+            client,
+            threshold=options.get("threshold", 60),
+            keep_recent=options.get("keep_recent", 20),
+            min_interval=options.get("min_interval", 10.0),
+        )
+
+    def enable_search(self, index: SearchIndex) -> None:
+        """
+        按配置 AstraMemory.search 启用全文检索索引，index 通常是 AstraChart.search
+        启用前先把索引建立之前已有的会话一次性回填（只执行一次，由索引记录是否已完成）
+        """
+        if not AstraConfig.get("AstraMemory.search", {}).get("enabled", False):
+            return
+        try:
+            index.backfill_memory(self._iter_conversations())
+        except NotImplementedError as e:
+            AstraLogger.warning(f"memory 检索索引无法回填已有会话: {e}")
+        except Exception as e:
+            AstraLogger.error(f"memory 检索索引回填失败，下次启动时重试: {e}")
+        self.search_index = index
+
+    def _iter_conversations(self) -> Iterator[tuple[int, str, List[EasyInputMessageParam]]]:
+        for conversation_id, device in self.backend.conversations():
+            yield conversation_id, device, self.backend.load(conversation_id, device)["memory"]
+
+    def enable_recall(self, recall: Optional[AstraMemoryRecall] = None) -> None:
+        """
+        按配置 AstraMemory.recall 启用向量召回
+
+        Args:
+            recall: 自定义的召回存储（如替换了 embedder），为 None 时按配置创建（使用 HashingEmbedder）
+
+        启用前把已有会话一次性回填进召回存储（由 meta.json 记录是否已完成）
+        """
+        self.recall_options = AstraConfig.get("AstraMemory.recall", {})
+        if recall is None:
+            if not self.recall_options.get("enabled", False):
+                return
+            recall = AstraMemoryRecall(self.recall_options.get("path", "memory_test/recall"),
+                                       HashingEmbedder(self.recall_options.get("dim", 256)),
+                                       flush_interval=self.recall_options.get("flush_interval", 1.0))
+        # 启用后上下文只带最近 recent 条，更早的消息只能靠召回取回：先为已有会话回填向量（只执行一次）
+        try:
+            backfilled = recall.backfill(self._iter_conversations())
+            if backfilled:
+                AstraLogger.info(f"向量召回已回填 {backfilled} 条已有消息")
+        except NotImplementedError as e:
+            AstraLogger.warning(f"向量召回无法回填已有会话: {e}")
+        except Exception as e:
+            AstraLogger.error(f"向量召回回填失败，下次启动时重试: {e}")
+        self.recall = recall
+
+    def load(self, conversation_id: int, device: str, limit: Optional[int] = None) -> AstraMemoryJson:
+        return self.backend.load(conversation_id, device, limit)
+
+    def append(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        self.backend.append(conversation_id, device, messages)
+        if self.recall is not None:
+            try:
+                self.recall.add(conversation_id, device, messages)
+            except Exception as e:
+                AstraLogger.error(f"memory 向量写入失败: {e}")
+        if self.search_index is not None:
+            try:
+                self.search_index.index_memory(conversation_id, device, messages)
+            except Exception as e:
+                AstraLogger.error(f"memory 检索索引入队失败: {e}")
+        if self.summarizer is not None:
+            try:
+                self.summarizer.maybe_schedule(conversation_id, device)
+            except Exception as e:
+                AstraLogger.error(f"摘要任务入队失败: {e}")
+
+    def replace(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        self.backend.replace(conversation_id, device, messages)
+        if self.recall is not None:
+            try:
+                self.recall.replace(conversation_id, device, messages)
+            except Exception as e:
+                AstraLogger.error(f"memory 向量写入失败: {e}")
+        if self.search_index is not None:
+            try:
+                self.search_index.replace_memory(conversation_id, device, messages)
+            except Exception as e:
+                AstraLogger.error(f"memory 检索索引入队失败: {e}")
+
+    def build_context(self, conversation_id: int, device: str,
+                      new_messages: List[EasyInputMessageParam],
+                      system_prompt: str = "") -> List[EasyInputMessageParam]:
+        """
+        组装发送给 agent 的上下文：最近的历史 + 本轮新消息，按 token 预算裁剪
+
+        Args:
+            conversation_id: 会话 id
+            device: 设备标识
+            new_messages: 本轮尚未写入 memory 的消息（如用户输入）
+            system_prompt: agent instructions，其 token 数从预算中预留
+        """
+        limit = MEMORY_CONTEXT_MESSAGES.value
+        head: List[EasyInputMessageParam] = []
+        summary = self.backend.load_summary(conversation_id, device)
+        if summary:
+            # 已被摘要覆盖的消息不再读取，以摘要代替
+            limit = min(limit, max(self.backend.count(conversation_id, device) - summary["covered"], 0))
+            head.append({"role": "system", "content": f"以下是此前对话的摘要：\n{summary['content']}"})
+        if self.recall is not None and new_messages:
+            # 只带最近 recent 条消息，更早的消息按相关度召回
+            limit = min(limit, self.recall_options.get("recent", 20))
+            head.extend(self._recall(conversation_id, device, new_messages[-1], exclude_recent=limit))
+        memory = self.load(conversation_id, device, limit=limit)
+        messages = head + memory["memory"] + list(new_messages)
+        return self.context.assemble(messages, MEMORY_CONTEXT_TOKENS.value, reserve=estimate_tokens(system_prompt))
+
+    def _recall(self, conversation_id: int, device: str, query: EasyInputMessageParam,
+                exclude_recent: int) -> List[EasyInputMessageParam]:
+        try:
+            hits = self.recall.search(conversation_id, device, message_text(query),
+                                      k=self.recall_options.get("top_k", 4),
+                                      exclude_recent=exclude_recent,
+                                      min_score=self.recall_options.get("min_score", 0.1))
+        except Exception as e:
+            AstraLogger.error(f"memory 向量召回失败: {e}")
+            return []
+        if not hits:
+            return []
+        lines = "\n".join(f"{m.get('role')}: {message_text(m)}" for _, _, m in hits)
+        return [{"role": "system", "content": f"以下是较早对话中与当前问题相关的消息：\n{lines}"}]
+
+    def flush(self) -> None:
+        self.backend.flush()
+
+    def close(self) -> None:
+        """关闭前会把缓存中尚未写回的消息全部落盘"""
+        if self.summarizer is not None:
+            self.summarizer.close(timeout=5)
+        if self.recall is not None:
+            self.recall.close()
+        self.backend.close()
+
+    def stats(self) -> dict:
+        """缓存统计（未启用缓存时为空）"""
+        if isinstance(self.backend, AstraMemoryCache):
+            return self.backend.stats()
+        return {}
+
     @staticmethod
     def load_json_memory(path:str)->AstraMemoryJson:
         memory = JsonLoader.load_json_file(path)
@@ -21,12 +245,3 @@ class AstraMemory:
     @staticmethod
     def write_json_memory(memory:AstraMemoryJson,path:str):
         JsonWriter.write_json(memory,path)
-
-
-
-
-
-
-
-
-
@@ -0,0 +1,65 @@
+"""
+AstraMemory 存储后端基类
+
+一个会话由 (device, id) 唯一确定，后端只需支持按会话读取、追加与整体替换。
+"""
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from openai.types.responses import EasyInputMessageParam
+
+from .memory_type import AstraMemoryJson, AstraMemorySummary
+
+
+class AstraMemoryBackend(ABC):
+    """memory 存储后端，子类需保证 append 对并发调用是原子的（不丢轮次）"""
+
+    @abstractmethod
+    def load(self, conversation_id: int, device: str, limit: Optional[int] = None) -> AstraMemoryJson:
+        """
+        读取会话
+
+        Args:
+            conversation_id: 会话 id
+            device: 设备标识
+            limit: 只取最近的 limit 条消息，None 表示全部
+
+        Returns:
+            AstraMemoryJson，会话不存在时 memory 为空列表
+        """
+
+    @abstractmethod
+    def append(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        """向会话末尾追加消息（一次调用内的消息保持连续）"""
+
+    @abstractmethod
+    def replace(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        """用给定消息整体替换会话内容"""
+
+    def count(self, conversation_id: int, device: str) -> int:
+        """会话消息总数（子类应提供不读取消息内容的实现）"""
+        return len(self.load(conversation_id, device)["memory"])
+
+    def conversations(self) -> list[tuple[int, str]]:
+        """
+        列出全部非空会话的 (conversation_id, device)，用于检索索引等一次性回填
+
+        Raises:
+            NotImplementedError: 后端不支持枚举会话
+        """
+        raise NotImplementedError(f"{type(self).__name__} 不支持枚举会话")
+
+    @abstractmethod
+    def load_summary(self, conversation_id: int, device: str) -> Optional[AstraMemorySummary]:
+        """读取会话的滚动摘要，没有时返回 None"""
+
+    @abstractmethod
+    def save_summary(self, conversation_id: int, device: str, summary: AstraMemorySummary) -> None:
+        """保存会话的滚动摘要（覆盖旧摘要；replace 会话时摘要随之失效）"""
+
+    def flush(self) -> None:
+        """将缓冲中的写入持久化"""
+
+    def close(self) -> None:
+        """关闭后端，释放文件 / 连接"""
+        self.flush()
@@ -0,0 +1,309 @@
+"""
+活跃会话的进程内缓存
+
+以装饰器方式包在任意 AstraMemoryBackend 外层：
+  - LRU + 空闲 TTL：按 (device, id) 缓存完整会话，超出字节预算 / 条目上限时淘汰最久未用的会话
+  - write-behind：追加先进缓存，后台线程按间隔批量写回后端；淘汰、过期、flush、close 时同样写回
+  - 统计命中 / 未命中 / 淘汰次数
+锁分两层：_lock 只保护缓存自身的状态，持有时间很短，不做任何后端 I/O；
+后端读取与写回在按会话分片的锁内进行，同一会话的后端操作串行（不丢写、不乱序），不同会话互不阻塞。
+写回时先在 _lock 内取下待写内容的快照，再在锁外写后端，失败时把内容重新标记为脏。
+被淘汰 / 过期的脏会话在写回成功前保留在 _evicted 中，期间的读写仍以它为准。
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from openai.types.responses import EasyInputMessageParam
+
+from AstraNex.AstraLogger import AstraLogger
+from .memory_base import AstraMemoryBackend
+from .memory_type import AstraMemoryJson, AstraMemorySummary
+
+_MESSAGE_OVERHEAD = 64  # 每条消息 dict 自身的大致开销（字节）
+_KEY_LOCKS = 64         # 会话锁分片数
+
+
+class _CacheEntry:
+    __slots__ = ("memory", "size", "expires_at", "pending", "reset")
+
+    def __init__(self, memory: list, size: int, expires_at: float):
+        self.memory = memory        # 完整会话消息
+        self.size = size            # 估算占用字节数
+        self.expires_at = expires_at
+        self.pending: list = []     # 尚未写回后端的追加消息
+        self.reset = False          # True 表示需要以 replace 写回整个会话
+
+
+class AstraMemoryCache(AstraMemoryBackend):
+    def __init__(self,
+                 backend: AstraMemoryBackend,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 max_entries: int = 1024,
+                 ttl: float = 1800.0,
+                 flush_interval: float = 1.0):
+        """
+        Args:
+            backend: 被缓存的存储后端
+            max_bytes: 缓存内存预算（按消息 JSON 长度估算）
+            max_entries: 最多缓存的会话数
+            ttl: 会话空闲超过该秒数后失效
+            flush_interval: 后台写回间隔（秒）
+        """
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(_KEY_LOCKS)]
+        self._entries: "OrderedDict[tuple[str, int], _CacheEntry]" = OrderedDict()
+        self._evicted: dict[tuple[str, int], _CacheEntry] = {}  # 已移出 LRU、尚未写回成功的脏会话
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="AstraMemoryCache-flush", daemon=True)
+        self._flusher.start()
+
+    # ==================================================================================
+    # 后端接口
+    # ==================================================================================
+
+    def load(self, conversation_id: int, device: str, limit: Optional[int] = None) -> AstraMemoryJson:
+        key = (device, conversation_id)
+        evicted: list = []
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._get_entry(key, evicted)
+                if entry is not None:
+                    self._hits += 1
+                    messages = entry.memory
+                else:
+                    self._misses += 1
+            if entry is None:
+                messages = self.backend.load(conversation_id, device)["memory"]
+                with self._lock:
+                    self._put_entry(key, messages, evicted)
+            if limit is not None:
+                messages = messages[-limit:] if limit > 0 else []
+            # 返回列表副本，调用方追加消息不会污染缓存
+            result: AstraMemoryJson = {"id": conversation_id, "device": device, "memory": list(messages)}
+        self._flush_keys(evicted)
+        return result
+
+    def append(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        key = (device, conversation_id)
+        evicted: list = []
+        with self._key_lock(key):
+            with self._lock:
+                self._check_open()
+                entry = self._get_entry(key, evicted)
+                if entry is not None:
+                    entry.memory.extend(messages)
+                    entry.pending.extend(messages)
+                    added = sum(self._message_size(m) for m in messages)
+                    entry.size += added
+                    self._bytes += added
+                    self._evict(evicted)
+            if entry is None:
+                # 未缓存的会话不知道完整历史，直接写穿
+                self.backend.append(conversation_id, device, messages)
+        self._flush_keys(evicted)
+
+    def replace(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        key = (device, conversation_id)
+        evicted: list = []
+        with self._key_lock(key):
+            with self._lock:
+                self._check_open()
+                # 旧的待写回内容被整体覆盖，无需写回
+                self._evicted.pop(key, None)
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old.size
+                entry = self._put_entry(key, list(messages), evicted)
+                if entry is not None:
+                    entry.reset = True
+            if entry is None:
+                self.backend.replace(conversation_id, device, messages)
+        self._flush_keys(evicted)
+
+    def count(self, conversation_id: int, device: str) -> int:
+        key = (device, conversation_id)
+        with self._lock:
+            entry = self._evicted.get(key) or self._entries.get(key)
+            if entry is not None:
+                return len(entry.memory)
+        return self.backend.count(conversation_id, device)
+
+    def conversations(self) -> list[tuple[int, str]]:
+        # 先写回脏数据，只在缓存中的会话也能被后端列出
+        self.flush()
+        return self.backend.conversations()
+
+    def load_summary(self, conversation_id: int, device: str) -> Optional[AstraMemorySummary]:
+        return self.backend.load_summary(conversation_id, device)
+
+    def save_summary(self, conversation_id: int, device: str, summary: AstraMemorySummary) -> None:
+        key = (device, conversation_id)
+        with self._key_lock(key):
+            # 先写回待定的 replace，避免其稍后写回时把新摘要一起清掉
+            self._write_back(key)
+            self.backend.save_summary(conversation_id, device, summary)
+
+    def flush(self) -> None:
+        with self._lock:
+            keys = list(self._evicted) + list(self._entries)
+        self._flush_keys(keys, raise_errors=True)
+        self.backend.flush()
+
+    def close(self) -> None:
+        """停止后台写回线程，写回全部脏数据后关闭后端"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        self.backend.close()
+
+    def stats(self) -> dict:
+        """缓存统计"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "dirty": sum(1 for e in self._entries.values() if e.pending or e.reset) + len(self._evicted),
+            }
+
+    # ==================================================================================
+    # 内部实现（带 _locked 语义的方法由调用方持有 _lock）
+    # ==================================================================================
+
+    @staticmethod
+    def _message_size(message: EasyInputMessageParam) -> int:
+        return len(json.dumps(message, ensure_ascii=False)) + _MESSAGE_OVERHEAD
+
+    def _key_lock(self, key: tuple[str, int]) -> threading.Lock:
+        return self._key_locks[hash(key) % _KEY_LOCKS]
+
+    def _check_open(self) -> None:
+        if self._closed.is_set():
+            raise RuntimeError("memory 缓存已关闭")
+
+    def _get_entry(self, key: tuple[str, int], evicted: list) -> Optional[_CacheEntry]:
+        """
+        查找会话（需持有 _lock）；尚未写回的已淘汰会话重新放回 LRU。
+        过期的脏会话同样续期而不丢弃：后端中的副本缺少待写回的消息，不能用它代替
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is None:
+            entry = self._evicted.pop(key, None)
+            if entry is None:
+                return None
+            self._entries[key] = entry
+            self._bytes += entry.size
+        elif entry.expires_at <= now and not (entry.pending or entry.reset):
+            self._drop_entry(key, evicted)
+            return None
+        entry.expires_at = now + self.ttl
+        self._entries.move_to_end(key)
+        self._evict(evicted)
+        return self._entries.get(key)
+
+    def _put_entry(self, key: tuple[str, int], memory: list, evicted: list) -> Optional[_CacheEntry]:
+        """放入缓存（需持有 _lock）；单个会话超过整个预算时不缓存，返回 None"""
+        size = sum(self._message_size(m) for m in memory)
+        if size > self.max_bytes:
+            return None
+        entry = _CacheEntry(memory, size, time.monotonic() + self.ttl)
+        self._entries[key] = entry
+        self._bytes += size
+        self._evict(evicted)
+        return self._entries.get(key)
+
+    def _drop_entry(self, key: tuple[str, int], evicted: list) -> None:
+        """
+        移出 LRU（需持有 _lock）。脏会话转入 _evicted 并记入 evicted，
+        由调用方在释放锁后写回，写回成功才真正丢弃
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        if entry.pending or entry.reset:
+            self._evicted[key] = entry
+            evicted.append(key)
+
+    def _evict(self, evicted: list) -> None:
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            self._drop_entry(next(iter(self._entries)), evicted)
+            self._evictions += 1
+
+    def _write_back(self, key: tuple[str, int]) -> None:
+        """
+        写回一个会话（需持有该会话的分片锁、不持有 _lock）
+        在 _lock 内取快照，锁外写后端；失败时重新标记为脏并抛出
+        """
+        with self._lock:
+            # _evicted 中的会话含有尚未写回的内容，优先于 LRU 中的条目
+            entry = self._evicted.get(key) or self._entries.get(key)
+            if entry is None:
+                return
+            reset, pending = entry.reset, entry.pending
+            memory = list(entry.memory) if reset else None
+            entry.pending = []
+            entry.reset = False
+        device, conversation_id = key
+        try:
+            if reset:
+                self.backend.replace(conversation_id, device, memory)
+            elif pending:
+                self.backend.append(conversation_id, device, pending)
+        except Exception:
+            with self._lock:
+                if reset:
+                    entry.reset = True  # entry.memory 已包含快照之后的追加
+                else:
+                    entry.pending = pending + entry.pending
+            raise
+        with self._lock:
+            if self._evicted.get(key) is entry and not (entry.pending or entry.reset):
+                del self._evicted[key]
+
+    def _flush_keys(self, keys: list, raise_errors: bool = False) -> None:
+        """逐个会话写回（调用方不得持有任何锁）"""
+        error: Optional[Exception] = None
+        for key in keys:
+            try:
+                with self._key_lock(key):
+                    self._write_back(key)
+            except Exception as e:
+                AstraLogger.error(f"[AstraMemoryCache] 写回失败 {key}: {e}")
+                error = error or e
+        if error is not None and raise_errors:
+            raise error
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            try:
+                evicted: list = []
+                with self._lock:
+                    now = time.monotonic()
+                    for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+                        self._drop_entry(key, evicted)
+                    dirty = [k for k, e in self._entries.items() if e.pending or e.reset]
+                    keys = list(self._evicted) + dirty
+                self._flush_keys(keys)
+            except Exception as e:
+                AstraLogger.error(f"[AstraMemoryCache] 写回失败: {e}")
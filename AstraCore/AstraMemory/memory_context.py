@@ -0,0 +1,82 @@
+"""
+上下文组装：在 AstraMemory 与 AstraCore 之间按 token 预算裁剪历史
+
+  - 会话开头的 system 消息始终保留
+  - 从最新一条往前累加，直到用完预算；最新一条无论多长都保留
+  - token 数用本地快速估算（CJK 按 1 字 1 token，其余按 4 字符 1 token），
+    按消息内容缓存，每次请求只需估算新出现的消息
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import List
+
+from openai.types.responses import EasyInputMessageParam
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_MESSAGE_OVERHEAD_TOKENS = 4  # 每条消息的角色 / 分隔符开销
+_SYSTEM_ROLES = ("system", "developer")
+
+
+def estimate_tokens(text: str) -> int:
+    """估算一段文本的 token 数"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class AstraMemoryContext:
+    def __init__(self, cache_size: int = 65536):
+        """
+        Args:
+            cache_size: token 数缓存的最大条目数（LRU）
+        """
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple[str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, message: EasyInputMessageParam) -> int:
+        """单条消息的 token 数（带缓存）"""
+        content = message.get("content", "")
+        if not isinstance(content, str):
+            content = str(content)
+        key = (message.get("role", ""), content)
+        with self._lock:
+            tokens = self._cache.get(key)
+            if tokens is not None:
+                self._cache.move_to_end(key)
+                return tokens
+        tokens = estimate_tokens(content) + _MESSAGE_OVERHEAD_TOKENS
+        with self._lock:
+            self._cache[key] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def assemble(self, messages: List[EasyInputMessageParam], max_tokens: int,
+                 reserve: int = 0) -> List[EasyInputMessageParam]:
+        """
+        按预算裁剪消息列表
+
+        Args:
+            messages: 按时间顺序排列的完整消息（最后一条通常是本轮用户输入）
+            max_tokens: 上下文 token 预算
+            reserve: 预留给 agent instructions 等固定内容的 token 数
+
+        Returns:
+            开头的 system 消息 + 预算内最近的若干条消息
+        """
+        head = 0
+        while head < len(messages) and messages[head].get("role") in _SYSTEM_ROLES:
+            head += 1
+        budget = max_tokens - reserve - sum(self.count(m) for m in messages[:head])
+
+        start = len(messages)
+        while start > head:
+            tokens = self.count(messages[start - 1])
+            if tokens > budget and start < len(messages):
+                break
+            budget -= tokens
+            start -= 1
+        return messages[:head] + messages[start:]
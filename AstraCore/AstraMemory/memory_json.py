@@ -0,0 +1,64 @@
+"""
+单 JSON 文件 memory 后端（旧方案）
+
+每次读取解析整个文件、每次写入重写整个文件，代价随历史长度线性增长，
+仅保留用于兼容与基准对比。滚动摘要只保存在进程内存中。
+"""
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from openai.types.responses import EasyInputMessageParam
+
+from utils import JsonLoader, JsonWriter
+from .memory_base import AstraMemoryBackend
+from .memory_type import AstraMemoryJson, AstraMemorySummary
+
+
+class AstraMemoryJsonFile(AstraMemoryBackend):
+    """整个文件即一个会话：{"id": ..., "device": ..., "memory": [...]}"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._summaries: dict[tuple[str, int], AstraMemorySummary] = {}
+
+    def _read(self, conversation_id: int, device: str) -> AstraMemoryJson:
+        if self.path.exists():
+            memory = JsonLoader.load_json_file(self.path)
+            if memory.get("id") == conversation_id and memory.get("device") == device:
+                return memory
+        return {"id": conversation_id, "device": device, "memory": []}
+
+    def load(self, conversation_id: int, device: str, limit: Optional[int] = None) -> AstraMemoryJson:
+        with self._lock:
+            memory = self._read(conversation_id, device)
+        if limit is not None:
+            memory["memory"] = memory["memory"][-limit:] if limit > 0 else []
+        return memory
+
+    def append(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        with self._lock:
+            memory = self._read(conversation_id, device)
+            memory["memory"].extend(messages)
+            JsonWriter.write_json(memory, self.path)
+
+    def replace(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        with self._lock:
+            JsonWriter.write_json({"id": conversation_id, "device": device, "memory": list(messages)}, self.path)
+            self._summaries.pop((device, conversation_id), None)
+
+    def conversations(self) -> list[tuple[int, str]]:
+        with self._lock:
+            if not self.path.exists():
+                return []
+            memory = JsonLoader.load_json_file(self.path)
+        return [(memory["id"], memory["device"])] if memory.get("memory") else []
+
+    def load_summary(self, conversation_id: int, device: str) -> Optional[AstraMemorySummary]:
+        with self._lock:
+            return self._summaries.get((device, conversation_id))
+
+    def save_summary(self, conversation_id: int, device: str, summary: AstraMemorySummary) -> None:
+        with self._lock:
+            self._summaries[(device, conversation_id)] = summary
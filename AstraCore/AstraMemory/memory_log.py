@@ -0,0 +1,311 @@
+"""
+追加写日志 memory 后端
+
+日志文件为 JSON Lines，每行一条记录：
+  {"op": "append", "id": 1, "device": "114514", "message": {...}}
+  {"op": "reset",  "id": 1, "device": "114514"}      # replace 时写入，该会话此前的记录作废
+  {"op": "summary", "id": 1, "device": "114514", "summary": {...}}   # 滚动摘要，新的覆盖旧的
+
+内存中维护 (device, id) -> [(offset, length), ...] 的偏移索引：
+  - 追加一轮对话只写日志尾部，与历史长度无关
+  - 读取会话只 seek 该会话自己的记录，不解析整个文件
+  - fsync 按条数 / 时间窗口合并（group commit），flush() 可强制落盘
+  - 作废记录占比过高时后台压缩：写临时文件 -> fsync -> 原子替换
+  - 启动时重放日志重建索引，进程崩溃留下的残缺尾行会被截断
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from openai.types.responses import EasyInputMessageParam
+
+from AstraNex.AstraLogger import AstraLogger
+from utils import JsonLoader
+from .memory_base import AstraMemoryBackend
+from .memory_type import AstraMemoryJson, AstraMemorySummary
+
+
+class AstraMemoryLog(AstraMemoryBackend):
+    def __init__(self,
+                 path: str,
+                 fsync_interval: float = 0.2,
+                 fsync_batch: int = 64,
+                 compact_ratio: float = 0.5,
+                 compact_min_records: int = 1024,
+                 legacy_json_path: Optional[str] = None):
+        """
+        Args:
+            path: 日志文件路径
+            fsync_interval: 后台 fsync 的合并窗口（秒）
+            fsync_batch: 未落盘记录达到该条数时立即 fsync
+            compact_ratio: 作废记录占比超过该值时触发压缩
+            compact_min_records: 作废记录少于该条数时不压缩
+            legacy_json_path: 新建日志文件时从旧的单 JSON 文件导入会话
+        """
+        self.path = Path(path)
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._index: dict[tuple[str, int], list[tuple[int, int]]] = {}
+        self._summaries: dict[tuple[str, int], tuple[int, int]] = {}  # 每个会话最新摘要记录的位置
+        self._size = 0      # 日志有效末尾偏移
+        self._dead = 0      # 已作废的记录数（含 reset 记录本身）
+        self._pending = 0   # 已写入但未 fsync 的记录数
+        self._closed = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        created = not self.path.exists()
+        self._file = open(self.path, "a+b", buffering=0)
+        self._rebuild_index()
+        # 只在新建日志时导入；已有日志即使索引为空（会话都被清空 / 压缩为空文件）也不再导入，避免找回已删除的历史
+        if created and legacy_json_path and Path(legacy_json_path).exists():
+            self._import_legacy(legacy_json_path)
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="AstraMemoryLog-flush", daemon=True)
+        self._flusher.start()
+
+    # ==================================================================================
+    # 后端接口
+    # ==================================================================================
+
+    def load(self, conversation_id: int, device: str, limit: Optional[int] = None) -> AstraMemoryJson:
+        with self._lock:
+            entries = self._index.get((device, conversation_id), [])
+            if limit is not None:
+                entries = entries[-limit:] if limit > 0 else []
+            lines = self._read_entries(entries)
+        return {
+            "id": conversation_id,
+            "device": device,
+            "memory": [json.loads(line)["message"] for line in lines],
+        }
+
+    def append(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        records = [{"op": "append", "id": conversation_id, "device": device, "message": m} for m in messages]
+        with self._lock:
+            self._write_records((device, conversation_id), records)
+
+    def replace(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        records = [{"op": "reset", "id": conversation_id, "device": device}]
+        records += [{"op": "append", "id": conversation_id, "device": device, "message": m} for m in messages]
+        with self._lock:
+            self._write_records((device, conversation_id), records)
+
+    def count(self, conversation_id: int, device: str) -> int:
+        with self._lock:
+            return len(self._index.get((device, conversation_id), []))
+
+    def conversations(self) -> list[tuple[int, str]]:
+        with self._lock:
+            return [(conversation_id, device) for (device, conversation_id), entries in self._index.items() if entries]
+
+    def load_summary(self, conversation_id: int, device: str) -> Optional[AstraMemorySummary]:
+        with self._lock:
+            entry = self._summaries.get((device, conversation_id))
+            if entry is None:
+                return None
+            line = self._read_entries([entry])[0]
+        return json.loads(line)["summary"]
+
+    def save_summary(self, conversation_id: int, device: str, summary: AstraMemorySummary) -> None:
+        record = {"op": "summary", "id": conversation_id, "device": device, "summary": summary}
+        with self._lock:
+            self._write_records((device, conversation_id), [record])
+
+    def flush(self) -> None:
+        with self._lock:
+            self._fsync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        with self._lock:
+            self._fsync()
+            self._file.close()
+
+    def stats(self) -> dict:
+        """日志统计：会话数、有效 / 作废记录数、文件大小"""
+        with self._lock:
+            return {
+                "conversations": len(self._index),
+                "live_records": sum(len(v) for v in self._index.values()),
+                "dead_records": self._dead,
+                "size": self._size,
+            }
+
+    # ==================================================================================
+    # 内部实现（调用方需持有 _lock）
+    # ==================================================================================
+
+    def _write_records(self, key: tuple[str, int], records: list[dict]) -> None:
+        if self._closed:
+            raise RuntimeError(f"memory 日志已关闭: {self.path}")
+        lines = [json.dumps(r, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n" for r in records]
+        self._write_all(b"".join(lines))
+        for line, record in zip(lines, records):
+            self._apply(key, record["op"], self._size, len(line))
+            self._size += len(line)
+        was_idle = not self._pending
+        self._pending += len(lines)
+        if self._pending >= self.fsync_batch:
+            self._fsync()
+        elif was_idle:
+            self._cond.notify()  # 只在窗口开始时唤醒，窗口内的写入一起落盘
+
+    def _apply(self, key: tuple[str, int], op: str, offset: int, length: int) -> None:
+        """把一条记录应用到索引上（写入与启动重放共用）"""
+        if op == "append":
+            self._index.setdefault(key, []).append((offset, length))
+        elif op == "summary":
+            if self._summaries.pop(key, None) is not None:
+                self._dead += 1
+            self._summaries[key] = (offset, length)
+        elif op == "reset":
+            # 该会话此前的消息、摘要以及 reset 记录本身都成为作废记录
+            self._dead += len(self._index.pop(key, [])) + 1
+            if self._summaries.pop(key, None) is not None:
+                self._dead += 1
+
+    def _write_all(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            written = self._file.write(view)
+            view = view[written:]
+
+    def _read_entries(self, entries: list[tuple[int, int]]) -> list[bytes]:
+        """按偏移读取记录，相邻记录合并为一次读取"""
+        lines = []
+        i = 0
+        while i < len(entries):
+            start, length = entries[i]
+            end = start + length
+            j = i + 1
+            while j < len(entries) and entries[j][0] == end:
+                end += entries[j][1]
+                j += 1
+            self._file.seek(start)
+            block = self._file.read(end - start)
+            lines.extend(block.split(b"\n")[:-1])
+            i = j
+        return lines
+
+    def _fsync(self) -> None:
+        if self._pending and not self._file.closed:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def _flush_loop(self) -> None:
+        """后台 group commit：有未落盘记录时等待一个合并窗口后统一 fsync"""
+        with self._lock:
+            while not self._closed:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                self._cond.wait(self.fsync_interval)
+                try:
+                    self._fsync()
+                    self._maybe_compact()
+                except OSError as e:
+                    AstraLogger.error(f"[AstraMemoryLog] 落盘失败: {e}")
+
+    def _maybe_compact(self) -> None:
+        if self._dead < self.compact_min_records:
+            return
+        live = sum(len(v) for v in self._index.values())
+        if self._dead < (live + self._dead) * self.compact_ratio:
+            return
+        self._compact()
+
+    def _compact(self) -> None:
+        """只保留有效记录重写日志：写临时文件 -> fsync -> 原子替换"""
+        tmp_path = self.path.with_name(self.path.name + ".compact")
+        new_index: dict[tuple[str, int], list[tuple[int, int]]] = {}
+        new_summaries: dict[tuple[str, int], tuple[int, int]] = {}
+        offset = 0
+        with open(tmp_path, "wb") as out:
+            for key in self._index.keys() | self._summaries.keys():
+                new_entries = []
+                for line in self._read_entries(self._index.get(key, [])):
+                    out.write(line + b"\n")
+                    new_entries.append((offset, len(line) + 1))
+                    offset += len(line) + 1
+                if new_entries:
+                    new_index[key] = new_entries
+                if key in self._summaries:
+                    line = self._read_entries([self._summaries[key]])[0]
+                    out.write(line + b"\n")
+                    new_summaries[key] = (offset, len(line) + 1)
+                    offset += len(line) + 1
+            out.flush()
+            os.fsync(out.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._fsync_dir()
+        self._file = open(self.path, "a+b", buffering=0)
+        AstraLogger.info(f"[AstraMemoryLog] 日志压缩完成: {self._size} -> {offset} 字节")
+        self._index = new_index
+        self._summaries = new_summaries
+        self._size = offset
+        self._dead = 0
+        self._pending = 0
+
+    def _fsync_dir(self) -> None:
+        """rename 之后 fsync 目录，保证替换本身落盘（Windows 不支持，跳过）"""
+        if os.name != "posix":
+            return
+        fd = os.open(self.path.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _rebuild_index(self) -> None:
+        """
+        重放日志重建索引
+        只截断没有换行结尾的最后一行（写入中途崩溃留下的残缺记录）；
+        中间无法解析的行记录日志后跳过并计为作废记录，不影响其后的有效记录，下次压缩时清除
+        """
+        offset = 0
+        corrupt = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                    key = (record["device"], record["id"])
+                    op = record["op"]
+                except (ValueError, KeyError, TypeError):
+                    corrupt += 1
+                    self._dead += 1
+                    AstraLogger.error(f"[AstraMemoryLog] 跳过无法解析的记录（偏移 {offset}）: {self.path}")
+                else:
+                    self._apply(key, op, offset, len(line))
+                offset += len(line)
+        if offset < self.path.stat().st_size:
+            AstraLogger.warning(f"[AstraMemoryLog] 日志尾部存在残缺记录，已截断至 {offset} 字节: {self.path}")
+            self._file.truncate(offset)
+        if corrupt:
+            AstraLogger.warning(f"[AstraMemoryLog] 共跳过 {corrupt} 条损坏记录: {self.path}")
+        self._size = offset
+
+    def _import_legacy(self, legacy_json_path: str) -> None:
+        memory: AstraMemoryJson = JsonLoader.load_json_file(legacy_json_path)
+        AstraLogger.info(f"[AstraMemoryLog] 从 {legacy_json_path} 导入 {len(memory['memory'])} 条历史消息")
+        with self._lock:
+            self._write_records(
+                (memory["device"], memory["id"]),
+                [{"op": "append", "id": memory["id"], "device": memory["device"], "message": m}
+                 for m in memory["memory"]],
+            )
+            self._fsync()
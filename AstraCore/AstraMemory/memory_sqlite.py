@@ -0,0 +1,207 @@
+"""
+SQLite memory 后端
+
+与 AstraChart 共用同一个数据库文件（AstraChart.db_path），表结构：
+  ASTRA_MEMORY(device, conversation_id, seq, role, content, message)
+  (device, conversation_id, seq) 上建唯一索引，读取最近 N 轮是一次索引范围扫描。
+  ASTRA_MEMORY_SUMMARY(device, conversation_id, content, covered) 保存每个会话的滚动摘要。
+
+  - WAL 模式：读写互不阻塞，synchronous=NORMAL 下每次提交无需整库 fsync
+  - 每个线程一个连接（线程结束时关闭），SQL 均为模块级常量，由 sqlite3 的语句缓存复用预编译语句
+"""
+import json
+import sqlite3
+import threading
+import weakref
+from typing import List, Optional
+
+from openai.types.responses import EasyInputMessageParam
+
+from .memory_base import AstraMemoryBackend
+from .memory_type import AstraMemoryJson, AstraMemorySummary
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS ASTRA_MEMORY(
+    ID INTEGER PRIMARY KEY AUTOINCREMENT ,
+    device TEXT NOT NULL ,
+    conversation_id INTEGER NOT NULL ,
+    seq INTEGER NOT NULL ,
+    role TEXT NOT NULL ,
+    content TEXT NOT NULL ,
+    message TEXT NOT NULL ,
+    timestamp TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+)
+"""
+_CREATE_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS IDX_ASTRA_MEMORY_CONVERSATION
+ON ASTRA_MEMORY(device, conversation_id, seq)
+"""
+_CREATE_SUMMARY_TABLE = """
+CREATE TABLE IF NOT EXISTS ASTRA_MEMORY_SUMMARY(
+    device TEXT NOT NULL ,
+    conversation_id INTEGER NOT NULL ,
+    content TEXT NOT NULL ,
+    covered INTEGER NOT NULL ,
+    timestamp TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')) ,
+    PRIMARY KEY (device, conversation_id)
+)
+"""
+_SELECT_TAIL = """
+SELECT message FROM (
+    SELECT seq, message FROM ASTRA_MEMORY
+    WHERE device = ? AND conversation_id = ?
+    ORDER BY seq DESC LIMIT ?
+) ORDER BY seq
+"""
+_SELECT_LAST_SEQ = """
+SELECT MAX(seq) FROM ASTRA_MEMORY WHERE device = ? AND conversation_id = ?
+"""
+_INSERT = """
+INSERT INTO ASTRA_MEMORY (device, conversation_id, seq, role, content, message)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+_DELETE = """
+DELETE FROM ASTRA_MEMORY WHERE device = ? AND conversation_id = ?
+"""
+_COUNT = """
+SELECT COUNT(*) FROM ASTRA_MEMORY WHERE device = ? AND conversation_id = ?
+"""
+_SELECT_CONVERSATIONS = """
+SELECT DISTINCT conversation_id, device FROM ASTRA_MEMORY
+"""
+_SELECT_SUMMARY = """
+SELECT content, covered FROM ASTRA_MEMORY_SUMMARY WHERE device = ? AND conversation_id = ?
+"""
+_UPSERT_SUMMARY = """
+INSERT OR REPLACE INTO ASTRA_MEMORY_SUMMARY (device, conversation_id, content, covered)
+VALUES (?, ?, ?, ?)
+"""
+_DELETE_SUMMARY = """
+DELETE FROM ASTRA_MEMORY_SUMMARY WHERE device = ? AND conversation_id = ?
+"""
+
+
+class _ThreadConnection:
+    """线程本地连接的持有者：随线程的 threading.local 一起释放，触发 weakref.finalize 关闭连接"""
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _release_connection(connections: list, lock: threading.Lock, conn: sqlite3.Connection) -> None:
+    with lock:
+        if conn in connections:
+            connections.remove(conn)
+    conn.close()
+
+
+class AstraMemorySqlite(AstraMemoryBackend):
+    def __init__(self, db_path: str, busy_timeout: float = 5.0):
+        """
+        Args:
+            db_path: SQLite 数据库路径（通常与 AstraChart 相同）
+            busy_timeout: 写锁等待超时（秒）
+        """
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute(_CREATE_TABLE)
+        conn.execute(_CREATE_INDEX)
+        conn.execute(_CREATE_SUMMARY_TABLE)
+
+    def _connection(self) -> sqlite3.Connection:
+        """当前线程的连接（首次使用时创建）"""
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.busy_timeout,
+                isolation_level=None,  # 手动管理事务
+                check_same_thread=False,  # close() 会在其他线程统一关闭
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            holder = self._local.holder = _ThreadConnection(conn)
+            with self._connections_lock:
+                self._connections.append(conn)
+            # 线程结束时 threading.local 释放 holder，随之关闭该线程的连接并移出列表
+            weakref.finalize(holder, _release_connection, self._connections, self._connections_lock, conn)
+        return holder.conn
+
+    @staticmethod
+    def _rows(conversation_id: int, device: str, start_seq: int, messages: List[EasyInputMessageParam]) -> list:
+        return [
+            (device, conversation_id, start_seq + i, m.get("role", ""), _content_text(m.get("content", "")),
+             json.dumps(m, ensure_ascii=False))
+            for i, m in enumerate(messages)
+        ]
+
+    def load(self, conversation_id: int, device: str, limit: Optional[int] = None) -> AstraMemoryJson:
+        if limit is not None and limit <= 0:
+            rows = []
+        else:
+            # LIMIT -1 即不限制条数
+            rows = self._connection().execute(_SELECT_TAIL, (device, conversation_id, -1 if limit is None else limit))
+        return {
+            "id": conversation_id,
+            "device": device,
+            "memory": [json.loads(row[0]) for row in rows],
+        }
+
+    def append(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        conn = self._connection()
+        # IMMEDIATE：读取最大 seq 与插入在同一把写锁内完成，并发追加不会分配到重复的 seq
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            last_seq = conn.execute(_SELECT_LAST_SEQ, (device, conversation_id)).fetchone()[0]
+            start_seq = 0 if last_seq is None else last_seq + 1
+            conn.executemany(_INSERT, self._rows(conversation_id, device, start_seq, messages))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def replace(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(_DELETE, (device, conversation_id))
+            conn.execute(_DELETE_SUMMARY, (device, conversation_id))
+            conn.executemany(_INSERT, self._rows(conversation_id, device, 0, messages))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def count(self, conversation_id: int, device: str) -> int:
+        return self._connection().execute(_COUNT, (device, conversation_id)).fetchone()[0]
+
+    def conversations(self) -> list[tuple[int, str]]:
+        return [(row[0], row[1]) for row in self._connection().execute(_SELECT_CONVERSATIONS)]
+
+    def load_summary(self, conversation_id: int, device: str) -> Optional[AstraMemorySummary]:
+        row = self._connection().execute(_SELECT_SUMMARY, (device, conversation_id)).fetchone()
+        if row is None:
+            return None
+        return {"content": row[0], "covered": row[1]}
+
+    def save_summary(self, conversation_id: int, device: str, summary: AstraMemorySummary) -> None:
+        self._connection().execute(_UPSERT_SUMMARY, (device, conversation_id, summary["content"], summary["covered"]))
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def _content_text(content) -> str:
+    """content 可能是字符串或多段内容列表，统一为纯文本存入 content 列"""
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False)
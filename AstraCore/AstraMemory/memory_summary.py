@@ -0,0 +1,147 @@
+"""
+长会话的滚动摘要
+
+会话中尚未被摘要覆盖的消息超过阈值后，把除最近 keep_recent 条以外的消息
+连同旧摘要一起交给模型压缩成新摘要。摘要任务在后台线程的独立事件循环中执行，
+不占用请求路径：
+  - 队列化：请求线程只负责入队，是否达到阈值由后台线程读取后端判断
+  - 去重：同一会话在队列中最多一个任务
+  - 限速：相邻两个任务的开始时间至少间隔 min_interval 秒
+
+summarizer 只要求提供 `async summarize(messages, previous_summary) -> str`，
+AstraCore 实现了该方法，测试时可替换为任意桩对象。
+"""
+import asyncio
+import queue
+import threading
+import time
+from typing import Optional, Protocol, List
+
+from openai.types.responses import EasyInputMessageParam
+
+from AstraNex.AstraLogger import AstraLogger
+from .memory_base import AstraMemoryBackend
+
+
+class SummaryClient(Protocol):
+    async def summarize(self, messages: List[EasyInputMessageParam], previous_summary: str = "") -> str:
+        ...
+
+
+class AstraMemorySummarizer:
+    def __init__(self,
+                 backend: AstraMemoryBackend,
+                 summarizer: SummaryClient,
+                 threshold: int = 60,
+                 keep_recent: int = 20,
+                 min_interval: float = 10.0):
+        """
+        Args:
+            backend: memory 存储后端（摘要同样保存在其中）
+            summarizer: 提供 summarize 协程的对象，通常是 AstraCore
+            threshold: 未被摘要覆盖的消息超过该条数时触发摘要
+            keep_recent: 摘要时保留不压缩的最近消息条数
+            min_interval: 两个摘要任务之间的最小间隔（秒）
+        """
+        self.backend = backend
+        self.summarizer = summarizer
+        self.threshold = threshold
+        self.keep_recent = keep_recent
+        self.min_interval = min_interval
+
+        self._queue: "queue.Queue[Optional[tuple[str, int]]]" = queue.Queue()
+        self._queued: set[tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self._last_started = 0.0
+        self._completed = 0
+        self._failed = 0
+        self._worker = threading.Thread(target=self._run, name="AstraMemorySummarizer", daemon=True)
+        self._worker.start()
+
+    def maybe_schedule(self, conversation_id: int, device: str) -> bool:
+        """
+        把会话交给后台线程检查是否需要摘要（请求路径上不读取后端）
+        返回是否入队（已在队列中的不会重复入队）
+        """
+        key = (device, conversation_id)
+        with self._lock:
+            if key in self._queued:
+                return False
+            self._queued.add(key)
+        self._queue.put(key)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"queued": len(self._queued), "completed": self._completed, "failed": self._failed}
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """停止后台线程（已入队但未开始的任务会被丢弃，下次触发时重新入队）"""
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    # ==================================================================================
+    # 后台任务
+    # ==================================================================================
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                key = self._queue.get()
+                if key is None:
+                    return
+                device, conversation_id = key
+                try:
+                    due = self._due(conversation_id, device)
+                except Exception as e:
+                    due = False
+                    AstraLogger.error(f"[AstraMemorySummarizer] 会话 {key} 读取失败: {e}")
+                if not due:
+                    with self._lock:
+                        self._queued.discard(key)
+                    continue
+                wait = self._last_started + self.min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self._last_started = time.monotonic()
+                with self._lock:
+                    self._queued.discard(key)
+                try:
+                    loop.run_until_complete(self.summarize(conversation_id, device))
+                    with self._lock:
+                        self._completed += 1
+                except Exception as e:
+                    with self._lock:
+                        self._failed += 1
+                    AstraLogger.error(f"[AstraMemorySummarizer] 会话 {key} 摘要失败: {e}")
+        finally:
+            loop.close()
+
+    def _due(self, conversation_id: int, device: str) -> bool:
+        """未被摘要覆盖的消息是否超过阈值"""
+        summary = self.backend.load_summary(conversation_id, device)
+        covered = summary["covered"] if summary else 0
+        return self.backend.count(conversation_id, device) - covered > self.threshold
+
+    async def summarize(self, conversation_id: int, device: str) -> None:
+        """
+        把 [covered, total - keep_recent) 区间的消息并入摘要
+        等待模型期间会话可能被 replace / 裁剪：返回后重新读取摘要与会话，
+        若旧摘要或已折叠区间的消息发生变化则丢弃本次结果，避免 covered 指向错误的位置
+        """
+        summary = self.backend.load_summary(conversation_id, device)
+        covered = summary["covered"] if summary else 0
+        # 读取完整会话再按下标切片：期间即便有新消息追加，区间也不会错位
+        messages = self.backend.load(conversation_id, device)["memory"]
+        target = len(messages) - self.keep_recent
+        if target <= covered:
+            return
+        folded = messages[covered:target]
+        content = await self.summarizer.summarize(folded, summary["content"] if summary else "")
+        current = self.backend.load(conversation_id, device)["memory"]
+        if self.backend.load_summary(conversation_id, device) != summary or current[:target] != messages[:target]:
+            AstraLogger.warning(f"[AstraMemorySummarizer] 会话 {(device, conversation_id)} 在摘要期间被修改，丢弃本次摘要")
+            return
+        self.backend.save_summary(conversation_id, device, {"content": content, "covered": target})
+        AstraLogger.info(f"[AstraMemorySummarizer] 会话 {(device, conversation_id)} 摘要已更新，覆盖 {target} 条消息")
@@ -11,6 +11,10 @@ class AstraMemoryJson(TypedDict):
     device:str
     memory:List[EasyInputMessageParam]
 
+class AstraMemorySummary(TypedDict):
+    content:str     # 摘要文本
+    covered:int     # 摘要覆盖了会话开头的多少条消息
+
 AstraMemoryType:TypeAlias = [
     AstraMemoryJson
 ]
\ No newline at end of file
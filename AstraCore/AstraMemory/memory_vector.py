@@ -0,0 +1,386 @@
+"""
+向量召回层
+
+长会话不再只能 "全部发送或全部丢弃"：每条写入 memory 的消息同时计算向量，
+组装上下文时按本轮用户输入做 top-k 余弦相似度检索，只把最相关的较早消息带入上下文。
+
+存储（目录 AstraMemory.recall.path）：
+  vectors.f32   : float32 [capacity, dim] 内存映射数组，向量已 L2 归一化，余弦相似度即点积
+  rows.bin      : 每条向量的 (key, seq, offset, length) 内存映射结构化数组
+                  key 为会话编号，seq 为消息在会话中的序号，offset / length 指向 messages.jsonl
+  messages.jsonl: 消息原文（追加写）
+  keys.json     : (device, conversation_id) -> key
+  meta.json     : dim / count / embedder / backfilled（已有会话是否已一次性回填）
+
+向量与消息原文每次 add 直接写入，keys.json / meta.json 不随每次写入重写：
+标记为脏后由后台线程按 flush_interval 合并写出（flush() / close() 立即写出），
+remove 对已提交行的删除标记同样在该窗口内随内存映射写出。
+写出顺序为 内存映射 -> keys.json -> meta.json，meta 中的 count 只覆盖 key 已落盘的行；
+崩溃时 count 之后未提交的尾部会被忽略，最多丢失最近一个窗口内的向量。
+
+检索是一次向量化的矩阵乘：会话占全部向量比例较大时直接对整个数组打分再按 key 屏蔽，
+否则只取该会话的行计算；top-k 用 argpartition。
+
+向量化模型可替换（实现 Embedder 协议即可），默认的 HashingEmbedder 是确定性的本地实现，
+不依赖网络与模型文件，适合测试与离线环境。
+NumPy 为可选依赖（pip install "astraecho[recall]"）：本模块导入时不依赖 NumPy，
+可以无条件导入；只有创建 HashingEmbedder / AstraMemoryRecall 时才通过 _numpy() 加载。
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Iterable, List, Optional, Protocol
+
+from openai.types.responses import EasyInputMessageParam
+
+from AstraNex.AstraLogger import AstraLogger
+
+_ROW_FIELDS = [("key", "<i8"), ("seq", "<i8"), ("offset", "<i8"), ("length", "<i8")]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError('使用向量召回需安装 NumPy: pip install "astraecho[recall]"')
+    return numpy
+
+
+class Embedder(Protocol):
+    name: str
+    dim: int
+
+    def embed(self, texts: List[str]) -> Any:
+        """返回 float32 [len(texts), dim] 数组，每行已 L2 归一化（零向量除外）"""
+        ...
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 256):
+        """
+        特征哈希向量化：英文 / 数字按词，其余字符按单字与相邻二字组，
+        用 crc32 映射到 dim 维并带符号累加（不受 PYTHONHASHSEED 影响，跨进程结果一致）
+
+        Args:
+            dim: 向量维度
+        """
+        self.name = f"hashing-{dim}"
+        self.dim = dim
+        self._np = _numpy()
+
+    def _features(self, text: str) -> list[str]:
+        features: list[str] = []
+        word = ""
+        previous = ""
+        for char in text.lower():
+            if char.isascii() and char.isalnum():
+                word += char
+                previous = ""
+                continue
+            if word:
+                features.append(word)
+                word = ""
+            if char.isspace() or not char.isprintable():
+                previous = ""
+                continue
+            features.append(char)
+            if previous:
+                features.append(previous + char)
+            previous = char
+        if word:
+            features.append(word)
+        return features
+
+    def embed(self, texts: List[str]) -> Any:
+        np = self._np
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in self._features(text)), dtype=np.uint32)
+            if hashes.size == 0:
+                continue
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.dim, signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class AstraMemoryRecall:
+    def __init__(self, path: str, embedder: Optional[Embedder] = None, initial_capacity: int = 1024,
+                 flush_interval: float = 1.0):
+        """
+        Args:
+            path: 存储目录（不存在时创建）
+            embedder: 向量化实现，默认 HashingEmbedder(256)
+            initial_capacity: 新建存储时预分配的向量条数，写满后按倍数扩容
+            flush_interval: keys.json / meta.json 的合并写出窗口（秒）
+        """
+        self._np = _numpy()
+        self.path = path
+        self.embedder: Embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._cond = threading.Condition(self._lock)
+        self._closed = False
+        os.makedirs(path, exist_ok=True)
+
+        meta = self._read_json("meta.json", {})
+        if meta and (meta.get("dim") != self.dim or meta.get("embedder") != self.embedder.name):
+            raise RuntimeError(
+                f"{path} 中的向量由 {meta.get('embedder')}（{meta.get('dim')} 维）生成，"
+                f"与当前的 {self.embedder.name}（{self.dim} 维）不一致，请更换目录或删除旧数据")
+        self.count: int = meta.get("count", 0)
+        self.backfilled: bool = meta.get("backfilled", False)
+        self._committed = (self.count, self.backfilled)  # 已写入 meta.json 的 (count, backfilled)
+        self._keys: dict[str, int] = self._read_json("keys.json", {})
+        self._keys_dirty = False
+        self._rows_dirty = False  # remove 修改了已提交的行
+        self._capacity = 0
+        self._vectors = None
+        self._rows = None
+        self._open(max(initial_capacity, self.count))
+        # 每个会话已写入的消息数（即下一条的 seq）
+        rows = self._rows[:self.count]
+        counts = self._np.bincount(rows["key"][rows["key"] >= 0], minlength=len(self._keys))
+        self._next_seq: list[int] = counts.tolist()
+        self._messages = open(os.path.join(path, "messages.jsonl"), "ab+")
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="AstraMemoryRecall-flush", daemon=True)
+        self._flusher.start()
+
+    # ==================================================================================
+    # 存储文件
+    # ==================================================================================
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_json(self, name: str, default: dict) -> dict:
+        try:
+            with open(self._file(name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def _write_json(self, name: str, data: dict) -> None:
+        tmp = self._file(name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self._file(name))
+
+    def _open(self, capacity: int) -> None:
+        """按 capacity 打开（必要时扩展）内存映射文件"""
+        np = self._np
+        row_dtype = np.dtype(_ROW_FIELDS)
+        for name, size in (("vectors.f32", capacity * self.dim * 4), ("rows.bin", capacity * row_dtype.itemsize)):
+            with open(self._file(name), "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._rows.flush()
+        self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._rows = np.memmap(self._file("rows.bin"), dtype=row_dtype, mode="r+", shape=(capacity,))
+        self._capacity = capacity
+
+    def _key(self, conversation_id: int, device: str, create: bool) -> Optional[int]:
+        name = f"{device}\t{conversation_id}"
+        key = self._keys.get(name)
+        if key is None and create:
+            key = self._keys[name] = len(self._keys)
+            self._next_seq.append(0)
+            self._keys_dirty = True
+        return key
+
+    def _dirty(self) -> bool:
+        return self._keys_dirty or self._rows_dirty or (self.count, self.backfilled) != self._committed
+
+    def _flush(self) -> None:
+        """写出内存映射与元数据（调用方需持有 _lock）；keys.json 先于 meta.json，count 不会引用未落盘的 key"""
+        if not self._dirty():
+            return
+        self._messages.flush()
+        self._vectors.flush()
+        self._rows.flush()
+        self._rows_dirty = False
+        if self._keys_dirty:
+            self._write_json("keys.json", self._keys)
+            self._keys_dirty = False
+        if (self.count, self.backfilled) != self._committed:
+            self._write_json("meta.json", {"dim": self.dim, "embedder": self.embedder.name, "count": self.count,
+                                           "backfilled": self.backfilled})
+            self._committed = (self.count, self.backfilled)
+
+    def _flush_loop(self) -> None:
+        """后台合并写出：出现未写出的元数据后等待一个窗口，窗口内的写入一起写出"""
+        with self._lock:
+            while not self._closed:
+                if not self._dirty():
+                    self._cond.wait()
+                    continue
+                self._cond.wait(self.flush_interval)
+                try:
+                    self._flush()
+                except OSError as e:
+                    AstraLogger.error(f"[AstraMemoryRecall] 元数据写出失败: {e}")
+
+    # ==================================================================================
+    # 写入
+    # ==================================================================================
+
+    def add(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        """为追加到会话的消息计算并保存向量"""
+        if not messages:
+            return
+        vectors = self.embedder.embed([message_text(m) for m in messages])
+        lines = [json.dumps(m, ensure_ascii=False).encode("utf-8") + b"\n" for m in messages]
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"向量召回存储已关闭: {self.path}")
+            was_clean = not self._dirty()
+            key = self._key(conversation_id, device, create=True)
+            if self.count + len(messages) > self._capacity:
+                self._open(max(self._capacity * 2, self.count + len(messages)))
+            self._messages.seek(0, os.SEEK_END)
+            offset = self._messages.tell()
+            self._messages.write(b"".join(lines))
+            self._messages.flush()
+            start, end = self.count, self.count + len(messages)
+            self._vectors[start:end] = vectors
+            rows = self._rows[start:end]
+            rows["key"] = key
+            rows["seq"] = self._np.arange(self._next_seq[key], self._next_seq[key] + len(messages))
+            lengths = self._np.array([len(line) for line in lines], dtype=self._np.int64)
+            rows["length"] = lengths
+            rows["offset"] = offset + self._np.concatenate(([0], self._np.cumsum(lengths)[:-1]))
+            self._next_seq[key] += len(messages)
+            self.count = end
+            if was_clean:
+                self._cond.notify()  # 只在窗口开始时唤醒，窗口内的写入一起写出
+
+    def remove(self, conversation_id: int, device: str) -> None:
+        """删除会话的全部向量（标记为无效，空间不回收）"""
+        with self._lock:
+            key = self._key(conversation_id, device, create=False)
+            if key is None:
+                return
+            was_clean = not self._dirty()
+            rows = self._rows[:self.count]
+            rows["key"][rows["key"] == key] = -1
+            self._next_seq[key] = 0
+            self._rows_dirty = True
+            if was_clean:
+                self._cond.notify()
+
+    def replace(self, conversation_id: int, device: str, messages: List[EasyInputMessageParam]) -> None:
+        with self._lock:
+            self.remove(conversation_id, device)
+            self.add(conversation_id, device, messages)
+
+    def backfill(self, conversations: Iterable[tuple[int, str, List[EasyInputMessageParam]]]) -> int:
+        """
+        为启用召回之前已有的会话一次性计算向量，完成后记入 meta.json（backfilled），之后的调用直接返回 0
+        逐会话以 replace 写入，中途失败时下次重新回填不会产生重复向量
+
+        Args:
+            conversations: (conversation_id, device, 完整会话消息) 序列
+
+        Returns:
+            回填的消息条数
+        """
+        if self.backfilled:
+            return 0
+        total = 0
+        for conversation_id, device, messages in conversations:
+            self.replace(conversation_id, device, messages)
+            total += len(messages)
+        with self._lock:
+            self.backfilled = True
+            self._flush()
+        return total
+
+    # ==================================================================================
+    # 检索
+    # ==================================================================================
+
+    def search(self, conversation_id: int, device: str, query: str, k: int = 4,
+               exclude_recent: int = 0, min_score: float = 0.0) -> list[tuple[float, int, EasyInputMessageParam]]:
+        """
+        在会话中检索与 query 最相关的消息
+
+        Args:
+            conversation_id: 会话 id
+            device: 设备标识
+            query: 检索文本（通常是本轮用户输入）
+            k: 最多返回的条数
+            exclude_recent: 跳过会话最近的若干条消息（它们已在上下文中）
+            min_score: 余弦相似度下限
+
+        Returns:
+            (相似度, seq, 消息) 列表，按 seq 升序（即时间顺序）
+        """
+        np = self._np
+        query_vector = self.embedder.embed([query])[0]
+        with self._lock:
+            key = self._key(conversation_id, device, create=False)
+            if key is None or k <= 0:
+                return []
+            count = self.count
+            rows = self._rows[:count]
+            limit = self._next_seq[key] - exclude_recent
+            candidates = np.flatnonzero((rows["key"] == key) & (rows["seq"] < limit))
+            if candidates.size == 0:
+                return []
+            if candidates.size * 4 > count:
+                # 会话占比较大：整体矩阵乘比按行收集更快
+                scores = (self._vectors[:count] @ query_vector)[candidates]
+            else:
+                scores = self._vectors[candidates] @ query_vector
+            if candidates.size > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(candidates.size)
+            top = top[scores[top] >= min_score]
+            hits = [(float(scores[i]), int(rows["seq"][candidates[i]]), int(candidates[i])) for i in top]
+            result = []
+            for score, seq, index in sorted(hits, key=lambda hit: hit[1]):
+                row = rows[index]
+                self._messages.seek(int(row["offset"]))
+                result.append((score, seq, json.loads(self._messages.read(int(row["length"])))))
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"vectors": self.count, "capacity": self._capacity, "conversations": len(self._keys),
+                    "embedder": self.embedder.name}
+
+    def flush(self) -> None:
+        """立即写出未提交的向量与元数据"""
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """写出元数据并关闭文件（可重复调用）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        with self._lock:
+            self._flush()
+            self._vectors.flush()
+            self._rows.flush()
+            self._messages.close()
+
+
+def message_text(message: EasyInputMessageParam) -> str:
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
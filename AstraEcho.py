@@ -1,46 +1,152 @@
-import time
+import atexit
+
+import uvicorn
 from flask import Flask
+
+from AstraConfig import AstraConfig
 from AstraChart import AstraChart
 from AstraCore import AstraCore
 from AstraCore.AstraMemory.memory import AstraMemory
 from AstraLink import AstraLink
-from AstraNex import AstraNex, AstraRoute
+from AstraNex import AstraAsgi, AstraNex, AstraRoute
 from AstraNex import AstraLogger
+from AstraNex.AstraLoop import AstraLoop
 from AstraLink.mcp_server import mcp
+from AstraLink.MCPServer import StockQuote, tool_cache_stats
 
 
 class AstraEcho:
-    def __init__(self):
+    def __init__(self, worker: bool = False):
+        """
+        :param worker: 是否作为 ASGI 多进程模式下的 worker 初始化（只构建组件与 ASGI 应用，不启动服务）
+        """
         self.client = None
         self.port = None
+        self.asgi: AstraAsgi | None = None
+        self._shutdown = False
+        self.server = AstraConfig.get("AstraNex.server", "flask")
+        self.workers = AstraConfig.get("AstraNex.workers", 1)
+        if worker:
+            self._init_components(serve_mcp=False, start_pool=False)
+            self.asgi = AstraAsgi(self.astra_chart, self.astra_nex)
+            return
         self._init_astra_echo()
 
     def _init_astra_echo(self):
         AstraLogger.info("正在配置AstraEcho")
+        if self.server == "asgi":
+            if self.workers > 1:
+                # 各 worker 进程通过 create_asgi_app 自行初始化组件，主进程只负责托管
+                self.run_asgi_workers()
+                return
+            self._init_components(serve_mcp=True, start_pool=False)
+            self.asgi = AstraAsgi(self.astra_chart, self.astra_nex)
+            self.run_asgi()
+            return
+        self._init_components(serve_mcp=True, start_pool=True)
+        self.init_routes()
+        AstraRoute(self.client,self.astra_chart,self.astra_nex)
+        self.run()
+
+    def _init_components(self, serve_mcp: bool, start_pool: bool):
+        """
+        :param serve_mcp: 是否启动 MCP 服务器（供外部客户端通过 SSE 访问）
+        :param start_pool: 是否立即启动 MCP 会话池（ASGI 模式下由 lifespan 在 uvicorn 的事件循环中启动）
+        """
         self.astra_core = AstraCore()
         self.astra_chart = AstraChart()
         self.astra_link = AstraLink()
         self.astra_memory = AstraMemory()
+        self.astra_memory.enable_summary(self.astra_core)
+        self.astra_memory.enable_search(self.astra_chart.search)
+        self.astra_memory.enable_recall()
+        # 进程退出时写回 memory 缓存中尚未落盘的消息
+        atexit.register(self.shutdown)
         # 添加mcp服务器到astra_link
         self.astra_link.add_mcp_server(mcp)
-        self.astra_link.start_all_mcp_server_in_thread()
+        if serve_mcp:
+            self.astra_link.start_mcp_servers()
+        if start_pool:
+            self.astra_link.start_mcp_pool()
+            if AstraConfig.get("AstraCore.http.warmup", False):
+                # 预热不阻塞启动，首个请求到来前在 AstraLoop 上建立好模型服务连接
+                AstraLoop.submit(self.astra_core.warmup())
+        else:
+            self.astra_link.register_mcp_pool()
 
-        self.astra_nex = AstraNex(self.astra_chart.conn,
+        self.astra_nex = AstraNex(self.astra_chart,
                                   self.astra_core,
                                   self.astra_link,
                                   self.astra_memory
                                   )
-        self.init_routes()
-        AstraRoute(self.client,self.astra_chart.conn,self.astra_nex)
-        self.run()
-        time.sleep(2)
 
     def init_routes(self):
         self.client = Flask(__name__)
 
     def run(self):
         AstraLogger.info("AstraEcho配置完毕")
-        self.client.run(port=self.port)
+        try:
+            self.client.run(port=self.port)
+        finally:
+            self.shutdown()
+
+    def run_asgi(self):
+        """单进程 ASGI 模式：uvicorn 在主线程运行 AstraAsgi"""
+        AstraLogger.info("AstraEcho配置完毕（ASGI）")
+        try:
+            uvicorn.run(self.asgi.app, host=AstraConfig.get("AstraNex.host", "127.0.0.1"),
+                        port=AstraConfig.get("AstraNex.port", 1145), log_level="info")
+        finally:
+            self.shutdown()
+
+    def run_asgi_workers(self):
+        """
+        多进程 ASGI 模式：每个 worker 进程调用 create_asgi_app 构建各自的组件
+        worker 之间不共享进程内状态，因此要求：
+          - AstraMemory.backend 为可多进程访问的 sqlite
+          - 关闭 AstraMemory.cache：write-behind 缓存是进程内的，各 worker 会持有同一会话的不同副本并延迟写回
+          - 关闭 AstraMemory.recall：各 worker 各自映射同一份向量文件、维护各自的 count，会写坏同一批行
+        不满足时退回单 worker
+        """
+        conflicts = []
+        if AstraConfig.get("AstraMemory.backend", "log") != "sqlite":
+            conflicts.append("AstraMemory.backend 需为 sqlite")
+        if AstraConfig.get("AstraMemory.cache.enabled", False):
+            conflicts.append("AstraMemory.cache.enabled 需为 false")
+        if AstraConfig.get("AstraMemory.recall.enabled", False):
+            conflicts.append("AstraMemory.recall.enabled 需为 false")
+        if conflicts:
+            AstraLogger.warning(f"多 worker 要求 {'、'.join(conflicts)}，已退回单 worker")
+            self.workers = 1
+            self._init_astra_echo()
+            return
+        AstraLogger.info(f"AstraEcho以 {self.workers} 个 worker 启动（ASGI）")
+        uvicorn.run("AstraEcho:create_asgi_app", factory=True, workers=self.workers,
+                    host=AstraConfig.get("AstraNex.host", "127.0.0.1"),
+                    port=AstraConfig.get("AstraNex.port", 1145), log_level="info")
+
+    def shutdown(self):
+        """关闭 AstraEcho：关闭 MCP 会话池，flush 并关闭 memory，再关闭模型连接池与聊天记录库（可重复调用）"""
+        if self._shutdown or not hasattr(self, "astra_memory"):
+            return
+        self._shutdown = True
+        AstraLogger.info("正在关闭AstraEcho")
+        self.astra_link.close()
+        self.astra_memory.close()
+        # memory 关闭时会等待摘要任务结束，摘要仍需使用模型连接
+        self.astra_core.close()
+        self.astra_chart.close()
+        AstraLogger.info(f"memory 缓存统计: {self.astra_memory.stats()}")
+        AstraLogger.info(f"MCP 工具缓存统计: {tool_cache_stats()}")
+        AstraLogger.info(f"行情缓存统计: {StockQuote.stats()}")
+        AstraLogger.info(f"聊天记录写入统计: {self.astra_chart.stats()}")
+
+
+def create_asgi_app():
+    """uvicorn 多 worker 模式下每个 worker 进程的应用工厂"""
+    AstraConfig.ensure_loaded("config/config.json")
+    return AstraEcho(worker=True).asgi.app
+
 
 if __name__ == '__main__':
     pass
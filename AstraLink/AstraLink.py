@@ -1,17 +1,51 @@
 import asyncio
 import time
-from threading import Thread
+from threading import Event, Thread
+from typing import Callable
 
 import uvicorn
 from typing_extensions import overload
+from AstraConfig import AstraConfig
+from AstraLink.AstraLinkCatalog import AstraLinkCatalog
+from AstraLink.AstraLinkPool import AstraLinkPool
 from AstraLink.MCPServer.AstraLinkMCP import AstraLinkMCP
+from AstraLink.MCPServer.tool_http import ToolHttp
 from AstraNex import AstraLogger
+from AstraNex.AstraLoop import AstraLoop
+
+
+class _NotifyingServer(uvicorn.Server):
+    """startup 结束（成功或失败）后回调 on_startup，调用方据此等待就绪而不必轮询 started"""
+    def __init__(self, config: uvicorn.Config, on_startup: Callable[[], None] | None = None):
+        super().__init__(config)
+        self._on_startup = on_startup
+
+    async def startup(self, sockets=None) -> None:
+        try:
+            await super().startup(sockets=sockets)
+        finally:
+            if self._on_startup is not None:
+                self._on_startup()
 
 
 class AstraLink:
     def __init__(self):
         self.thread : Thread |None= None
         self.mcp_server_list:list[AstraLinkMCP] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._servers: list[uvicorn.Server] = []
+        self._ready = Event()
+        self.remote_server_list: list[dict] = []
+        AstraLinkCatalog.configure(ttl=AstraConfig.get("AstraLink.catalog.ttl", 300.0))
+        pool_config = AstraConfig.get("AstraLink.pool", {})
+        self.pool = AstraLinkPool(
+            health_interval=pool_config.get("health_interval", 30.0),
+            ping_timeout=pool_config.get("ping_timeout", 5.0),
+            backoff_base=pool_config.get("backoff_base", 0.5),
+            backoff_max=pool_config.get("backoff_max", 30.0),
+            session_timeout=pool_config.get("session_timeout", 30.0),
+            connect_timeout=pool_config.get("connect_timeout", 10.0),
+        )
 
 
 
@@ -21,25 +55,37 @@ class AstraLink:
 
     def add_mcp_server(self, mcp_server: AstraLinkMCP):
         self.mcp_server_list.append(mcp_server)
-    @staticmethod
-    async def run_main_server(mcp_server:AstraLinkMCP):
-
 
-        AstraLogger.info(f"正在启动MCPServer:{mcp_server.name}\n启动于端口:{mcp_server.port}")
-        """运行MCP服务器"""
+    def add_remote_mcp_server(self, name: str, url: str, headers: dict | None = None):
+        """添加远程MCP服务器（只通过 SSE 连接，不由 AstraLink 启动）"""
+        self.remote_server_list.append({"name": name, "url": url, "headers": headers or {}})
+    @staticmethod
+    def create_server(mcp_server:AstraLinkMCP, on_startup: Callable[[], None] | None = None) -> uvicorn.Server:
+        """创建MCP服务器对应的uvicorn服务，on_startup 在启动完成（或失败）后调用"""
         config = uvicorn.Config(
             app=mcp_server.app,
             host=mcp_server.host,
             port=mcp_server.port,
-            log_level="info"
+            log_level="info",
+            timeout_graceful_shutdown=AstraConfig.get("AstraLink.graceful_timeout", 5),
         )
-        server = uvicorn.Server(config)
-        await server.serve()
-    def start_in_thread(self ,mcp_server:AstraLinkMCP):
-        """在新线程中启动服务器"""
+        return _NotifyingServer(config, on_startup)
+
+    @staticmethod
+    async def run_main_server(mcp_server:AstraLinkMCP, ready: Event | None = None):
+        """运行MCP服务器，启动完成（或失败）后置位 ready"""
+        AstraLogger.info(f"正在启动MCPServer:{mcp_server.name}\n启动于端口:{mcp_server.port}")
+        server = AstraLink.create_server(mcp_server, ready.set if ready is not None else None)
+        try:
+            await server.serve()
+        finally:
+            if ready is not None:
+                ready.set()
+
+    def start_in_thread(self ,mcp_server:AstraLinkMCP, ready: Event | None = None):
+        """在新线程中启动服务器，ready 在启动完成（或失败）后置位"""
         def run():
-            asyncio.run(self.run_main_server(mcp_server))
-            time.sleep(2)
+            asyncio.run(self.run_main_server(mcp_server, ready))
 
         self.thread =Thread(
             target=run,
@@ -49,6 +95,119 @@ class AstraLink:
         self.thread.start()
         AstraLogger.info(f"[{mcp_server.name}] 已在后台线程中启动")
 
-    def start_all_mcp_server_in_thread(self):
+    def start_all_mcp_server_in_thread(self, timeout: float = 10.0) -> bool:
+        """每个服务器一个线程，阻塞到全部启动完成（或失败、超时），返回是否在超时前全部完成"""
+        events = []
         for i in self.mcp_server_list:
-            self.start_in_thread(i)
+            ready = Event()
+            events.append(ready)
+            self.start_in_thread(i, ready)
+        deadline = time.monotonic() + timeout
+        for mcp_server, ready in zip(self.mcp_server_list, events):
+            if not ready.wait(max(deadline - time.monotonic(), 0)):
+                AstraLogger.warning(f"[{mcp_server.name}] 在 {timeout}s 内未完成启动")
+                return False
+        return True
+
+    def start_mcp_servers(self):
+        """按配置 AstraLink.serve_mode 启动全部MCP服务器：loop（默认，共用一个事件循环）或 thread（每个服务器一个线程）"""
+        timeout = AstraConfig.get("AstraLink.ready_timeout", 10)
+        if AstraConfig.get("AstraLink.serve_mode", "loop") == "thread":
+            self.start_all_mcp_server_in_thread(timeout)
+        else:
+            self.start_all_mcp_server_in_loop(timeout)
+
+    def start_all_mcp_server_in_loop(self, timeout: float = 10.0) -> bool:
+        """
+        在同一个后台线程的同一个事件循环中运行全部MCP服务器
+        阻塞到所有服务器完成启动（或启动失败），返回是否全部启动成功
+        """
+        self._ready.clear()
+        self.thread = Thread(
+            target=lambda: asyncio.run(self._serve_all()),
+            name="AstraLink-MCP",
+            daemon=True
+        )
+        self.thread.start()
+        if not self._ready.wait(timeout):
+            AstraLogger.warning(f"MCP服务器在 {timeout}s 内未全部启动")
+            return False
+        failed = [m.name for m, s in zip(self.mcp_server_list, self._servers) if not s.started]
+        if failed:
+            AstraLogger.error(f"MCP服务器启动失败: {failed}")
+            return False
+        AstraLogger.info(f"全部MCP服务器已就绪: {[m.name for m in self.mcp_server_list]}")
+        return True
+
+    async def _serve_all(self):
+        self._loop = asyncio.get_running_loop()
+        pending = set(range(len(self.mcp_server_list)))
+
+        def on_startup(index: int):
+            # 每个服务器启动完成、启动失败或提前退出时各调用一次，全部到齐后通知等待方
+            pending.discard(index)
+            if not pending:
+                self._ready.set()
+
+        self._servers = [self.create_server(m, lambda i=i: on_startup(i)) for i, m in enumerate(self.mcp_server_list)]
+        tasks = [asyncio.create_task(self._serve(m, s)) for m, s in zip(self.mcp_server_list, self._servers)]
+        for i, task in enumerate(tasks):
+            task.add_done_callback(lambda _, i=i: on_startup(i))
+        if not tasks:
+            self._ready.set()
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await ToolHttp.aclose()
+
+    @staticmethod
+    async def _serve(mcp_server:AstraLinkMCP, server: uvicorn.Server):
+        AstraLogger.info(f"正在启动MCPServer:{mcp_server.name}\n启动于端口:{mcp_server.port}")
+        try:
+            await server.serve()
+        except SystemExit:
+            # 端口被占用等启动错误时 uvicorn 调用 sys.exit，不能让它结束整个事件循环
+            AstraLogger.error(f"[{mcp_server.name}] 启动失败")
+        except Exception as e:
+            AstraLogger.error(f"[{mcp_server.name}] 运行出错: {e!r}")
+
+    def stop_mcp_servers(self, timeout: float = 10.0):
+        """通知共享事件循环中的MCP服务器优雅退出并等待线程结束"""
+        if self._loop is None or self.thread is None or not self.thread.is_alive():
+            return
+
+        def request_exit():
+            for s in self._servers:
+                s.should_exit = True
+
+        self._loop.call_soon_threadsafe(request_exit)
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            AstraLogger.warning(f"MCP服务器在 {timeout}s 内未退出")
+
+    def register_mcp_pool(self):
+        """
+        把所有 MCP 服务器登记到会话池（不连接）
+        本进程的MCP服务器按 AstraLink.pool.transport 选择 memory（默认，内存流直连）或 sse，远程服务器总是 sse
+        """
+        local_transport = AstraConfig.get("AstraLink.pool.transport", "memory")
+        for i in self.mcp_server_list:
+            if local_transport == "sse":
+                self.pool.add(i.name, f"http://{i.host}:{i.port}/sse")
+            else:
+                self.pool.add_local(i.name, i.mcp_server)
+        for i in self.remote_server_list:
+            self.pool.add(i["name"], i["url"], i["headers"])
+
+    def start_mcp_pool(self):
+        """登记并为所有 MCP 服务器建立常驻客户端会话（在 AstraLoop 上运行）"""
+        self.register_mcp_pool()
+        AstraLoop.run_sync(self.pool.start())
+        AstraLogger.info(f"MCP 会话池已启动: {self.pool.stats()}")
+
+    def close(self):
+        """关闭 MCP 会话池，再停止MCP服务器（会话池持有的 SSE 连接先断开，服务器才能及时退出）"""
+        AstraLoop.run_sync(self.pool.close())
+        # 内存流连接的工具运行在 AstraLoop 上，其 HTTP 客户端也在那里
+        AstraLoop.run_sync(ToolHttp.aclose())
+        self.stop_mcp_servers()
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from mcp.types import Tool as MCPTool
+
+from AstraNex.AstraLogger import AstraLogger
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """一个 MCP 服务器的工具目录"""
+    tools: list[MCPTool]
+    version: str
+    fetched_at: float
+
+
+class AstraLinkCatalog:
+    """
+    进程级 MCP 工具目录缓存
+      - 以服务器名为键，保存工具列表及其版本哈希（工具定义的 sha256）
+      - 超过 TTL 或收到服务器的 tools/list_changed 通知后失效，下次使用时重新拉取
+      - 重新拉取得到的版本哈希不变时，依赖版本的下游缓存无需重建
+    """
+    _entries: dict[str, CatalogEntry] = {}
+    _lock = threading.Lock()
+    _ttl: float = 300.0
+    _hits = 0
+    _misses = 0
+
+    @classmethod
+    def configure(cls, ttl: float) -> None:
+        """
+        :param ttl: 目录有效期（秒），<= 0 表示只依赖 list_changed 通知失效
+        """
+        cls._ttl = ttl
+
+    @classmethod
+    def get(cls, name: str) -> Optional[CatalogEntry]:
+        """获取仍然有效的目录，不存在或已过期时返回 None"""
+        with cls._lock:
+            entry = cls._entries.get(name)
+            if entry is not None and (cls._ttl <= 0 or time.monotonic() - entry.fetched_at < cls._ttl):
+                cls._hits += 1
+                return entry
+            cls._misses += 1
+            return None
+
+    @classmethod
+    def put(cls, name: str, tools: list[MCPTool]) -> CatalogEntry:
+        """保存服务器的工具列表，返回新的目录"""
+        entry = CatalogEntry(tools=list(tools), version=cls.hash_tools(tools), fetched_at=time.monotonic())
+        with cls._lock:
+            old = cls._entries.get(name)
+            cls._entries[name] = entry
+        if old is None or old.version != entry.version:
+            AstraLogger.info(f"[AstraLinkCatalog] {name} 工具目录版本 {entry.version}，共 {len(entry.tools)} 个工具")
+        return entry
+
+    @classmethod
+    def invalidate(cls, name: Optional[str] = None) -> None:
+        """使指定服务器（None 为全部）的目录失效"""
+        with cls._lock:
+            if name is None:
+                cls._entries.clear()
+            else:
+                cls._entries.pop(name, None)
+
+    @classmethod
+    def version(cls, name: str) -> Optional[str]:
+        """服务器当前缓存的目录版本（不检查 TTL）"""
+        with cls._lock:
+            entry = cls._entries.get(name)
+            return entry.version if entry is not None else None
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            return {
+                "hits": cls._hits,
+                "misses": cls._misses,
+                "versions": {name: entry.version for name, entry in cls._entries.items()},
+            }
+
+    @staticmethod
+    def hash_tools(tools: list[MCPTool]) -> str:
+        payload = json.dumps([t.model_dump(mode="json") for t in tools], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
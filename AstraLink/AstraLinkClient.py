@@ -0,0 +1,134 @@
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+import anyio
+from agents import AgentBase, RunContextWrapper
+from agents.mcp import MCPServerSse
+from mcp import ServerNotification
+from mcp.server import FastMCP
+from mcp.shared.memory import create_client_server_memory_streams
+from mcp.types import Tool as MCPTool, ToolListChangedNotification
+
+from AstraLink.AstraLinkCatalog import AstraLinkCatalog
+from AstraLink.AstraLinkScope import AstraLinkScope
+from AstraNex.AstraLogger import AstraLogger
+
+# 本模块依赖 agents / mcp SDK 的以下非公开实现（pyproject.toml 中已固定版本），
+# 升级 SDK 后若它们不存在则立即报错，而不是在运行中静默退化
+_SDK_REQUIREMENT = "openai-agents==0.3.1, mcp==1.14.1"
+
+try:
+    from agents.mcp.server import _MCPServerWithClientSession
+except ImportError as e:
+    raise RuntimeError(f"AstraLinkClient 依赖 agents.mcp.server._MCPServerWithClientSession，"
+                       f"当前 SDK 不兼容，请安装 {_SDK_REQUIREMENT}") from e
+
+
+def _require(obj: Any, *names: str) -> None:
+    """obj 缺少任一属性时抛出 RuntimeError"""
+    missing = [name for name in names if not hasattr(obj, name)]
+    if missing:
+        raise RuntimeError(f"AstraLinkClient 依赖的 SDK 内部属性 {type(obj).__name__}.{missing} 不存在，"
+                           f"请安装 {_SDK_REQUIREMENT}")
+
+
+_require(_MCPServerWithClientSession, "_run_with_retries")
+
+
+class _CatalogMCPServer(_MCPServerWithClientSession):
+    """
+    从 AstraLinkCatalog 读取工具列表的 MCP 客户端
+    构建 agent 时工具发现不产生网络请求，只有目录失效后第一次使用时拉取一次。
+    带会话范围参数的工具由 AstraLinkScope 隐藏参数并在调用时注入。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 父类 list_tools 的工具缓存
+        _require(self, "_tools_list", "_cache_dirty")
+        self._scoped_tools: set[str] = set()
+
+    async def connect(self):
+        await super().connect()
+        # 重连后服务器可能已更新，重新拉取一次目录
+        AstraLinkCatalog.invalidate(self.name)
+        # ClientSession 只能在构造时传入 message_handler，这里包装已创建会话的处理函数
+        _require(self.session, "_message_handler")
+        handler = self.session._message_handler
+
+        async def on_message(message) -> None:
+            if isinstance(message, ServerNotification) and isinstance(message.root, ToolListChangedNotification):
+                AstraLogger.info(f"[AstraLinkCatalog] {self.name} 工具列表已变更")
+                AstraLinkCatalog.invalidate(self.name)
+            await handler(message)
+
+        self.session._message_handler = on_message
+
+    async def list_tools(
+        self,
+        run_context: Optional[RunContextWrapper[Any]] = None,
+        agent: Optional[AgentBase] = None,
+    ) -> list[MCPTool]:
+        if self.session is not None:
+            entry = AstraLinkCatalog.get(self.name)
+            if entry is None:
+                session = self.session
+                result = await self._run_with_retries(lambda: session.list_tools())
+                entry = AstraLinkCatalog.put(self.name, result.tools)
+            self._scoped_tools = {t.name for t in entry.tools if AstraLinkScope.is_scoped(t)}
+            # 交给父类按 tool_filter 过滤
+            self._tools_list, self._cache_dirty = [AstraLinkScope.hide(t) for t in entry.tools], False
+        return await super().list_tools(run_context, agent)
+
+    async def call_tool(self, tool_name: str, arguments: Optional[dict[str, Any]]):
+        if tool_name in self._scoped_tools:
+            arguments = AstraLinkScope.inject(arguments)
+        return await super().call_tool(tool_name, arguments)
+
+
+class AstraLinkMCPSse(_CatalogMCPServer, MCPServerSse):
+    """通过 HTTP+SSE 连接远程 MCP 服务器"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs["cache_tools_list"] = True
+        super().__init__(*args, **kwargs)
+
+
+class AstraLinkMCPMemory(_CatalogMCPServer):
+    """
+    通过内存流直连同进程内的 FastMCP 服务器
+    不经过 HTTP / SSE / socket，服务端会话作为 task 运行在客户端所在的事件循环中。
+    """
+
+    def __init__(self, name: str, mcp_server: FastMCP, client_session_timeout_seconds: Optional[float] = 5):
+        super().__init__(
+            cache_tools_list=True,
+            client_session_timeout_seconds=client_session_timeout_seconds,
+            tool_filter=None,
+            use_structured_content=False,
+            max_retry_attempts=0,
+            retry_backoff_seconds_base=1.0,
+        )
+        _require(mcp_server, "_mcp_server")
+        self._name = name
+        self.mcp_server = mcp_server
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @asynccontextmanager
+    async def create_streams(self):
+        server = self.mcp_server._mcp_server
+        async with create_client_server_memory_streams() as (client_streams, server_streams):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(lambda: server.run(
+                    server_streams[0],
+                    server_streams[1],
+                    server.create_initialization_options(),
+                    raise_exceptions=False,
+                ))
+                try:
+                    yield client_streams
+                finally:
+                    tg.cancel_scope.cancel()
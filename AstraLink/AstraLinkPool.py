@@ -0,0 +1,192 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from agents.mcp import MCPServer
+
+from mcp.server import FastMCP
+
+from AstraLink.AstraLinkCatalog import AstraLinkCatalog
+from AstraLink.AstraLinkClient import AstraLinkMCPMemory, AstraLinkMCPSse
+from AstraNex.AstraLogger import AstraLogger
+
+
+@dataclass
+class _PoolSlot:
+    """一个 MCP 服务器在池中的槽位"""
+    name: str
+    url: str = ""
+    headers: dict = field(default_factory=dict)
+    local: Optional[FastMCP] = None
+    server: Optional[AstraLinkMCPSse | AstraLinkMCPMemory] = None
+    failures: int = 0
+    retry_at: float = 0.0
+    connects: int = 0
+    connect_seconds: float = 0.0
+    task: Optional[asyncio.Task] = None
+    attempted: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class AstraLinkPool:
+    """
+    MCP 客户端会话池
+      - 每个 MCP 服务器一个常驻会话，只在启动时握手一次
+      - 连接失败按指数退避重连
+      - 定期 ping 做健康检查，失败的会话关闭后重连
+      - 请求通过 acquire() 借用已初始化的会话，不再在请求路径上建立连接
+      - 各服务器并发连接、单独超时，慢或不可用的服务器不拖累其他服务器
+      - 工具列表由 AstraLinkCatalog 进程级缓存，构建 agent 时不再请求 tools/list
+      - 同进程内的 FastMCP 服务器通过内存流直连，只有远程服务器走 HTTP+SSE
+
+    MCP 会话基于 anyio，进入与退出上下文必须在同一个 task 中，
+    因此每个服务器由各自的维护 task 负责连接、重连、健康检查与关闭，池必须在 AstraLoop 上运行。
+    """
+
+    def __init__(self,
+                 health_interval: float = 30.0,
+                 ping_timeout: float = 5.0,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 session_timeout: float = 30.0,
+                 connect_timeout: float = 10.0):
+        """
+        Args:
+            health_interval: 健康检查间隔（秒）
+            ping_timeout: 单次 ping 超时（秒）
+            backoff_base: 首次重连等待（秒），之后每次失败翻倍
+            backoff_max: 重连等待上限（秒）
+            session_timeout: MCP 会话单次请求超时（秒）
+            connect_timeout: 单个服务器建立连接（含握手）的超时（秒）
+        """
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session_timeout = session_timeout
+        self.connect_timeout = connect_timeout
+        self._slots: dict[str, _PoolSlot] = {}
+        self._started = False
+        self._closing: Optional[asyncio.Event] = None
+
+    def add(self, name: str, url: str, headers: Optional[dict] = None) -> None:
+        """登记一个通过 SSE 连接的 MCP 服务器（需在 start 之前调用）"""
+        self._slots[name] = _PoolSlot(name=name, url=url, headers=headers or {})
+
+    def add_local(self, name: str, mcp_server: FastMCP) -> None:
+        """登记一个同进程内的 MCP 服务器，通过内存流连接（需在 start 之前调用）"""
+        self._slots[name] = _PoolSlot(name=name, url=f"memory://{name}", local=mcp_server)
+
+    async def start(self) -> None:
+        """并发连接所有服务器，等待每个服务器的首次连接尝试结束（失败的服务器在后台继续重连）
+
+        耗时取决于最慢的服务器，且不超过 connect_timeout。
+        """
+        if self._started:
+            return
+        self._started = True
+        self._closing = asyncio.Event()
+        for slot in self._slots.values():
+            slot.attempted = asyncio.Event()
+            slot.task = asyncio.create_task(self._supervise(slot), name=f"AstraLinkPool-{slot.name}")
+        await asyncio.gather(*(slot.attempted.wait() for slot in self._slots.values()))
+
+    async def acquire(self) -> list[MCPServer]:
+        """借用当前可用的会话（不可用的服务器被跳过，不阻塞请求）"""
+        return [slot.server for slot in self._slots.values() if slot.server is not None]
+
+    async def close(self) -> None:
+        """关闭所有会话并停止维护 task"""
+        if not self._started:
+            return
+        self._closing.set()
+        await asyncio.gather(*(slot.task for slot in self._slots.values()), return_exceptions=True)
+        self._started = False
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "connected": slot.server is not None,
+                "failures": slot.failures,
+                "connects": slot.connects,
+                "connect_seconds": round(slot.connect_seconds, 3),
+                "catalog_version": AstraLinkCatalog.version(name),
+            }
+            for name, slot in self._slots.items()
+        }
+
+    # ==================================================================================
+    # 维护 task
+    # ==================================================================================
+
+    async def _supervise(self, slot: _PoolSlot) -> None:
+        """单个服务器的维护 task：连接 -> 周期性健康检查 -> 失败后退避重连"""
+        try:
+            while not self._closing.is_set():
+                if slot.server is None:
+                    await self._connect(slot)
+                    slot.attempted.set()
+                    if slot.server is None:
+                        await self._sleep(slot.retry_at - time.monotonic())
+                    continue
+                await self._sleep(self.health_interval)
+                if not self._closing.is_set():
+                    await self._check(slot)
+        finally:
+            slot.attempted.set()
+            await self._disconnect(slot)
+
+    async def _sleep(self, delay: float) -> None:
+        """等待 delay 秒，池关闭时提前返回"""
+        if delay <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._closing.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _connect(self, slot: _PoolSlot) -> None:
+        if slot.local is not None:
+            server = AstraLinkMCPMemory(slot.name, slot.local, client_session_timeout_seconds=self.session_timeout)
+        else:
+            server = AstraLinkMCPSse(
+                name=slot.name,
+                params={"url": slot.url, "headers": slot.headers},
+                client_session_timeout_seconds=self.session_timeout,
+            )
+        started = time.monotonic()
+        try:
+            # 超时取消发生在当前 task 内，已进入的上下文由 cleanup 退出
+            async with asyncio.timeout(self.connect_timeout):
+                await server.connect()
+        except Exception as e:
+            if isinstance(e, TimeoutError):
+                await server.cleanup()
+                e = f"超过 {self.connect_timeout}s 未完成连接"
+            slot.failures += 1
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (slot.failures - 1))
+            slot.retry_at = time.monotonic() + delay
+            AstraLogger.warning(f"[AstraLinkPool] 连接 {slot.name} 失败（第 {slot.failures} 次），{delay:.1f}s 后重试: {e}")
+            return
+        slot.server = server
+        slot.failures = 0
+        slot.connects += 1
+        slot.connect_seconds = time.monotonic() - started
+        AstraLogger.info(f"[AstraLinkPool] 已连接 {slot.name}: {slot.url}")
+
+    async def _check(self, slot: _PoolSlot) -> None:
+        try:
+            await asyncio.wait_for(slot.server.session.send_ping(), timeout=self.ping_timeout)
+        except Exception as e:
+            AstraLogger.warning(f"[AstraLinkPool] {slot.name} 健康检查失败，准备重连: {e!r}")
+            await self._disconnect(slot)
+
+    @staticmethod
+    async def _disconnect(slot: _PoolSlot) -> None:
+        server, slot.server = slot.server, None
+        if server is None:
+            return
+        try:
+            await server.cleanup()
+        except Exception as e:
+            AstraLogger.warning(f"[AstraLinkPool] 关闭 {slot.name} 时出错: {e!r}")
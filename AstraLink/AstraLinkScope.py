@@ -0,0 +1,58 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from mcp.types import Tool as MCPTool
+
+
+class AstraLinkScope:
+    """
+    工具调用的会话范围
+      - 请求处理方在运行 agent 前用 use(device, conversation_id) 设置当前请求的会话
+      - 声明了 device / conversation_id 参数的 MCP 工具由客户端在调用时注入这两个参数，
+        并从交给模型的参数表中去掉 —— 模型既看不到也无法伪造，工具只能访问发起请求的会话的数据
+      - 未设置范围时注入不到参数，工具应拒绝执行
+    基于 ContextVar，agent 运行中创建的子任务同样可见，并发请求互不影响。
+    """
+    PARAMS = ("device", "conversation_id")
+    _current: ContextVar[Optional[dict]] = ContextVar("AstraLinkScope", default=None)
+
+    @classmethod
+    @contextmanager
+    def use(cls, device: str, conversation_id: int) -> Iterator[None]:
+        """在 with 块内（含其中创建的任务）把工具调用限定在该会话"""
+        token = cls._current.set({"device": device, "conversation_id": conversation_id})
+        try:
+            yield
+        finally:
+            cls._current.reset(token)
+
+    @classmethod
+    def current(cls) -> Optional[dict]:
+        return cls._current.get()
+
+    @classmethod
+    def is_scoped(cls, tool: MCPTool) -> bool:
+        """工具是否声明了会话范围参数"""
+        properties = (tool.inputSchema or {}).get("properties", {})
+        return any(name in properties for name in cls.PARAMS)
+
+    @classmethod
+    def hide(cls, tool: MCPTool) -> MCPTool:
+        """返回去掉会话范围参数后的工具定义（不修改原对象）"""
+        if not cls.is_scoped(tool):
+            return tool
+        schema = dict(tool.inputSchema)
+        schema["properties"] = {k: v for k, v in schema.get("properties", {}).items() if k not in cls.PARAMS}
+        if "required" in schema:
+            schema["required"] = [k for k in schema["required"] if k not in cls.PARAMS]
+        return tool.model_copy(update={"inputSchema": schema})
+
+    @classmethod
+    def inject(cls, arguments: Optional[dict[str, Any]]) -> dict[str, Any]:
+        """丢弃模型传入的范围参数，换成当前请求的会话范围"""
+        arguments = {k: v for k, v in (arguments or {}).items() if k not in cls.PARAMS}
+        scope = cls._current.get()
+        if scope is not None:
+            arguments.update(scope)
+        return arguments
@@ -1,7 +1,14 @@
 from .AstraLinkMCP import AstraLinkMCP
+from .stock_quote import StockQuote
+from .tool_cache import tool_cache, tool_cache_stats
+from .tool_http import ToolHttp
 
 __all__ = [
-    "AstraLinkMCP"
+    "AstraLinkMCP",
+    "StockQuote",
+    "ToolHttp",
+    "tool_cache",
+    "tool_cache_stats",
 
 
 ]
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""
+股票行情查询
+
+  - 进程内只创建一个 easyquotation 新浪客户端（创建时会加载全市场代码表，代价较高）
+  - 一次查询多个代码时合并为一次上游请求（单次超过 800 个时由 easyquotation 拆分并发请求）
+  - 按代码缓存行情，TTL 很短，只用于合并短时间内的重复查询
+  - 代码统一规范为带市场前缀的小写形式（sh000001 与 sz000001 是两只不同的证券）
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from easyquotation.helpers import get_stock_type
+from easyquotation.sina import Sina
+
+from AstraConfig import AstraConfig
+
+
+class _SinaQuotation(Sina):
+    """行情地址可通过 AstraLink.tools.quote_endpoint 配置（测试时指向本地桩服务）"""
+
+    @property
+    def stock_api(self) -> str:
+        endpoint = AstraConfig.get("AstraLink.tools.quote_endpoint")
+        if not endpoint:
+            return super().stock_api
+        return f"{endpoint}/rn={int(time.time() * 1000)}&list="
+
+
+class StockQuote:
+    _client: Optional[Sina] = None
+    _cache: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()  # 按写入时间排序
+    _lock = threading.Lock()
+    _hits = 0
+    _misses = 0
+    _requests = 0
+
+    @classmethod
+    def client(cls) -> Sina:
+        """进程级新浪行情客户端"""
+        if cls._client is None:
+            with cls._lock:
+                if cls._client is None:
+                    cls._client = _SinaQuotation()
+        return cls._client
+
+    @classmethod
+    def real(cls, stock_codes: list[str]) -> dict:
+        """
+        查询实时行情（阻塞调用，在事件循环中应通过 ToolHttp.offload 执行）
+
+        Args:
+            stock_codes: 股票代码列表，可带 sh/sz/bj 前缀；不带前缀时按 easyquotation 的规则推断市场
+
+        Returns:
+            以带前缀的小写代码（如 sh000001）为键的行情字典，查询不到的代码不出现在结果中
+        """
+        ttl = AstraConfig.get("AstraLink.tools.stock_ttl", 5)
+        now = time.monotonic()
+        result: dict = {}
+        missing: list[str] = []
+        with cls._lock:
+            for code in dict.fromkeys(cls.normalize(c) for c in stock_codes):
+                entry = cls._cache.get(code)
+                if entry is not None and now < entry[0]:
+                    result[code] = entry[1]
+                    cls._hits += 1
+                else:
+                    missing.append(code)
+                    cls._misses += 1
+        if missing:
+            fetched = cls.client().real(missing, prefix=True)
+            expires_at = time.monotonic() + ttl
+            with cls._lock:
+                cls._requests += 1
+                for code, quote in fetched.items():
+                    cls._cache[code] = (expires_at, quote)
+                    cls._cache.move_to_end(code)
+                cls._evict(time.monotonic())
+            result.update(fetched)
+        return result
+
+    @staticmethod
+    def normalize(code: str) -> str:
+        """规范为带市场前缀的小写代码：'600519' -> 'sh600519'，'SZ000001' -> 'sz000001'"""
+        code = code.strip().lower()
+        return get_stock_type(code) + code[-6:]
+
+    @classmethod
+    def _evict(cls, now: float) -> None:
+        """先清理过期行情，仍超过 cache_size 时淘汰最早写入的（调用方需持有 _lock）"""
+        limit = AstraConfig.get("AstraLink.tools.cache_size", 256)
+        if len(cls._cache) <= limit:
+            return
+        for code in [c for c, (expires_at, _) in cls._cache.items() if expires_at <= now]:
+            del cls._cache[code]
+        while len(cls._cache) > limit:
+            cls._cache.popitem(last=False)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._cache.clear()
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            total = cls._hits + cls._misses
+            return {
+                "hits": cls._hits,
+                "misses": cls._misses,
+                "requests": cls._requests,
+                "size": len(cls._cache),
+                "hit_rate": cls._hits / total if total else 0.0,
+            }
@@ -0,0 +1,184 @@
+"""
+MCP 工具结果缓存
+
+    @test_mcp.tool()
+    @tool_cache(ttl=600, maxsize=256)
+    def get_current_weather(city: str) -> str: ...
+
+  - 按调用参数缓存返回值，每个工具单独设置 TTL，超过 maxsize 时淘汰最久未使用的条目
+  - 同一参数的并发调用只执行一次（singleflight），其余调用等待并共享结果
+  - 异常不缓存；参数不可哈希时直接调用原函数
+  - 同步与 async 工具均可使用，functools.wraps 保留签名，FastMCP 据此生成参数 schema
+"""
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+# 所有被装饰工具的缓存，供 tool_cache_stats 汇总
+_caches: dict[str, "_ToolCache"] = {}
+
+
+class _ToolCache:
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Any, tuple[float, Any]]" = OrderedDict()
+        self._inflight: dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def lookup(self, key) -> tuple[bool, Any]:
+        """调用方需持有 _lock"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+        return False, None
+
+    def store(self, key, value) -> None:
+        """调用方需持有 _lock"""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+def _make_key(args: tuple, kwargs: dict) -> Optional[tuple]:
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def tool_cache(ttl: float, maxsize: int = 256) -> Callable[[Callable], Callable]:
+    """
+    缓存工具函数的返回值
+
+    Args:
+        ttl: 结果有效期（秒）
+        maxsize: 最多缓存的参数组合数
+
+    被装饰的函数额外提供 cache_stats() 与 cache_clear()。
+    """
+
+    def decorator(func: Callable) -> Callable:
+        cache = _ToolCache(func.__name__, ttl, maxsize)
+        _caches[func.__name__] = cache
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = _make_key(args, kwargs)
+                if key is None:
+                    return await func(*args, **kwargs)
+                loop = asyncio.get_running_loop()
+                with cache._lock:
+                    found, value = cache.lookup(key)
+                    if found:
+                        return value
+                    future = cache._inflight.get(key)
+                    # asyncio.Future 只能在创建它的事件循环中等待
+                    if future is not None and future.get_loop() is loop:
+                        cache.coalesced += 1
+                        leader = False
+                    else:
+                        cache.misses += 1
+                        future = loop.create_future()
+                        cache._inflight[key] = future
+                        leader = True
+                if not leader:
+                    # shield：等待方被取消时不影响共享结果
+                    return await asyncio.shield(future)
+                try:
+                    value = await func(*args, **kwargs)
+                except BaseException as e:
+                    with cache._lock:
+                        cache._inflight.pop(key, None)
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        # 没有其他等待方时避免 "exception was never retrieved"
+                        future.exception()
+                    raise
+                with cache._lock:
+                    cache.store(key, value)
+                    cache._inflight.pop(key, None)
+                future.set_result(value)
+                return value
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = _make_key(args, kwargs)
+                if key is None:
+                    return func(*args, **kwargs)
+                with cache._lock:
+                    found, value = cache.lookup(key)
+                    if found:
+                        return value
+                    future = cache._inflight.get(key)
+                    if future is not None:
+                        cache.coalesced += 1
+                        leader = False
+                    else:
+                        cache.misses += 1
+                        future = concurrent.futures.Future()
+                        cache._inflight[key] = future
+                        leader = True
+                if not leader:
+                    return future.result()
+                try:
+                    value = func(*args, **kwargs)
+                except BaseException as e:
+                    with cache._lock:
+                        cache._inflight.pop(key, None)
+                    future.set_exception(e)
+                    raise
+                with cache._lock:
+                    cache.store(key, value)
+                    cache._inflight.pop(key, None)
+                future.set_result(value)
+                return value
+
+        wrapper.cache_stats = cache.stats
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+def tool_cache_stats() -> dict[str, dict]:
+    """所有被 tool_cache 装饰的工具的缓存统计"""
+    return {name: cache.stats() for name, cache in _caches.items()}
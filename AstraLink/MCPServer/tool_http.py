@@ -0,0 +1,91 @@
+"""
+MCP 工具共用的上游访问
+
+  - 异步 HTTP：httpx.AsyncClient 复用 keep-alive 连接，统一超时，按主机限制并发
+    （一个慢上游最多占满自己的并发额度，不会拖住其他主机的请求）
+  - 阻塞调用：交给有界线程池执行，不阻塞 MCP 服务器的事件循环
+
+AsyncClient 的连接池绑定在创建它的事件循环上，而工具可能运行在 AstraLoop（内存流）
+或 MCP 服务器的 uvicorn 循环（SSE）中，因此每个事件循环各自持有一个客户端。
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+import httpx
+
+from AstraConfig import AstraConfig
+
+T = TypeVar("T")
+
+
+class _LoopState:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.semaphores: dict[str, asyncio.Semaphore] = {}
+
+
+class ToolHttp:
+    _states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _state(cls) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = cls._states.get(loop)
+        if state is None:
+            config = AstraConfig.get("AstraLink.tools.http", {})
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(config.get("timeout", 10.0), connect=config.get("connect_timeout", 5.0)),
+                limits=httpx.Limits(
+                    max_connections=config.get("max_connections", 32),
+                    max_keepalive_connections=config.get("max_keepalive_connections", 16),
+                    keepalive_expiry=config.get("keepalive_expiry", 30.0),
+                ),
+                follow_redirects=True,
+            )
+            state = cls._states[loop] = _LoopState(client)
+        return state
+
+    @classmethod
+    def client(cls) -> httpx.AsyncClient:
+        """当前事件循环的共享客户端"""
+        return cls._state().client
+
+    @classmethod
+    async def request(cls, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """发送请求，同一主机的并发数不超过 AstraLink.tools.http.per_host_limit"""
+        state = cls._state()
+        host = httpx.URL(url).host
+        semaphore = state.semaphores.get(host)
+        if semaphore is None:
+            limit = AstraConfig.get("AstraLink.tools.http.per_host_limit", 8)
+            semaphore = state.semaphores[host] = asyncio.Semaphore(limit)
+        async with semaphore:
+            return await state.client.request(method, url, **kwargs)
+
+    @classmethod
+    async def get(cls, url: str, **kwargs: Any) -> httpx.Response:
+        return await cls.request("GET", url, **kwargs)
+
+    @classmethod
+    async def offload(cls, func: Callable[..., T], *args: Any) -> T:
+        """在有界线程池中执行阻塞函数"""
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=AstraConfig.get("AstraLink.tools.blocking_workers", 4),
+                        thread_name_prefix="AstraTool",
+                    )
+        return await asyncio.get_running_loop().run_in_executor(cls._executor, func, *args)
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """关闭当前事件循环的客户端（在该循环结束前调用）"""
+        state = cls._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.aclose()
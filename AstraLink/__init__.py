@@ -1,5 +1,8 @@
 from .AstraLink import AstraLink
+from .AstraLinkCatalog import AstraLinkCatalog
+from .AstraLinkPool import AstraLinkPool
+from .AstraLinkScope import AstraLinkScope
 
 
 
-__all__ = ["AstraLink"]
\ No newline at end of file
+__all__ = ["AstraLink", "AstraLinkCatalog", "AstraLinkPool", "AstraLinkScope"]
\ No newline at end of file
@@ -1,9 +1,8 @@
-import requests
 from mcp.server.fastmcp import FastMCP
-import easyquotation
 
+from AstraChart import AstraChartSearch
 from AstraConfig import AstraConfig
-from AstraLink.MCPServer import AstraLinkMCP
+from AstraLink.MCPServer import AstraLinkMCP, StockQuote, ToolHttp, tool_cache
 # Create server
 AstraConfig.load("config/config.json")
 mcp_port =AstraConfig.get("AstraLink").get("mcp_server").get("mcp_port")
@@ -14,19 +13,47 @@ test_mcp = FastMCP(
 )
 
 
+tool_config = AstraConfig.get("AstraLink.tools", {})
+
+
 @test_mcp.tool()
-def get_current_weather(city: str) -> str:
+@tool_cache(ttl=tool_config.get("weather_ttl", 600), maxsize=tool_config.get("cache_size", 256))
+async def get_current_weather(city: str) -> str:
     print(f"[debug-server] get_current_weather({city})")
-    endpoint = "https://wttr.in"
-    response = requests.get(f"{endpoint}/{city}")
+    endpoint = AstraConfig.get("AstraLink.tools.weather_endpoint", "https://wttr.in")
+    response = await ToolHttp.get(f"{endpoint}/{city}")
+    # 非 2xx 抛出异常：tool_cache 不缓存异常，服务端临时故障不会被缓存 weather_ttl 秒
+    response.raise_for_status()
     return response.text
 @test_mcp.tool()
-def select_stock_info(stock_code: str) -> dict:
+async def select_stock_info(stock_code: str) -> dict:
     """Use stock code to select stock info ,you MUST need code ,
     if you don't know code ,you MUST ask for user"""
-    quotation = easyquotation.use('sina')  # 新浪 ['sina'] 腾讯 ['tencent', 'qq']
-    answer = quotation.real(stock_code)  # 支持直接指定前缀，如 'sh000001'
-    return answer
+    # easyquotation 只有同步接口，放到线程池中执行
+    return await ToolHttp.offload(StockQuote.real, [stock_code])
+
+@test_mcp.tool()
+async def select_stocks_info(stock_codes: list[str]) -> dict:
+    """Use a list of stock codes to select stock info in one request,
+    prefer this over calling select_stock_info repeatedly for a watchlist"""
+    return await ToolHttp.offload(StockQuote.real, stock_codes)
+
+@test_mcp.tool()
+async def search_chat_history(query: str, limit: int = 10,
+                              device: str | None = None, conversation_id: int | None = None) -> list[dict]:
+    """Full-text search over previous chat messages and conversation memory of the current conversation.
+    Use it to look up what was said earlier; space-separated keywords must all match.
+    Returns the best matching messages with a snippet.
+    Relevance ranking only covers the newest 2000 matches, so older matches may be missing;
+    keywords shorter than 3 characters fall back to substring matching over the newest 20000 messages only,
+    newest first. Prefer keywords of 3 or more characters"""
+    # device / conversation_id 由客户端按发起请求的会话注入（AstraLinkScope），不暴露给模型；
+    # 没有会话范围时拒绝执行，避免检索到其他设备 / 会话的记录
+    if device is None or conversation_id is None:
+        raise ValueError("search_chat_history 只能在会话范围内调用（缺少 device / conversation_id）")
+    # SQLite 查询为同步调用，放到线程池中执行
+    return await ToolHttp.offload(AstraChartSearch.default().search, query, min(limit, 50), "all",
+                                  device, conversation_id)
 
 @test_mcp.tool()
 def get_device_info()->list[str]:
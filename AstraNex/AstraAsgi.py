@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+from typing import AsyncIterator
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from AstraChart import AstraChart
+from AstraConfig import AstraConfig
+from AstraLink.MCPServer.tool_http import ToolHttp
+from AstraNex.AstraLogger import AstraLogger
+from AstraNex.AstraLoop import AstraLoop
+from AstraNex.AstraNex import AstraNex
+from AstraNex.AstraRoute import AstraRoute, _history_page, _optional_int, _search_results, _sse
+
+
+class AstraAsgi(AstraRoute):
+    """
+    AstraRoute 的 ASGI（Starlette）版本，由 uvicorn 运行
+      - 与 Flask 版本提供相同的接口，复用 send_message / stream_message
+      - uvicorn 的事件循环即 AstraLoop：MCP 会话池与 AsyncOpenAI 客户端都在该循环上，
+        请求直接 await，不再跨循环转交
+      - MCP 会话池与 AstraCore 的连接池在 lifespan 中启动与关闭
+    """
+
+    def __init__(self, astra_chart: AstraChart, astra_nex: AstraNex):
+        super().__init__(None, astra_chart, astra_nex)
+
+    def register_routes(self):
+        self.app = Starlette(
+            routes=[
+                Route("/", self.index, methods=["GET"]),
+                Route("/send", self.send, methods=["GET", "POST"]),
+                Route("/send/stream", self.send_stream, methods=["GET", "POST"]),
+                Route("/add_chat_message", self.add_chat_message, methods=["POST"]),
+                Route("/history", self.history, methods=["GET"]),
+                Route("/search", self.search, methods=["GET"]),
+            ],
+            lifespan=self.lifespan,
+        )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self, app: Starlette) -> AsyncIterator[None]:
+        AstraLoop.attach(asyncio.get_running_loop())
+        await self.astra_link.pool.start()
+        AstraLogger.info(f"MCP 会话池已启动: {self.astra_link.pool.stats()}")
+        if AstraConfig.get("AstraCore.http.warmup", False):
+            await self.core_ins.warmup()
+        try:
+            yield
+        finally:
+            await self.astra_link.pool.close()
+            await ToolHttp.aclose()
+            await self.core_ins.aclose()
+            AstraLoop.detach()
+
+    @staticmethod
+    async def _message_args(request: Request) -> tuple[int, str, str]:
+        """GET 从查询参数读取（id / device 有默认值），POST 从 JSON 读取"""
+        if request.method == "POST":
+            req = await request.json()
+            return int(req['id']), req['device'], req['message']
+        conversation_id = int(request.query_params.get('id', AstraConfig.get("AstraMemory.default_id", 1)))
+        device = request.query_params.get('device', AstraConfig.get("AstraMemory.default_device", "default"))
+        return conversation_id, device, request.query_params.get('message')
+
+    async def index(self, request: Request):
+        return PlainTextResponse("该接口正常工作")
+
+    async def send(self, request: Request):
+        conversation_id, device, message = await self._message_args(request)
+        return PlainTextResponse(await self.send_message(conversation_id, device, message))
+
+    async def send_stream(self, request: Request):
+        conversation_id, device, message = await self._message_args(request)
+        events: "asyncio.Queue[tuple[str, dict] | None]" = asyncio.Queue()
+
+        def emit(event: str, data: dict) -> None:
+            events.put_nowait((event, data))
+
+        async def generate() -> AsyncIterator[str]:
+            task = asyncio.create_task(self.stream_message(conversation_id, device, message, emit))
+            task.add_done_callback(lambda _: events.put_nowait(None))
+            try:
+                while (item := await events.get()) is not None:
+                    yield _sse(*item)
+                if not task.cancelled() and task.exception() is not None:
+                    yield _sse("error", {"message": str(task.exception())})
+            finally:
+                # 客户端断开时取消仍在运行的 agent
+                task.cancel()
+
+        return StreamingResponse(generate(), media_type="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+
+    async def history(self, request: Request):
+        """键集分页读取聊天记录：before / after 为上一页最后一条的 id"""
+        params = request.query_params
+        before, after = params.get('before'), params.get('after')
+        page = await run_in_threadpool(
+            _history_page, self.astra_chart,
+            limit=int(params.get('limit', 50)),
+            before_id=int(before) if before is not None else None,
+            after_id=int(after) if after is not None else None,
+            since=params.get('since', ""),
+        )
+        return JSONResponse(page)
+
+    async def search(self, request: Request):
+        """全文检索聊天记录与 memory"""
+        params = request.query_params
+        conversation_id = params.get('id')
+        results = await run_in_threadpool(
+            _search_results, self.astra_chart,
+            query=params.get('q', ""),
+            limit=int(params.get('limit', 20)),
+            source=params.get('source', "all"),
+            device=params.get('device'),
+            conversation_id=int(conversation_id) if conversation_id is not None else None,
+        )
+        return JSONResponse(results)
+
+    async def add_chat_message(self, request: Request):
+        """添加回话数据"""
+        data = await request.json()
+        if not data:
+            return JSONResponse({'error': "Data error"})
+        if not data.get('role'):
+            return JSONResponse({'error': 'Name and email are required'}, status_code=400)
+        elif not data.get('content'):
+            return JSONResponse({'error': 'Content is required'}, status_code=400)
+
+        try:
+            # 组提交：等待所在批次提交后才返回
+            row_id = await self.astra_chart.writer.add_async(data['role'], data['content'], device=data.get('device'),
+                                                             conversation_id=_optional_int(data.get('id')))
+        except Exception as e:
+            return JSONResponse({'error': str(e)}, status_code=500)
+        return JSONResponse({'status': 'ok', 'id': row_id})
@@ -0,0 +1,90 @@
+# AstraLoop.py - AstraLoop "星轨" 常驻事件循环
+# 万象同轨，一环长明
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class AstraLoop:
+    """
+    AstraLoop "星轨" —— 进程级常驻事件循环
+    特性：
+      - 在守护线程中运行一个长期存在的事件循环
+      - 绑定在循环上的长连接资源（MCP 会话池等）只在这里创建和使用
+      - Flask 每个异步请求都在临时事件循环中执行，通过 run() 把协程转交到常驻循环
+      - ASGI 模式下通过 attach() 直接采用 uvicorn 的事件循环，不再另起线程
+    """
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        """获取常驻事件循环，首次调用时启动后台线程"""
+        if cls._loop is None:
+            with cls._lock:
+                if cls._loop is None:
+                    loop = asyncio.new_event_loop()
+                    started = threading.Event()
+
+                    def run():
+                        asyncio.set_event_loop(loop)
+                        loop.call_soon(started.set)
+                        loop.run_forever()
+
+                    cls._thread = threading.Thread(target=run, name="AstraLoop", daemon=True)
+                    cls._thread.start()
+                    started.wait()
+                    cls._loop = loop
+        return cls._loop
+
+    @classmethod
+    def attach(cls, loop: asyncio.AbstractEventLoop) -> None:
+        """采用外部正在运行的事件循环作为常驻循环（须在任何资源绑定到循环之前调用）"""
+        with cls._lock:
+            if cls._loop is not None and cls._loop is not loop:
+                raise RuntimeError("AstraLoop 已在运行其他事件循环")
+            cls._loop, cls._thread = loop, None
+
+    @classmethod
+    def detach(cls) -> None:
+        """解除 attach 的外部事件循环（不会停止该循环）"""
+        with cls._lock:
+            if cls._thread is None:
+                cls._loop = None
+
+    @classmethod
+    def submit(cls, coro: Coroutine[Any, Any, T]) -> "concurrent.futures.Future[T]":
+        """把协程提交到常驻循环，返回线程安全的 Future"""
+        return asyncio.run_coroutine_threadsafe(coro, cls.get_loop())
+
+    @classmethod
+    async def run(cls, coro: Coroutine[Any, Any, T]) -> T:
+        """在常驻循环中执行协程并等待结果（已在常驻循环中时直接 await）"""
+        loop = cls.get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    @classmethod
+    def run_sync(cls, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """在同步代码中执行协程并阻塞等待结果（不能在常驻循环线程内调用）"""
+        return cls.submit(coro).result(timeout)
+
+    @classmethod
+    def stop(cls) -> None:
+        """停止常驻循环"""
+        with cls._lock:
+            loop, thread = cls._loop, cls._thread
+            cls._loop, cls._thread = None, None
+        if loop is None or thread is None:
+            # 外部循环由其所有者负责停止
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not threading.current_thread():
+            thread.join()
+        loop.close()
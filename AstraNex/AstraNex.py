@@ -1,4 +1,4 @@
-from sqlite3 import Connection
+from AstraChart import AstraChart
 from AstraConfig import AstraConfig
 from AstraCore import AstraCore
 from AstraCore.AstraMemory.memory import AstraMemory
@@ -6,11 +6,11 @@ from AstraLink import AstraLink
 
 
 class AstraNex:
-    def __init__(self,db_connection:Connection,
+    def __init__(self,astra_chart:AstraChart,
                  astra_core:AstraCore,
                  astra_link:AstraLink,
                  astra_memory:AstraMemory):
-        self.db_connection =db_connection
+        self.astra_chart = astra_chart
         self.astra_core = astra_core
         self.astra_link = astra_link
         self.astra_memory = astra_memory
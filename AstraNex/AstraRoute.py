@@ -1,49 +1,134 @@
+import asyncio
+import json
+import queue
+from typing import Callable, Iterator
+
 from agents import RunResult
-from agents.mcp import MCPServerSse
-from flask import Flask, request, jsonify
-from sqlite3 import Connection
+from flask import Flask, Response, request, jsonify
 
-from openai.types.responses import EasyInputMessageParam
+from openai.types.responses import EasyInputMessageParam, ResponseTextDeltaEvent
 
-from AstraCore.AstraMemory import AstraMemoryJson
+from AstraChart import AstraChart
+from AstraConfig import AstraConfig
+from AstraLink import AstraLinkScope
+from config_accessor import OPENAI_PROMPT
 from AstraNex import AstraNex
+from AstraNex.AstraLoop import AstraLoop
 temp_memory = []
 class AstraRoute:
     def __init__(self, app: Flask,
-                 db_connection: Connection,
+                 astra_chart: AstraChart,
                  astra_nex:AstraNex,
                  ):
         self.app = app
-        self.db_connection = db_connection
+        self.astra_chart = astra_chart
         self.core_ins = astra_nex.astra_core
         self.astra_link = astra_nex.astra_link
         self.astra_memory = astra_nex.astra_memory
         self.register_routes()
 
-    @staticmethod
-    async def create_and_start_server(config):
-        """创建并启动单个服务器"""
-        server = MCPServerSse(
-            name=config["name"],
-            params={
-                "url": config["url"],
-                "headers": config.get("headers", {})
-            },
-            cache_tools_list=config.get("cache_tools_list", True),
-        )
-        # 进入上下文管理器
-        await server.__aenter__()
-        return server
-
-    async def run_with_multiple_servers(self,server_configs):
-        """运行带有多个MCP服务器的agent"""
-
-        # 创建并启动所有服务器
-        servers = []
-        for config in server_configs:
-            server = await self.create_and_start_server(config)
-            servers.append(server)
-        return servers
+    async def send_message(self, conversation_id: int, device: str, message: str) -> str:
+        """组装上下文 -> 运行 agent -> 追加本轮两条消息（追加是原子的，并发请求不会互相覆盖）
+
+        MCP 会话与 OpenAI 客户端绑定在 AstraLoop 上，必须通过 AstraLoop.run 调用；
+        memory 的读写是阻塞 I/O（文件 / sqlite / 向量检索），放到线程中执行，不阻塞共享事件循环；
+        agent 调用的会话范围工具（如 search_chat_history）被限定在本会话（AstraLinkScope）
+        """
+        human_message: EasyInputMessageParam = {
+            "role": "user",
+            "content": message
+        }
+        memory_list = await asyncio.to_thread(
+            self.astra_memory.build_context, conversation_id, device, [human_message], OPENAI_PROMPT.value)
+        # 借用会话池中已初始化的 MCP 会话
+        servers = await self.astra_link.pool.acquire()
+        with AstraLinkScope.use(device, conversation_id):
+            ans: RunResult = await self.core_ins.run_agent(servers, memory_list)
+        ai_message: EasyInputMessageParam = {
+            "role": "assistant",
+            "content": ans.final_output
+        }
+        await asyncio.to_thread(self.astra_memory.append, conversation_id, device, [human_message, ai_message])
+        return ans.final_output
+
+    async def stream_message(self, conversation_id: int, device: str, message: str,
+                             emit: Callable[[str, dict], None]) -> str:
+        """
+        流式运行 agent：文本增量与工具调用通过 emit(event, data) 逐个推送，
+        结束后一次性追加本轮两条消息（中途失败或被取消时不写入 memory）
+
+        与 send_message 相同，必须在 AstraLoop 上运行
+        """
+        human_message: EasyInputMessageParam = {
+            "role": "user",
+            "content": message
+        }
+        memory_list = await asyncio.to_thread(
+            self.astra_memory.build_context, conversation_id, device, [human_message], OPENAI_PROMPT.value)
+        servers = await self.astra_link.pool.acquire()
+        # run_streamed 在此创建后台任务，任务复制当前上下文，其中的工具调用同样限定在本会话
+        with AstraLinkScope.use(device, conversation_id):
+            result = self.core_ins.run_agent_streamed(servers, memory_list)
+
+        async def forward() -> None:
+            async for event in result.stream_events():
+                if event.type == "raw_response_event":
+                    if isinstance(event.data, ResponseTextDeltaEvent):
+                        emit("delta", {"text": event.data.delta})
+                elif event.type == "run_item_stream_event":
+                    if event.name == "tool_called":
+                        raw = event.item.raw_item
+                        emit("tool_call", {
+                            "name": getattr(raw, "name", None),
+                            "arguments": getattr(raw, "arguments", None),
+                        })
+                    elif event.name == "tool_output":
+                        emit("tool_output", {"output": str(event.item.output)})
+
+        # stream_events 会吞掉取消并等待 agent 跑完，因此在独立任务中消费事件：
+        # 本协程被取消（客户端断开）时先 result.cancel() 停止模型与工具调用，再结束消费任务
+        consumer = asyncio.ensure_future(forward())
+        consumer.add_done_callback(lambda task: task.cancelled() or task.exception())
+        try:
+            await asyncio.shield(consumer)
+        except asyncio.CancelledError:
+            result.cancel()
+            consumer.cancel()
+            raise
+        if not result.is_complete:
+            raise RuntimeError("agent 运行未完成")
+        ai_message: EasyInputMessageParam = {
+            "role": "assistant",
+            "content": result.final_output
+        }
+        await asyncio.to_thread(self.astra_memory.append, conversation_id, device, [human_message, ai_message])
+        emit("done", {"output": result.final_output})
+        return result.final_output
+
+    def stream_response(self, conversation_id: int, device: str, message: str) -> Response:
+        """把 AstraLoop 上的 stream_message 桥接为 Flask 的 SSE 响应"""
+        events: "queue.Queue[tuple[str, dict] | None]" = queue.Queue()
+
+        def emit(event: str, data: dict) -> None:
+            events.put((event, data))
+
+        def generate() -> Iterator[str]:
+            future = AstraLoop.submit(self.stream_message(conversation_id, device, message, emit))
+            future.add_done_callback(lambda _: events.put(None))
+            try:
+                while (item := events.get()) is not None:
+                    yield _sse(*item)
+                if not future.cancelled() and future.exception() is not None:
+                    yield _sse("error", {"message": str(future.exception())})
+            finally:
+                # 客户端断开时取消仍在运行的 agent
+                future.cancel()
+
+        return Response(generate(), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+
     def register_routes(self):
         @self.app.route("/", methods=["GET"])
         def index():
@@ -52,67 +137,52 @@ class AstraRoute:
         @self.app.route("/send", methods=["GET"])
         async def send():
             message:str = request.args.get('message')
-            path = "memory_test/agent_memory.json"
-            memory = self.astra_memory.load_json_memory(path)
-            human_message :EasyInputMessageParam = {
-                "role":"user",
-                "content":message
-            }
-            memory_list = memory['memory']
-            memory_list.append(human_message)
-            configs = []
-            servers = []
-            for server in self.astra_link.mcp_server_list:
-                configs.append(
-                    {
-                        "name": server.name,
-                        "url" : f"http://{server.host}:{server.port}/sse"
-                    }
-                )
-                servers = await self.run_with_multiple_servers(configs)
-            ans:RunResult = await self.core_ins.run_agent(servers,memory_list)
-            ai_message = {
-                "role":"assistant",
-                "content":ans.final_output
-            }
-            memory_list.append(ai_message)
-            self.astra_memory.write_json_memory(memory, path)
-            return ans.final_output
+            conversation_id: int = request.args.get('id', AstraConfig.get("AstraMemory.default_id", 1), type=int)
+            device: str = request.args.get('device', AstraConfig.get("AstraMemory.default_device", "default"))
+            return await AstraLoop.run(self.send_message(conversation_id, device, message))
 
         @self.app.route("/send", methods=["POST"])
-        async def send():
+        async def send_json():
             req = request.json
             message: str = req['message']
-            id :int =req['id']
+            id :int =int(req['id'])
             device:str =req['device']
+            return await AstraLoop.run(self.send_message(id, device, message))
 
-            # path = "memory_test/agent_memory.json"
-            # memory = self.astra_memory.load_json_memory(path)
-            human_message: EasyInputMessageParam = {
-                "role": "user",
-                "content": message
-            }
-            memory_list = memory['memory']
-            memory_list.append(human_message)
-            configs = []
-            servers = []
-            for server in self.astra_link.mcp_server_list:
-                configs.append(
-                    {
-                        "name": server.name,
-                        "url": f"http://{server.host}:{server.port}/sse"
-                    }
-                )
-                servers = await self.run_with_multiple_servers(configs)
-            ans: RunResult = await self.core_ins.run_agent(servers, memory_list)
-            ai_message = {
-                "role": "assistant",
-                "content": ans.final_output
-            }
-            memory_list.append(ai_message)
-            self.astra_memory.write_json_memory(memory, path)
-            return ans.final_output
+        @self.app.route("/send/stream", methods=["GET"])
+        def send_stream():
+            message: str = request.args.get('message')
+            conversation_id: int = request.args.get('id', AstraConfig.get("AstraMemory.default_id", 1), type=int)
+            device: str = request.args.get('device', AstraConfig.get("AstraMemory.default_device", "default"))
+            return self.stream_response(conversation_id, device, message)
+
+        @self.app.route("/send/stream", methods=["POST"])
+        def send_stream_json():
+            req = request.json
+            return self.stream_response(int(req['id']), req['device'], req['message'])
 
+        @self.app.route("/history", methods=["GET"])
+        def history():
+            """键集分页读取聊天记录：before / after 为上一页最后一条的 id"""
+            return jsonify(_history_page(
+                self.astra_chart,
+                limit=request.args.get('limit', 50, type=int),
+                before_id=request.args.get('before', type=int),
+                after_id=request.args.get('after', type=int),
+                since=request.args.get('since', ""),
+            ))
+
+        @self.app.route("/search", methods=["GET"])
+        def search():
+            """全文检索聊天记录与 memory"""
+            return jsonify(_search_results(
+                self.astra_chart,
+                query=request.args.get('q', ""),
+                limit=request.args.get('limit', 20, type=int),
+                source=request.args.get('source', "all"),
+                device=request.args.get('device'),
+                conversation_id=request.args.get('id', type=int),
+            ))
 
         @self.app.route("/chat",methods = ["POST"])
         def chat():
@@ -129,13 +199,33 @@ class AstraRoute:
                 return jsonify({'error': 'Content is required'}), 400
 
             try:
-                self.db_connection.execute(
-                    """
-                    INSERT INTO ASTRA_CHAT (role, content) 
-                    VALUES (?,?)
-                    """
-                    , (data['role'], data['content']))
-                self.db_connection.commit()
+                # 组提交：等待所在批次提交后才返回
+                row_id = self.astra_chart.writer.add(data['role'], data['content'],
+                                                     device=data.get('device'), conversation_id=_optional_int(data.get('id')))
             except Exception as e:
-                self.db_connection.rollback()
                 return jsonify({'error': str(e)}), 500
+            return jsonify({'status': 'ok', 'id': row_id})
+
+
+def _history_page(astra_chart: AstraChart, limit: int, before_id: int | None, after_id: int | None,
+                  since: str) -> dict:
+    """一页聊天记录；next 为下一页的游标，没有更多记录时为 None"""
+    limit = max(1, min(limit, AstraConfig.get("AstraChart.history_page_limit", 200)))
+    messages = astra_chart.history(limit=limit, before_id=before_id, after_id=after_id, since=since)
+    return {"messages": messages, "next": messages[-1]["id"] if len(messages) == limit else None}
+
+
+def _search_results(astra_chart: AstraChart, query: str, limit: int, source: str,
+                    device: str | None, conversation_id: int | None) -> dict:
+    limit = max(1, min(limit, AstraConfig.get("AstraChart.history_page_limit", 200)))
+    return {"results": astra_chart.search.search(query, limit=limit, source=source,
+                                                 device=device, conversation_id=conversation_id)}
+
+
+def _optional_int(value) -> int | None:
+    return int(value) if value is not None else None
+
+
+def _sse(event: str, data: dict) -> str:
+    """编码一条 Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
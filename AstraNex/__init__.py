@@ -1,9 +1,11 @@
 from  .AstraNex import AstraNex
 from  .AstraRoute import AstraRoute
+from  .AstraAsgi import AstraAsgi
 from  .AstraLogger import AstraLogger
 
 __all__  =[
     "AstraNex",
     "AstraRoute",
+    "AstraAsgi",
     "AstraLogger"
 ]
\ No newline at end of file
@@ -0,0 +1,131 @@
+# bench_chart_sqlite.py - ASTRA_CHAT 并发写入 / 读取对比（临时数据库，不触碰 db/AstraEcho.db）
+#   旧方案 : 所有线程共享一个 sqlite3.Connection（check_same_thread=False，加锁串行），默认 rollback journal
+#   AstraChart : 每线程一个连接，WAL + synchronous=NORMAL，写事务 BEGIN IMMEDIATE + busy_timeout
+# 每个并发级别：WRITERS 个线程各写入 INSERTS 条，同时 READERS 个线程反复读取最近 50 条
+# 用法（在项目根目录）：python benchmarks/bench_chart_sqlite.py
+
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AstraConfig import AstraConfig
+from AstraChart import AstraChart
+
+LEVELS = (1, 4, 16)
+INSERTS = 200
+READERS = 4
+
+_CREATE = """
+CREATE TABLE ASTRA_CHAT(
+    ID INTEGER PRIMARY KEY AUTOINCREMENT ,
+    role TEXT NOT NULL ,
+    content TEXT NOT NULL ,
+    timestamp TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+)
+"""
+_READ = "SELECT ID, role, content FROM ASTRA_CHAT ORDER BY ID DESC LIMIT 50"
+
+
+class SharedConnection:
+    """旧方案：单连接 + 锁"""
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def add_chat_message(self, role: str, content: str) -> None:
+        with self.lock:
+            self.conn.execute("INSERT INTO ASTRA_CHAT (role, content) VALUES (?,?)", (role, content))
+            self.conn.commit()
+
+    def read(self) -> list:
+        with self.lock:
+            return self.conn.execute(_READ).fetchall()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class ChartAdapter:
+    def __init__(self, db_path: str):
+        self.chart = AstraChart(db_path)
+
+    def add_chat_message(self, role: str, content: str) -> None:
+        self.chart.add_chat_message(role, content)
+
+    def read(self) -> list:
+        return self.chart.connection().execute(_READ).fetchall()
+
+    def close(self) -> None:
+        self.chart.close()
+
+
+def new_db() -> str:
+    db_path = str(Path(tempfile.mkdtemp()) / "chart.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(_CREATE)
+    conn.close()
+    return db_path
+
+
+def run(store, writers: int) -> tuple[float, int, int]:
+    """返回 (写入 条/秒, 读取次数, 失败数)"""
+    done = threading.Event()
+    reads = 0
+    errors = 0
+    lock = threading.Lock()
+
+    def writer(n: int):
+        nonlocal errors
+        for i in range(INSERTS):
+            try:
+                store.add_chat_message("user", f"writer {n} message {i}")
+            except sqlite3.Error:
+                with lock:
+                    errors += 1
+
+    def reader():
+        nonlocal reads, errors
+        while not done.is_set():
+            try:
+                store.read()
+                with lock:
+                    reads += 1
+            except sqlite3.Error:
+                with lock:
+                    errors += 1
+
+    read_threads = [threading.Thread(target=reader) for _ in range(READERS)]
+    write_threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in read_threads:
+        t.start()
+    start = time.perf_counter()
+    for t in write_threads:
+        t.start()
+    for t in write_threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for t in read_threads:
+        t.join()
+    return writers * INSERTS / elapsed, reads, errors
+
+
+def main():
+    AstraConfig.load("config/config.json")
+    print(f"{'写线程':<8}{'方案':<14}{'写入(条/s)':>12}{'读取次数':>10}{'失败':>6}")
+    for writers in LEVELS:
+        for name, factory in (("共享连接", SharedConnection), ("AstraChart", ChartAdapter)):
+            store = factory(new_db())
+            rate, reads, errors = run(store, writers)
+            store.close()
+            print(f"{writers:<8}{name:<14}{rate:>12.0f}{reads:>10}{errors:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# bench_chart_writer.py - /add_chat_message 写入吞吐：逐条提交 vs 组提交（临时数据库，不触碰 db/AstraEcho.db）
+#   逐条提交 : 每条记录一个事务，AstraChart.add_chat_message
+#   组提交   : AstraChartWriter，后台线程按 batch_size / max_delay 攒批，一个事务 executemany
+# 两者都使用 synchronous=FULL，调用返回时记录均已落盘，持久性相同
+# 每个并发级别模拟 N 个客户端线程，每个线程写入 ROWS // N 条（至少 MIN_PER_CLIENT 条）
+# 用法（在项目根目录）：python benchmarks/bench_chart_writer.py
+
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AstraConfig import AstraConfig
+from AstraChart import AstraChart
+
+CLIENTS = (1, 16, 128)
+ROWS = 2000
+MIN_PER_CLIENT = 10
+
+_CREATE = """
+CREATE TABLE ASTRA_CHAT(
+    ID INTEGER PRIMARY KEY AUTOINCREMENT ,
+    role TEXT NOT NULL ,
+    content TEXT NOT NULL ,
+    timestamp TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+)
+"""
+
+
+def new_chart() -> AstraChart:
+    db_path = str(Path(tempfile.mkdtemp()) / "chart.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(_CREATE)
+    conn.close()
+    return AstraChart(db_path)
+
+
+def run(clients: int, write) -> float:
+    """返回 条/秒"""
+    per_client = max(MIN_PER_CLIENT, ROWS // clients)
+
+    def client(n: int):
+        for i in range(per_client):
+            write("user", f"client {n} message {i}")
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return clients * per_client / (time.perf_counter() - start)
+
+
+def main():
+    AstraConfig.load("config/config.json")
+    AstraConfig.set("AstraChart.sqlite.synchronous", "FULL")
+    AstraConfig.set("AstraChart.writer.synchronous", "FULL")
+    print(f"{'客户端':<8}{'逐条提交(条/s)':>16}{'组提交(条/s)':>14}{'平均批大小':>12}")
+    for clients in CLIENTS:
+        chart = new_chart()
+        single = run(clients, chart.add_chat_message)
+        chart.close()
+
+        chart = new_chart()
+        grouped = run(clients, chart.writer.add)
+        stats = chart.writer.stats()
+        chart.close()
+        print(f"{clients:<8}{single:>16.0f}{grouped:>14.0f}{stats['avg_batch']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# bench_config_accessor.py - ConfigAccessor 单次访问耗时对比
+# 用法（在项目根目录）：python benchmarks/bench_config_accessor.py
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AstraConfig import AstraConfig
+from config_accessor import CONFIG_PATH, OPENAI_MODEL, OPENAI_API_KEY
+
+ROUNDS = 20000
+
+
+def legacy_access(key: str, default=None):
+    """旧实现：每次访问都重新加载并解析配置文件"""
+    AstraConfig.load(CONFIG_PATH)
+    return AstraConfig.get(key, default)
+
+
+def bench(name: str, func) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func()
+    cost = (time.perf_counter() - start) / ROUNDS * 1e6
+    print(f"{name:<32} {cost:>10.2f} us/次")
+    return cost
+
+
+if __name__ == '__main__':
+    AstraConfig.ensure_loaded(CONFIG_PATH)
+    before = bench("旧实现 load + get", lambda: legacy_access(OPENAI_MODEL.config_key))
+    after = bench("快照 OPENAI_MODEL.value", lambda: OPENAI_MODEL.value)
+    bench("快照 OPENAI_API_KEY.value", lambda: OPENAI_API_KEY.value)
+    print(f"加速比: {before / after:.1f}x")
+    AstraConfig().stop_watcher()
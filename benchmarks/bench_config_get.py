@@ -0,0 +1,55 @@
+# bench_config_get.py - 多线程并发 AstraConfig.get 吞吐对比
+# 用法（在项目根目录）：python benchmarks/bench_config_get.py
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AstraConfig import AstraConfig
+
+KEYS = ["AstraCore.api.model", "AstraCore.api.api_key", "AstraChart.db_path", "AstraNex.port", "missing.key"]
+CALLS_PER_THREAD = 50000
+
+
+def legacy_get(key: str, default=None):
+    """旧实现：持全局 RLock，split 后逐层遍历嵌套 dict"""
+    instance = AstraConfig()
+    with instance._lock:
+        value = instance._config
+        for k in key.split('.'):
+            if isinstance(value, dict) and k in value:
+                value = value[k]
+            else:
+                return default
+        return value
+
+
+def bench(name: str, func, threads: int) -> None:
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for i in range(CALLS_PER_THREAD):
+            func(KEYS[i % len(KEYS)])
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    cost = time.perf_counter() - start
+    total = threads * CALLS_PER_THREAD
+    print(f"{name:<20} 线程={threads:<4} {total / cost / 1e6:>8.2f} M次/秒  {cost / total * 1e9:>8.1f} ns/次")
+
+
+if __name__ == '__main__':
+    AstraConfig.load("config/config.json")
+    for n in (1, 4, 16, 64):
+        bench("旧实现 RLock+遍历", legacy_get, n)
+        bench("路径索引 get", AstraConfig.get, n)
+    AstraConfig().stop_watcher()
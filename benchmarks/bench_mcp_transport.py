@@ -0,0 +1,82 @@
+# bench_mcp_transport.py - MCP 工具调用往返延迟：HTTP+SSE vs 内存流
+# 同一个进程内的 FastMCP 服务器，分别通过
+#   sse    : AstraLinkMCPSse（uvicorn + HTTP POST + SSE 回包）
+#   memory : AstraLinkMCPMemory（anyio 内存流直连）
+# 调用同一个 echo 工具 ROUNDS 次，统计单次往返延迟
+# 用法（在项目根目录）：python benchmarks/bench_mcp_transport.py
+
+import logging
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcp.server import FastMCP
+
+from AstraLink import AstraLink
+from AstraLink.AstraLinkClient import AstraLinkMCPMemory, AstraLinkMCPSse
+from AstraLink.MCPServer.AstraLinkMCP import AstraLinkMCP
+from AstraNex.AstraLoop import AstraLoop
+
+ROUNDS = 500
+WARMUP = 20
+
+bench_mcp = FastMCP(name="bench")
+
+
+@bench_mcp.tool()
+def echo(text: str) -> str:
+    return text
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def measure(server) -> list[float]:
+    await server.connect()
+    try:
+        for _ in range(WARMUP):
+            await server.call_tool("echo", {"text": "hello"})
+        samples = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            await server.call_tool("echo", {"text": "hello"})
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+    finally:
+        await server.cleanup()
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{name:<8}{statistics.mean(samples):>10.3f}{samples[len(samples) // 2]:>10.3f}{p99:>10.3f}")
+
+
+def main():
+    # 屏蔽 uvicorn / httpx / mcp 的逐请求日志
+    logging.disable(logging.INFO)
+    port = free_port()
+    link = AstraLink()
+    link.add_mcp_server(AstraLinkMCP(name="bench", mcp_server=bench_mcp, port=port))
+    if not link.start_all_mcp_server_in_loop():
+        raise RuntimeError("bench MCP 服务器启动失败")
+    try:
+        sse = AstraLinkMCPSse(name="bench", params={"url": f"http://127.0.0.1:{port}/sse"})
+        memory = AstraLinkMCPMemory("bench", bench_mcp)
+        print(f"echo 工具往返延迟（ms），{ROUNDS} 次")
+        print(f"{'':<8}{'mean':>10}{'p50':>10}{'p99':>10}")
+        report("sse", AstraLoop.run_sync(measure(sse)))
+        report("memory", AstraLoop.run_sync(measure(memory)))
+    finally:
+        link.stop_mcp_servers()
+
+
+if __name__ == "__main__":
+    main()
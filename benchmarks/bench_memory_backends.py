@@ -0,0 +1,76 @@
+# bench_memory_backends.py - 单轮对话 memory 读写延迟对比
+# 一轮 = 读取会话 + 追加 user/assistant 两条消息
+#   旧方案 : JsonLoader 解析整个文件 -> 追加 -> JsonWriter 重写整个文件
+#   log    : AstraMemoryLog 读取最近 TAIL 条 + 追加
+#   sqlite : AstraMemorySqlite 读取最近 TAIL 条 + 追加
+# 用法（在项目根目录）：python benchmarks/bench_memory_backends.py
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AstraCore.AstraMemory import AstraMemoryLog, AstraMemorySqlite
+from utils import JsonLoader, JsonWriter
+
+SIZES = (1_000, 10_000, 100_000)
+TAIL = 50
+CONVERSATION_ID, DEVICE = 1, "bench"
+
+
+def make_messages(n: int) -> list:
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"第 {i} 条消息 " + "内容" * 20}
+        for i in range(n)
+    ]
+
+
+def turn_messages() -> list:
+    return [{"role": "user", "content": "你好"}, {"role": "assistant", "content": "你好，有什么可以帮你？"}]
+
+
+def timed(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def bench_json(workdir: Path, history: list, rounds: int) -> float:
+    path = workdir / "memory.json"
+    JsonWriter.write_json({"id": CONVERSATION_ID, "device": DEVICE, "memory": history}, path)
+
+    def turn():
+        memory = JsonLoader.load_json_file(path)
+        memory["memory"].extend(turn_messages())
+        JsonWriter.write_json(memory, path)
+
+    return timed(turn, rounds)
+
+
+def bench_backend(backend, history: list, rounds: int) -> float:
+    backend.replace(CONVERSATION_ID, DEVICE, history)
+    backend.flush()
+
+    def turn():
+        backend.load(CONVERSATION_ID, DEVICE, limit=TAIL)
+        backend.append(CONVERSATION_ID, DEVICE, turn_messages())
+
+    cost = timed(turn, rounds)
+    backend.close()
+    return cost
+
+
+if __name__ == '__main__':
+    print(f"{'消息数':>8} {'旧 JSON 整体读写':>16} {'log':>10} {'sqlite':>10}   (ms/轮)")
+    for size in SIZES:
+        history = make_messages(size)
+        rounds = max(3, 200_000 // size // 10)
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            legacy = bench_json(workdir, history, rounds)
+            log = bench_backend(AstraMemoryLog(str(workdir / "memory.log")), history, rounds * 10)
+            sqlite = bench_backend(AstraMemorySqlite(str(workdir / "memory.db")), history, rounds * 10)
+        print(f"{size:>8} {legacy:>16.3f} {log:>10.3f} {sqlite:>10.3f}")
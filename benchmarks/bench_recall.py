@@ -0,0 +1,77 @@
+# bench_recall.py - 向量召回查询延迟（临时目录，不触碰 memory_test/）
+# 写入 N 条 256 维向量后，测量 AstraMemoryRecall.search 的 p50 / p99：
+#   单会话  : N 条全部属于同一个会话（最坏情况，对整个内存映射数组做矩阵乘）
+#   1000 会话: N 条平均分布在 1000 个会话中，只取被查询会话的行计算
+# 为了只测检索本身，写入与查询都使用随机单位向量（RandomEmbedder），不计 HashingEmbedder 的开销
+# 用法（在项目根目录）：python benchmarks/bench_recall.py [条数 ...]，默认 10000 100000 1000000
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AstraCore.AstraMemory import AstraMemoryRecall
+
+SIZES = (10_000, 100_000, 1_000_000)
+DIM = 256
+QUERIES = 50
+CHUNK = 10_000
+CONVERSATIONS = 1000
+
+
+class RandomEmbedder:
+    name = f"random-{DIM}"
+    dim = DIM
+
+    def __init__(self):
+        self.rng = np.random.default_rng(0)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = self.rng.standard_normal((len(texts), self.dim), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def fill(recall: AstraMemoryRecall, n: int, conversations: int) -> None:
+    per_conversation = n // conversations
+    for conversation_id in range(conversations):
+        for start in range(0, per_conversation, CHUNK):
+            size = min(CHUNK, per_conversation - start)
+            recall.add(conversation_id, "bench", [{"role": "user", "content": "x"}] * size)
+
+
+def measure(recall: AstraMemoryRecall, conversations: int) -> tuple[float, float]:
+    latencies = []
+    for i in range(QUERIES):
+        start = time.perf_counter()
+        hits = recall.search(i % conversations, "bench", "query", k=4, min_score=-1.0)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert len(hits) == 4
+    latencies.sort()
+    return statistics.median(latencies), latencies[max(0, int(len(latencies) * 0.99) - 1)]
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'向量数':<10}{'写入(s)':>10}{'单会话 p50':>12}{'p99':>10}{'1000会话 p50':>14}{'p99':>10}")
+    for n in sizes:
+        single = AstraMemoryRecall(tempfile.mkdtemp(), RandomEmbedder())
+        start = time.perf_counter()
+        fill(single, n, 1)
+        fill_seconds = time.perf_counter() - start
+        single_p50, single_p99 = measure(single, 1)
+        single.close()
+
+        spread = AstraMemoryRecall(tempfile.mkdtemp(), RandomEmbedder())
+        fill(spread, n, CONVERSATIONS)
+        spread_p50, spread_p99 = measure(spread, CONVERSATIONS)
+        spread.close()
+        print(f"{n:<10}{fill_seconds:>10.1f}{single_p50:>12.2f}{single_p99:>10.2f}{spread_p50:>14.2f}{spread_p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench_search.py - 聊天记录全文检索延迟（临时数据库，不触碰 db/AstraEcho.db）
+# 按批写入 N 条合成聊天记录（触发器增量维护 FTS5 索引），再测量：
+#   写入    : 带索引时的写入速度（条/秒）
+#   MATCH   : 3 个字符以上检索词，bm25 排序取前 20 条的 p50 / p99
+#   LIKE    : 无索引的全表 LIKE 扫描（检索词无命中时）耗时，作为对照
+#   短词    : 2 个字符且无命中的检索词走 LIKE 兜底，只扫描最近 like_window 条记录的耗时
+# 合成语料只有 20 个词，几乎每个检索词都命中大量记录，是 MATCH 的较差情形
+# 用法（在项目根目录）：python benchmarks/bench_search.py [条数 ...]，默认 100000 1000000
+
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AstraConfig import AstraConfig
+from AstraChart import AstraChart
+
+SIZES = (100_000, 1_000_000)
+QUERIES = 200
+BATCH = 10_000
+WORDS = ("天气", "股票", "茅台", "上海", "北京", "明天", "会议", "提醒", "音乐", "电影", "翻译", "代码",
+         "weather", "stock", "meeting", "reminder", "music", "python", "travel", "invoice")
+QUERY_TERMS = ("weather", "上海明天", "茅台股票", "meeting", "python 代码")
+
+
+def sentence(rng: random.Random) -> str:
+    return "".join(rng.choice(WORDS) + rng.choice(("，", " ", "的", "")) for _ in range(rng.randint(6, 20)))
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * p) - 1)]
+
+
+def run(n: int) -> None:
+    chart = AstraChart(str(Path(tempfile.mkdtemp()) / "chart.db"))
+    rng = random.Random(n)
+    start = time.perf_counter()
+    for offset in range(0, n, BATCH):
+        rows = [(rng.choice(("user", "assistant")), sentence(rng)) for _ in range(min(BATCH, n - offset))]
+        with chart.transaction() as conn:
+            conn.executemany("INSERT INTO ASTRA_CHAT (role, content) VALUES (?, ?)", rows)
+    insert_rate = n / (time.perf_counter() - start)
+
+    latencies = []
+    for i in range(QUERIES):
+        t = time.perf_counter()
+        hits = chart.search.search(QUERY_TERMS[i % len(QUERY_TERMS)], limit=20, source="chat")
+        latencies.append((time.perf_counter() - t) * 1000)
+        assert hits
+
+    conn = chart.connection()
+    t = time.perf_counter()
+    # 没有命中的子串：LIKE 必须扫完整张表，这是不建索引时每次检索的代价
+    conn.execute("SELECT ID FROM ASTRA_CHAT WHERE content LIKE '%不存在的词%' ORDER BY ID DESC LIMIT 20").fetchall()
+    like_ms = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    assert not chart.search.search("不存", limit=20, source="chat")
+    short_ms = (time.perf_counter() - t) * 1000
+    chart.close()
+    print(f"{n:<10}{insert_rate:>12.0f}{statistics.median(latencies):>12.2f}{percentile(latencies, 0.99):>12.2f}"
+          f"{like_ms:>12.1f}{short_ms:>12.1f}")
+
+
+def main():
+    AstraConfig.load("config/config.json")
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"sqlite {sqlite3.sqlite_version}")
+    print(f"{'条数':<10}{'写入(条/s)':>12}{'MATCH p50':>12}{'MATCH p99':>12}{'LIKE(ms)':>12}{'短词(ms)':>12}")
+    for n in sizes:
+        run(n)
+
+
+if __name__ == "__main__":
+    main()
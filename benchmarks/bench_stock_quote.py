@@ -0,0 +1,78 @@
+# bench_stock_quote.py - 批量行情查询耗时对比（本地桩服务，不访问新浪）
+#   旧方案 : 每个代码一次工具调用，每次 easyquotation.use('sina') 新建客户端再 real(code)
+#   批量   : StockQuote.real(codes)，常驻客户端，一次上游请求（缓存已清空）
+#   缓存   : 同一批代码在 TTL 内再次查询
+# 桩服务每个请求固定延迟 UPSTREAM_DELAY，模拟公网往返
+# 用法（在项目根目录）：python benchmarks/bench_stock_quote.py
+
+import http.server
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import unquote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import easyquotation
+
+from AstraConfig import AstraConfig
+from AstraLink.MCPServer import StockQuote
+
+SIZES = (1, 50, 500)
+UPSTREAM_DELAY = 0.02
+FIELDS = ",".join(["100"] * 29) + ",2025-01-01,15:00:00"
+
+
+class QuoteStub(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(UPSTREAM_DELAY)
+        codes = unquote(self.path).split("list=", 1)[-1].split(",")
+        body = "".join(f'var hq_str_{code}="股票{code[-6:]},{FIELDS}";\n' for code in codes if code)
+        data = body.encode("gbk")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=gbk")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    stub = http.server.ThreadingHTTPServer(("127.0.0.1", 0), QuoteStub)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{stub.server_address[1]}"
+    AstraConfig.load("config/config.json")
+    AstraConfig.set("AstraLink.tools.quote_endpoint", endpoint)
+    AstraConfig.set("AstraLink.tools.stock_ttl", 60)
+    # 旧方案使用原版新浪客户端，同样指向桩服务
+    easyquotation.sina.Sina.stock_api = property(lambda self: f"{endpoint}/rn={int(time.time() * 1000)}&list=")
+
+    codes = [f"{600000 + i:06d}" for i in range(max(SIZES))]
+    StockQuote.client()  # 常驻客户端只创建一次，不计入批量耗时
+
+    print(f"{'代码数':<8}{'逐个查询(ms)':>14}{'批量(ms)':>12}{'缓存(ms)':>12}")
+    for n in SIZES:
+        batch = codes[:n]
+        old = timed(lambda: [easyquotation.use("sina").real(code) for code in batch])
+        StockQuote.clear()
+        cold = timed(lambda: StockQuote.real(batch))
+        warm = timed(lambda: StockQuote.real(batch))
+        assert len(StockQuote.real(batch)) == n
+        print(f"{n:<8}{old:>14.1f}{cold:>12.1f}{warm:>12.3f}")
+    print(StockQuote.stats())
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# load_test.py - HTTP 接口压测：逐级提高并发，统计 p50 / p99 延迟与每秒请求数
+# 先以任一模式启动 AstraEcho（AstraNex.server 为 flask 或 asgi），再运行：
+#   python benchmarks/load_test.py --url "http://127.0.0.1:1145/send?message=你好" \
+#       --concurrency 1,4,16,64 --requests 200
+# 只压测框架本身开销时可指向根路径 "/"，不调用模型
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def run_level(url: str, method: str, body: str | None, concurrency: int, total: int, timeout: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = total
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, url, content=body,
+                                                    headers={"Content-Type": "application/json"} if body else None)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "rps": len(latencies) / elapsed,
+        "errors": errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="AstraEcho 接口压测")
+    parser.add_argument("--url", default="http://127.0.0.1:1145/")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--body", default=None, help="POST 请求体（JSON 字符串）")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="逗号分隔的并发级别")
+    parser.add_argument("--requests", type=int, default=200, help="每个并发级别的请求总数")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(f"{args.method} {args.url}")
+    print(f"{'并发':<8}{'p50(ms)':>12}{'p99(ms)':>12}{'req/s':>12}{'失败':>8}")
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        result = await run_level(args.url, args.method, args.body, concurrency, args.requests, args.timeout)
+        print(f"{concurrency:<8}{result['p50']:>12.2f}{result['p99']:>12.2f}{result['rps']:>12.1f}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
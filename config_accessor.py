@@ -4,12 +4,15 @@ import sys
 from typing import Any, Optional, Callable
 from datetime import datetime
 
-
+CONFIG_PATH = "config/config.json"
 
 
 class ConfigAccessor:
     """
     配置访问器 - 提供热加载配置的便捷访问方式
+
+    读取的是 AstraConfig 当前发布的不可变快照（预编译路径索引），访问本身不做文件 I/O；
+    配置文件变更由 AstraConfig 的热加载线程负责替换快照。
     """
 
     def __init__(self, config_key: str, default: Any = None,
@@ -34,7 +37,7 @@ class ConfigAccessor:
     def __get__(self, obj, objtype=None) -> Any:
         """描述符协议 - 用于属性访问"""
         from AstraConfig import AstraConfig
-        AstraConfig.load("config/config.json")
+        AstraConfig.ensure_loaded(CONFIG_PATH)
         value = AstraConfig.get(self.config_key, self.default)
 
         # 记录访问信息
@@ -126,6 +129,24 @@ OPENAI_PROMPT = ConfigAccessor(
     default="You are a helpful AI",
     description="模型提示词"
 )
+# memory 配置
+MEMORY_CONTEXT_TOKENS = ConfigAccessor(
+    config_key="AstraMemory.context.max_tokens",
+    default=3000,
+    description="发送给 agent 的历史上下文 token 预算"
+)
+MEMORY_CONTEXT_MESSAGES = ConfigAccessor(
+    config_key="AstraMemory.context.max_messages",
+    default=400,
+    description="组装上下文时最多从 memory 读取的消息条数"
+)
+MEMORY_SUMMARY_PROMPT = ConfigAccessor(
+    config_key="AstraMemory.summary.prompt",
+    default="你是对话记录整理助手。请把给出的对话（以及已有摘要）压缩为一段简洁的中文摘要，"
+            "保留用户的身份信息、偏好、已确认的事实和未完成的任务，不要编造内容。",
+    description="滚动摘要使用的提示词"
+)
+
 # 数据库配置
 DATABASE_URL = ConfigAccessor(
     config_key="database.url",
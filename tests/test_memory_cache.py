@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from AstraCore.AstraMemory import AstraMemoryCache, AstraMemoryLog
+
+
+def _message(content: str) -> dict:
+    return {"role": "user", "content": content}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    log = AstraMemoryLog(str(tmp_path / "memory.log"))
+    yield log
+    log.close()
+
+
+def _cache(backend, **kwargs) -> AstraMemoryCache:
+    # flush_interval 足够长，写回只在测试显式 flush 时发生
+    return AstraMemoryCache(backend, flush_interval=3600, **kwargs)
+
+
+def test_expired_entry_keeps_pending_messages(backend):
+    cache = _cache(backend, ttl=0.05)
+    cache.load(1, "d")
+    cache.append(1, "d", [_message("A")])
+    time.sleep(0.1)
+
+    assert cache.load(1, "d")["memory"] == [_message("A")]
+    cache.append(1, "d", [_message("B")])
+    cache.flush()
+
+    assert backend.load(1, "d")["memory"] == [_message("A"), _message("B")]
+
+
+def test_expired_pending_append_keeps_order(backend):
+    cache = _cache(backend, ttl=0.05)
+    cache.load(1, "d")
+    cache.append(1, "d", [_message("A")])
+    time.sleep(0.1)
+
+    # 过期后的追加不能越过尚未写回的 A 直接写穿
+    cache.append(1, "d", [_message("B")])
+    cache.flush()
+
+    assert backend.load(1, "d")["memory"] == [_message("A"), _message("B")]
+
+
+def test_expired_pending_replace_is_written_back(backend):
+    backend.append(1, "d", [_message("old")])
+    cache = _cache(backend, ttl=0.05)
+    cache.replace(1, "d", [_message("new")])
+    time.sleep(0.1)
+
+    assert cache.load(1, "d")["memory"] == [_message("new")]
+    cache.flush()
+
+    assert backend.load(1, "d")["memory"] == [_message("new")]
+
+
+def test_evicted_entry_is_written_back(backend):
+    cache = _cache(backend, max_entries=1)
+    cache.load(1, "d")
+    cache.append(1, "d", [_message("A")])
+    # 载入第二个会话淘汰第一个，淘汰时写回
+    cache.load(2, "d")
+
+    assert backend.load(1, "d")["memory"] == [_message("A")]
+    assert cache.stats()["dirty"] == 0
+
+
+def test_close_writes_back_pending(backend, tmp_path):
+    cache = _cache(backend)
+    cache.load(1, "d")
+    cache.append(1, "d", [_message("A")])
+    cache.close()
+
+    reopened = AstraMemoryLog(str(tmp_path / "memory.log"))
+    try:
+        assert reopened.load(1, "d")["memory"] == [_message("A")]
+    finally:
+        reopened.close()
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+from AstraCore.AstraMemory import AstraMemoryLog, AstraMemorySummarizer
+
+
+def _messages(start: int, stop: int) -> list[dict]:
+    return [{"role": "user", "content": f"消息{i}"} for i in range(start, stop)]
+
+
+class StubSummarizer:
+    """记录调用参数；during 在 "等待模型" 期间执行，用来模拟并发修改会话"""
+
+    def __init__(self, during=None):
+        self.calls: list[tuple[list, str]] = []
+        self.during = during
+
+    async def summarize(self, messages, previous_summary=""):
+        self.calls.append((messages, previous_summary))
+        await asyncio.sleep(0)
+        if self.during is not None:
+            self.during()
+        return f"摘要{len(self.calls)}"
+
+
+@pytest.fixture
+def backend(tmp_path):
+    log = AstraMemoryLog(str(tmp_path / "memory.log"))
+    yield log
+    log.close()
+
+
+@pytest.fixture
+def make_summarizer(backend):
+    created = []
+
+    def make(stub, **kwargs):
+        options = {"threshold": 5, "keep_recent": 10, "min_interval": 0.0}
+        options.update(kwargs)
+        summarizer = AstraMemorySummarizer(backend, stub, **options)
+        created.append(summarizer)
+        return summarizer
+
+    yield make
+    for summarizer in created:
+        summarizer.close(timeout=5)
+
+
+def test_summarize_folds_older_messages(backend, make_summarizer):
+    backend.append(1, "d", _messages(0, 30))
+    stub = StubSummarizer()
+    asyncio.run(make_summarizer(stub).summarize(1, "d"))
+
+    assert stub.calls == [(_messages(0, 20), "")]
+    assert backend.load_summary(1, "d") == {"content": "摘要1", "covered": 20}
+
+
+def test_summarize_continues_from_previous_summary(backend, make_summarizer):
+    backend.append(1, "d", _messages(0, 40))
+    backend.save_summary(1, "d", {"content": "旧摘要", "covered": 20})
+    stub = StubSummarizer()
+    asyncio.run(make_summarizer(stub).summarize(1, "d"))
+
+    assert stub.calls == [(_messages(20, 30), "旧摘要")]
+    assert backend.load_summary(1, "d") == {"content": "摘要1", "covered": 30}
+
+
+def test_summarize_discards_result_when_conversation_replaced(backend, make_summarizer):
+    backend.append(1, "d", _messages(0, 30))
+    stub = StubSummarizer(during=lambda: backend.replace(1, "d", _messages(100, 130)))
+    asyncio.run(make_summarizer(stub).summarize(1, "d"))
+
+    assert len(stub.calls) == 1
+    assert backend.load_summary(1, "d") is None
+
+
+def test_summarize_discards_result_when_summary_changed(backend, make_summarizer):
+    backend.append(1, "d", _messages(0, 30))
+    newer = {"content": "并发写入的摘要", "covered": 15}
+    stub = StubSummarizer(during=lambda: backend.save_summary(1, "d", newer))
+    asyncio.run(make_summarizer(stub).summarize(1, "d"))
+
+    assert backend.load_summary(1, "d") == newer
+
+
+def test_summarize_keeps_result_when_messages_appended(backend, make_summarizer):
+    backend.append(1, "d", _messages(0, 30))
+    stub = StubSummarizer(during=lambda: backend.append(1, "d", _messages(30, 35)))
+    asyncio.run(make_summarizer(stub).summarize(1, "d"))
+
+    assert backend.load_summary(1, "d") == {"content": "摘要1", "covered": 20}
+
+
+def _wait_for(summarizer: AstraMemorySummarizer, predicate, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = summarizer.stats()
+        if predicate(stats):
+            return stats
+        time.sleep(0.01)
+    raise AssertionError(f"摘要任务未按预期完成: {summarizer.stats()}")
+
+
+def test_maybe_schedule_runs_only_above_threshold(backend, make_summarizer):
+    backend.append(1, "d", _messages(0, 5))
+    stub = StubSummarizer()
+    summarizer = make_summarizer(stub)
+
+    assert summarizer.maybe_schedule(1, "d")
+    # 未达阈值：后台线程检查后直接出队，不调用模型
+    _wait_for(summarizer, lambda stats: stats["queued"] == 0)
+    assert stub.calls == []
+
+    backend.append(1, "d", _messages(5, 30))
+    assert summarizer.maybe_schedule(1, "d")
+    _wait_for(summarizer, lambda stats: stats["completed"] == 1)
+    assert backend.load_summary(1, "d")["covered"] == 20
@@ -0,0 +1,128 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from AstraCore.AstraMemory import AstraMemoryRecall, HashingEmbedder
+from AstraCore.AstraMemory.memory_vector import message_text
+
+TEXTS = [
+    "今天天气晴朗，适合去公园散步",
+    "我喜欢吃苹果和香蕉",
+    "股票 sh000001 今天上涨",
+    "明天可能下雨，记得带伞",
+    "苹果手机的电池续航不错",
+    "周末打算去爬山",
+    "香蕉富含钾元素",
+    "晚饭吃了苹果派",
+]
+
+
+def _messages(texts: list[str]) -> list[dict]:
+    return [{"role": "user", "content": text} for text in texts]
+
+
+@pytest.fixture
+def recall(tmp_path):
+    store = AstraMemoryRecall(str(tmp_path / "recall"), HashingEmbedder(256))
+    yield store
+    store.close()
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    first = HashingEmbedder(64).embed(["苹果 apple", ""])
+    second = HashingEmbedder(64).embed(["苹果 apple", ""])
+    assert np.array_equal(first, second)
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+    assert not first[1].any()
+
+
+def test_search_returns_top_k_in_seq_order(recall):
+    recall.add(1, "d", _messages(TEXTS))
+    query = "苹果"
+    embedder = recall.embedder
+    scores = embedder.embed(TEXTS) @ embedder.embed([query])[0]
+    expected = sorted(np.argsort(-scores)[:3].tolist())
+
+    hits = recall.search(1, "d", query, k=3, min_score=-1.0)
+
+    assert [seq for _, seq, _ in hits] == expected
+    assert [message_text(m) for _, _, m in hits] == [TEXTS[i] for i in expected]
+    for score, seq, _ in hits:
+        assert score == pytest.approx(float(scores[seq]), abs=1e-5)
+
+
+def test_search_respects_min_score(recall):
+    recall.add(1, "d", _messages(TEXTS))
+    hits = recall.search(1, "d", "苹果", k=len(TEXTS), min_score=0.3)
+    assert hits
+    assert all(score >= 0.3 for score, _, _ in hits)
+
+
+def test_exclude_recent_skips_newest_messages(recall):
+    recall.add(1, "d", _messages(TEXTS))
+    # 最相关的 "晚饭吃了苹果派" 是最后一条，已在上下文中，不应被召回
+    hits = recall.search(1, "d", "苹果派", k=len(TEXTS), min_score=-1.0, exclude_recent=1)
+    assert [seq for _, seq, _ in hits] == list(range(len(TEXTS) - 1))
+
+    assert recall.search(1, "d", "苹果", k=4, exclude_recent=len(TEXTS)) == []
+
+
+def test_search_is_scoped_to_conversation(recall):
+    recall.add(1, "d", _messages(TEXTS[:4]))
+    recall.add(2, "d", _messages(TEXTS[4:]))
+    recall.add(1, "other", _messages(["苹果"]))
+
+    hits = recall.search(2, "d", "苹果", k=10, min_score=-1.0)
+    assert [message_text(m) for _, _, m in hits] == TEXTS[4:]
+    assert recall.search(3, "d", "苹果") == []
+
+
+def test_replace_restarts_sequence(recall):
+    recall.add(1, "d", _messages(TEXTS))
+    recall.replace(1, "d", _messages(["苹果"]))
+
+    hits = recall.search(1, "d", "苹果", k=10, min_score=-1.0)
+    assert [(seq, message_text(m)) for _, seq, m in hits] == [(0, "苹果")]
+
+
+def test_reopen_restores_store(tmp_path):
+    path = str(tmp_path / "recall")
+    store = AstraMemoryRecall(path, HashingEmbedder(256))
+    store.add(1, "d", _messages(TEXTS))
+    store.remove(1, "d")
+    store.add(1, "d", _messages(TEXTS[:2]))
+    store.close()
+
+    reopened = AstraMemoryRecall(path, HashingEmbedder(256))
+    try:
+        hits = reopened.search(1, "d", "苹果", k=10, min_score=-1.0)
+        assert [message_text(m) for _, _, m in hits] == TEXTS[:2]
+        # seq 接续重开前的计数
+        reopened.add(1, "d", _messages(["苹果派"]))
+        assert reopened.search(1, "d", "苹果派", k=1, min_score=-1.0)[0][1] == 2
+    finally:
+        reopened.close()
+
+
+def test_reopen_rejects_other_embedder(tmp_path):
+    path = str(tmp_path / "recall")
+    store = AstraMemoryRecall(path, HashingEmbedder(256))
+    store.add(1, "d", _messages(TEXTS[:1]))
+    store.close()
+    with pytest.raises(RuntimeError):
+        AstraMemoryRecall(path, HashingEmbedder(64))
+
+
+def test_backfill_runs_once(tmp_path):
+    path = str(tmp_path / "recall")
+    store = AstraMemoryRecall(path, HashingEmbedder(256))
+    assert store.backfill([(1, "d", _messages(TEXTS)), (2, "d", _messages(["苹果"]))]) == len(TEXTS) + 1
+    store.close()
+
+    reopened = AstraMemoryRecall(path, HashingEmbedder(256))
+    try:
+        assert reopened.backfilled
+        assert reopened.backfill([(3, "d", _messages(["苹果"]))]) == 0
+        assert reopened.stats()["vectors"] == len(TEXTS) + 1
+    finally:
+        reopened.close()
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from AstraLink.MCPServer import stock_quote
+from AstraLink.MCPServer.stock_quote import StockQuote
+
+
+class StubClient:
+    """代替新浪客户端：记录每次上游请求的代码，按请求的代码返回行情"""
+
+    def __init__(self):
+        self.requests: list[list[str]] = []
+
+    def real(self, codes, prefix=False):
+        assert prefix
+        self.requests.append(list(codes))
+        return {code: {"now": float(len(self.requests))} for code in codes if code != "sh999999"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    options = {"AstraLink.tools.stock_ttl": 0.1, "AstraLink.tools.cache_size": 3}
+
+    class Config:
+        @staticmethod
+        def get(key, default=None):
+            return options.get(key, default)
+
+    stub = StubClient()
+    monkeypatch.setattr(stock_quote, "AstraConfig", Config)
+    monkeypatch.setattr(StockQuote, "_client", stub)
+    StockQuote.clear()
+    yield stub
+    StockQuote.clear()
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("600519", "sh600519"),
+    ("000001", "sz000001"),
+    ("SZ000001", "sz000001"),
+    (" sh000001 ", "sh000001"),
+])
+def test_normalize(code, expected):
+    assert StockQuote.normalize(code) == expected
+
+
+def test_codes_are_batched_and_deduplicated(client):
+    result = StockQuote.real(["600519", "sh600519", "SZ000001", "sh000001"])
+
+    assert client.requests == [["sh600519", "sz000001", "sh000001"]]
+    # sh000001（上证指数）与 sz000001（平安银行）是两只证券，分别缓存
+    assert set(result) == {"sh600519", "sz000001", "sh000001"}
+
+
+def test_cached_quotes_skip_upstream_until_ttl(client):
+    StockQuote.real(["sh600519", "sz000001"])
+    result = StockQuote.real(["sh600519", "sz000002"])
+
+    assert client.requests == [["sh600519", "sz000001"], ["sz000002"]]
+    assert result["sh600519"] == {"now": 1.0}
+
+    time.sleep(0.15)
+    StockQuote.real(["sh600519"])
+    assert client.requests[-1] == ["sh600519"]
+
+
+def test_unknown_codes_are_not_cached(client):
+    assert StockQuote.real(["sh999999"]) == {}
+    StockQuote.real(["sh999999"])
+    assert client.requests == [["sh999999"], ["sh999999"]]
+
+
+def test_cache_is_bounded(client):
+    StockQuote.real(["sh600000", "sh600001", "sh600002", "sh600003", "sh600004"])
+    assert StockQuote.stats()["size"] == 3
+
+    # 最早写入的被淘汰，最近写入的仍命中
+    StockQuote.real(["sh600004"])
+    assert len(client.requests) == 1
+    StockQuote.real(["sh600000"])
+    assert client.requests[-1] == ["sh600000"]
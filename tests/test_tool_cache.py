@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from AstraLink.MCPServer import tool_cache
+
+
+def test_results_are_cached_until_ttl():
+    calls = []
+
+    @tool_cache(ttl=0.1)
+    def weather(city: str) -> str:
+        calls.append(city)
+        return f"{city}:{len(calls)}"
+
+    assert weather("北京") == "北京:1"
+    assert weather("北京") == "北京:1"
+    assert weather(city="北京") == "北京:2"  # 关键字参数是另一组缓存键
+    assert weather("上海") == "上海:3"
+    time.sleep(0.15)
+    assert weather("北京") == "北京:4"
+    stats = weather.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 4)
+
+
+def test_exceptions_are_not_cached():
+    calls = []
+
+    @tool_cache(ttl=60)
+    def flaky(city: str) -> str:
+        calls.append(city)
+        if len(calls) == 1:
+            raise RuntimeError("503")
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        flaky("北京")
+    assert flaky("北京") == "ok"
+    assert flaky("北京") == "ok"
+    assert len(calls) == 2
+
+
+def test_lru_eviction_and_clear():
+    calls = []
+
+    @tool_cache(ttl=60, maxsize=2)
+    def lookup(code: str) -> str:
+        calls.append(code)
+        return code
+
+    for code in ("a", "b", "a", "c", "b"):
+        lookup(code)
+    # a 在 c 之前被访问过，c 写入时淘汰 b
+    assert calls == ["a", "b", "c", "b"]
+    assert lookup.cache_stats()["evictions"] == 2
+
+    lookup.cache_clear()
+    lookup("a")
+    assert calls[-1] == "a"
+
+
+def test_unhashable_arguments_bypass_cache():
+    calls = []
+
+    @tool_cache(ttl=60)
+    def total(values: list) -> int:
+        calls.append(values)
+        return sum(values)
+
+    assert total([1, 2]) == 3
+    assert total([1, 2]) == 3
+    assert len(calls) == 2
+
+
+def test_sync_singleflight():
+    release = threading.Event()
+    calls = []
+
+    @tool_cache(ttl=60)
+    def slow(city: str) -> str:
+        calls.append(city)
+        release.wait(5)
+        return city.upper()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow("bj"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while slow.cache_stats()["coalesced"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ["bj"]
+    assert results == ["BJ"] * 8
+    assert slow.cache_stats()["coalesced"] == 7
+
+
+def test_async_singleflight_and_error_sharing():
+    calls = []
+
+    @tool_cache(ttl=60)
+    async def fetch(city: str) -> str:
+        calls.append(city)
+        await asyncio.sleep(0.05)
+        if city == "bad":
+            raise ValueError(city)
+        return city.upper()
+
+    async def main():
+        results = await asyncio.gather(*(fetch("sh") for _ in range(5)))
+        errors = await asyncio.gather(*(fetch("bad") for _ in range(3)), return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(main())
+
+    assert results == ["SH"] * 5
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert calls == ["sh", "bad"]
+    assert fetch.cache_stats()["coalesced"] == 6